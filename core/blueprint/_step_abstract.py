@@ -7,6 +7,7 @@ import traceback
 from typing import Any, Dict, Generator, List, Set, Tuple, Type
 
 from .llm_provider import LLMProvider
+from ..llms.telemetry import llm_tags
 
 from ..planner.code_enhancement_system import CodeEnhancementSystem
 
@@ -68,6 +69,7 @@ class StepCodeGenerator(ABC):
     def gen_step_code(self) -> Generator[Dict[str, Any], None, None]:
         pass
 
+    @llm_tags(site="fix")
     def fix_code(self, error: str) -> Generator[str, None, None]:
         if not self._step_code:
             yield send_message("没有可修复的代码。", "error")
@@ -465,6 +467,7 @@ class StepExecutor(ABC):
                     raise e
         yield from self.post_process(updated_vars) 
     
+    @llm_tags(site="fix")
     def fix_code(self, code:str, error: str) -> Generator[str, None, None]:
         fix_prompt = self.fix_code_prompt(code, error)
         
@@ -480,7 +483,7 @@ class StepExecutor(ABC):
     def redo_step(self) -> Generator[Dict[str, Any], None, None]:
         step_number = self.step_info.step_number
         code = self.step_data.get_step_code(step_number)
-        yield from self.code_runner.run_sse(code, self.step_data.global_vars)
+        yield from self.step_data.bind(self.code_runner.run_sse(code, self.step_data.global_vars))
 
     def check_step_result(self)-> tuple[str, bool]:
         if hasattr(self.step_data, "analysis_result"):
@@ -0,0 +1,110 @@
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+from tenacity import Retrying, stop_after_attempt, wait_exponential
+from core.utils.single_ton import Singleton
+from core.utils.log import logger
+
+
+class RateLimiter:
+    """令牌桶限速，rate 为每秒允许的请求数，burst 为允许的突发请求数"""
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def rate_limiter(host: str) -> RateLimiter:
+    """
+    按数据源主机取得共享的限速器，同一主机的所有请求共用一个令牌桶。
+    速率由配置 akshare_rate_limit（每秒请求数）决定，默认 10
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            from core.utils.config_setting import Config
+            config = Config()
+            rate = float(config.get("akshare_rate_limit")) if config.has_key("akshare_rate_limit") else 10.0
+            limiter = RateLimiter(rate, burst=max(1, int(rate)))
+            _limiters[host] = limiter
+        return limiter
+
+
+class BatchResult:
+    """批量获取的结果，results 为成功的部分，errors 为失败的部分，两者都保持输入顺序"""
+    def __init__(self):
+        self.results: Dict[Hashable, Any] = {}
+        self.errors: Dict[Hashable, Exception] = {}
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def __repr__(self) -> str:
+        return f"BatchResult(results={len(self.results)}, errors={list(self.errors)})"
+
+
+class BatchFetcher(metaclass=Singleton):
+    """
+    多个代码同时获取数据。并发数由配置 akshare_max_workers 决定，默认 8；
+    每个代码失败后按指数退避重试，重试用尽后记入 BatchResult.errors，不影响其他代码。
+    """
+    def __init__(self, max_workers: Optional[int] = None, max_attempts: int = 3):
+        if max_workers is None:
+            from core.utils.config_setting import Config
+            config = Config()
+            max_workers = int(config.get("akshare_max_workers")) if config.has_key("akshare_max_workers") else 8
+        self.max_workers = max(1, max_workers)
+        self.max_attempts = max_attempts
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="akshare")
+
+    def fetch(self, func: Callable[[Any], Any], items: Iterable[Hashable], host: Optional[str] = None,
+              max_attempts: Optional[int] = None, executor: Optional[Executor] = None) -> BatchResult:
+        """
+        对每个 item 调用 func(item)。
+        host 不为空时每次请求前先经过该主机的限速器；func 自己已经限速时传 None。
+        executor 不为空时在其中运行，后台任务用自己的线程池，不占用用户请求共用的线程池。
+        """
+        items = list(dict.fromkeys(items))
+        attempts = max_attempts or self.max_attempts
+        limiter = rate_limiter(host) if host else None
+
+        def call(item):
+            for attempt in Retrying(stop=stop_after_attempt(attempts),
+                                    wait=wait_exponential(multiplier=0.5, min=0.5, max=8), reraise=True):
+                with attempt:
+                    if limiter is not None:
+                        limiter.acquire()
+                    return func(item)
+
+        executor = executor or self._executor
+        futures = {item: executor.submit(call, item) for item in items}
+        batch = BatchResult()
+        for item, future in futures.items():
+            try:
+                batch.results[item] = future.result()
+            except Exception as e:
+                logger.warning(f"获取 {item} 的数据失败: {str(e)}")
+                batch.errors[item] = e
+        return batch
@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+import pandas as pd
+import akshare as ak
+from core.utils.single_ton import Singleton
+from core.utils.log import logger
+from .batch_fetcher import rate_limiter
+
+
+def _fetch_stock(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+    rate_limiter("eastmoney").acquire()
+    return ak.stock_zh_a_hist(symbol=symbol, period="daily", start_date=start_date, end_date=end_date)
+
+
+def _fetch_index(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+    rate_limiter("eastmoney").acquire()
+    return ak.index_zh_a_hist(symbol=symbol, period="daily", start_date=start_date, end_date=end_date)
+
+
+def _fetch_index_em(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+    rate_limiter("eastmoney").acquire()
+    return ak.stock_zh_index_daily_em(symbol=symbol, start_date=start_date, end_date=end_date)
+
+
+# kind -> (取数函数, 日期列名)
+FETCHERS: Dict[str, Tuple[Callable[[str, str, str], pd.DataFrame], str]] = {
+    "stock": (_fetch_stock, "日期"),
+    "index": (_fetch_index, "日期"),
+    "index_em": (_fetch_index_em, "date"),
+}
+
+Interval = Tuple[date, date]
+
+
+class _SymbolData:
+    def __init__(self, frame: pd.DataFrame, covered: List[Interval]):
+        self.frame = frame
+        self.covered = covered
+        self.lock = threading.Lock()
+
+
+class HistoricalDataStore(metaclass=Singleton):
+    """
+    日线数据的本地列式存储，每个 (kind, symbol) 一个 Parquet 文件，
+    旁边的 json 文件记录已经从 akshare 取过的日期区间。
+    请求某个日期区间时只去取本地没有覆盖的部分，合并后写回磁盘。
+    当天收盘结算之前的数据不记入已覆盖区间，下次请求会重新获取。
+    """
+    def __init__(self, root: Optional[str] = None, settle_time: str = "15:30"):
+        if root is None:
+            from core.utils.config_setting import Config
+            config = Config()
+            root = config.get("historical_data_path") if config.has_key("historical_data_path") else "./database/historical"
+        self.root = root
+        self.settle_time = datetime.strptime(settle_time, "%H:%M").time()
+        self._symbols: Dict[Tuple[str, str], _SymbolData] = {}
+        self._lock = threading.Lock()
+
+    def get(self, symbol: str, start_date: str, end_date: str, kind: str = "stock") -> pd.DataFrame:
+        """
+        返回 [start_date, end_date] 之间的日线数据（YYYYMMDD），列与 akshare 原始接口一致
+        """
+        fetcher, date_column = FETCHERS[kind]
+        start, end = self._parse_date(start_date), self._parse_date(end_date)
+        data = self._load(kind, symbol)
+        with data.lock:
+            missing = self._missing(data.covered, start, end)
+            if missing:
+                self._fill(kind, symbol, data, missing, fetcher, date_column)
+            frame = data.frame
+
+        if frame.empty:
+            return frame.copy()
+        dates = frame[date_column]
+        mask = (dates >= pd.Timestamp(start)) & (dates <= pd.Timestamp(end))
+        result = frame.loc[mask].reset_index(drop=True)
+        result[date_column] = result[date_column].dt.date
+        return result
+
+    def clear(self, symbol: Optional[str] = None, kind: str = "stock"):
+        """删除本地数据，symbol 为 None 时删除该 kind 下的全部数据"""
+        with self._lock:
+            keys = [k for k in self._symbols if k[0] == kind and (symbol is None or k[1] == symbol)]
+            for key in keys:
+                del self._symbols[key]
+        directory = os.path.join(self.root, kind)
+        if not os.path.exists(directory):
+            return
+        for name in os.listdir(directory):
+            if symbol is None or os.path.splitext(name)[0] == symbol:
+                os.remove(os.path.join(directory, name))
+
+    def _fill(self, kind: str, symbol: str, data: _SymbolData, missing: List[Interval],
+              fetcher: Callable[[str, str, str], pd.DataFrame], date_column: str):
+        settled = self._settled_date()
+        frames = [data.frame] if not data.frame.empty else []
+        covered = list(data.covered)
+        for start, end in missing:
+            logger.debug(f"获取 {kind}:{symbol} {start} - {end} 的日线数据")
+            df = fetcher(symbol, start.strftime("%Y%m%d"), end.strftime("%Y%m%d"))
+            if df is not None and not df.empty:
+                df = df.copy()
+                df[date_column] = pd.to_datetime(df[date_column])
+                frames.append(df)
+            if start <= settled:
+                covered.append((start, min(end, settled)))
+
+        if frames:
+            frame = pd.concat(frames, ignore_index=True)
+            frame = frame.drop_duplicates(subset=[date_column], keep="last")
+            frame = frame.sort_values(date_column).reset_index(drop=True)
+        else:
+            frame = data.frame
+        data.frame = frame
+        data.covered = self._merge(covered)
+        self._save(kind, symbol, data)
+
+    def _load(self, kind: str, symbol: str) -> _SymbolData:
+        key = (kind, symbol)
+        with self._lock:
+            data = self._symbols.get(key)
+            if data is not None:
+                return data
+            frame, covered = pd.DataFrame(), []
+            parquet_path, meta_path = self._paths(kind, symbol)
+            try:
+                if os.path.exists(parquet_path) and os.path.exists(meta_path):
+                    frame = pd.read_parquet(parquet_path)
+                    with open(meta_path, "r", encoding="utf-8") as f:
+                        covered = [(self._parse_date(s), self._parse_date(e)) for s, e in json.load(f)["covered"]]
+            except Exception as e:
+                logger.warning(f"读取 {kind}:{symbol} 的本地日线数据失败，将重新获取: {str(e)}")
+                frame, covered = pd.DataFrame(), []
+            data = _SymbolData(frame, covered)
+            self._symbols[key] = data
+            return data
+
+    def _save(self, kind: str, symbol: str, data: _SymbolData):
+        parquet_path, meta_path = self._paths(kind, symbol)
+        os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+        try:
+            # 先写临时文件再替换，避免并发读取到写了一半的文件
+            if not data.frame.empty:
+                data.frame.to_parquet(parquet_path + ".tmp", index=False)
+                os.replace(parquet_path + ".tmp", parquet_path)
+            with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"covered": [(s.strftime("%Y%m%d"), e.strftime("%Y%m%d")) for s, e in data.covered]}, f)
+            os.replace(meta_path + ".tmp", meta_path)
+        except Exception as e:
+            logger.warning(f"保存 {kind}:{symbol} 的日线数据失败: {str(e)}")
+
+    def _paths(self, kind: str, symbol: str) -> Tuple[str, str]:
+        base = os.path.join(self.root, kind, symbol)
+        return base + ".parquet", base + ".json"
+
+    def _settled_date(self) -> date:
+        now = datetime.now()
+        if now.time() >= self.settle_time:
+            return now.date()
+        return now.date() - timedelta(days=1)
+
+    @staticmethod
+    def _parse_date(value: str) -> date:
+        return datetime.strptime(str(value).replace("-", ""), "%Y%m%d").date()
+
+    @staticmethod
+    def _missing(covered: List[Interval], start: date, end: date) -> List[Interval]:
+        missing = []
+        cursor = start
+        for a, b in covered:
+            if b < cursor:
+                continue
+            if a > end:
+                break
+            if a > cursor:
+                missing.append((cursor, a - timedelta(days=1)))
+            cursor = max(cursor, b + timedelta(days=1))
+            if cursor > end:
+                break
+        if cursor <= end:
+            missing.append((cursor, end))
+        return missing
+
+    @staticmethod
+    def _merge(intervals: List[Interval]) -> List[Interval]:
+        merged: List[Interval] = []
+        for a, b in sorted(intervals):
+            if merged and a <= merged[-1][1] + timedelta(days=1):
+                merged[-1] = (merged[-1][0], max(merged[-1][1], b))
+            else:
+                merged.append((a, b))
+        return merged
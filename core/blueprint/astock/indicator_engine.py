@@ -0,0 +1,207 @@
+import warnings
+from typing import Dict, List, Optional, Union
+import numpy as np
+import pandas as pd
+
+ArrayLike = Union[int, np.ndarray]
+
+INDICATORS = ['RSI', 'MACD', 'MACD_signal', 'BB_upper', 'BB_lower', 'MA20', 'MA50',
+              'ATR', 'Stoch_K', 'Stoch_D', 'RSI_9', 'OBV', 'Momentum', 'ADL', 'Williams_R']
+
+
+class IndicatorPanel:
+    """
+    把多只股票的日线数据按最后一个交易日右对齐，拼成 (股票数 × 天数) 的矩阵，
+    较短的序列左侧用 NaN 补齐。只读取输入的 DataFrame，不会修改它们。
+    """
+    def __init__(self, frames: Dict[str, pd.DataFrame], close: str = '收盘', high: str = '最高',
+                 low: str = '最低', volume: str = '成交量', amount: Optional[str] = '成交额'):
+        self.symbols: List[str] = list(frames)
+        self.lengths = np.array([len(df) for df in frames.values()], dtype=np.int64)
+        days = int(self.lengths.max()) if len(self.lengths) else 0
+        self.close = self._stack(frames, close, days)
+        self.high = self._stack(frames, high, days)
+        self.low = self._stack(frames, low, days)
+        self.volume = self._stack(frames, volume, days)
+        self.amount = self._stack(frames, amount, days) if amount else None
+
+    @property
+    def shape(self):
+        return self.close.shape
+
+    @staticmethod
+    def _stack(frames: Dict[str, pd.DataFrame], column: str, days: int) -> np.ndarray:
+        values = np.full((len(frames), days), np.nan)
+        for i, df in enumerate(frames.values()):
+            if len(df):
+                values[i, days - len(df):] = df[column].to_numpy(dtype=np.float64)
+        return values
+
+
+class IndicatorEngine:
+    """
+    对整个面板一次性计算技术指标的最新值，计算方式与 ta 库一致。
+    滑动窗口类指标只计算最后一个窗口；EMA/RSI/ATR 这类递推指标按天递推，每一步对所有股票同时计算。
+    """
+    def latest(self, panel: IndicatorPanel) -> pd.DataFrame:
+        """返回 index 为股票代码、列为 INDICATORS 的最新指标值"""
+        with warnings.catch_warnings():
+            # 数据不足的行全部是 NaN，nanmean 等会给出警告，结果本来就应该是 NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return pd.DataFrame(self._latest(panel), index=panel.symbols, columns=INDICATORS)
+
+    def summary(self, panel: IndicatorPanel) -> pd.DataFrame:
+        """当前价格、区间最高/最低收盘价、平均成交量/成交额"""
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            data = {
+                "当前价格": panel.close[:, -1],
+                "最高收盘价": np.nanmax(panel.close, axis=1),
+                "最低收盘价": np.nanmin(panel.close, axis=1),
+                "平均成交量": np.nanmean(panel.volume, axis=1),
+            }
+            if panel.amount is not None:
+                data["平均成交额"] = np.nanmean(panel.amount, axis=1)
+        return pd.DataFrame(data, index=panel.symbols)
+
+    def _latest(self, p: IndicatorPanel) -> Dict[str, np.ndarray]:
+        lengths = p.lengths
+        macd, macd_signal = self.macd(p)
+        bb_window = np.minimum(20, lengths)
+        bb_mean = self._window_reduce(p.close, lengths, bb_window, np.nanmean)
+        bb_std = self._window_reduce(p.close, lengths, bb_window, lambda v, axis: np.nanstd(v, axis=axis))
+        stoch_k = np.stack([self.stoch_k(p, offset) for offset in (2, 1, 0)], axis=1)
+        stoch_d = np.where(np.isnan(stoch_k).any(axis=1), np.nan, stoch_k.mean(axis=1))
+        return {
+            'RSI': self.rsi(p.close, np.minimum(14, lengths)),
+            'MACD': macd,
+            'MACD_signal': macd_signal,
+            'BB_upper': bb_mean + 2 * bb_std,
+            'BB_lower': bb_mean - 2 * bb_std,
+            'MA20': self._window_reduce(p.close, lengths, np.minimum(20, lengths), np.nanmean),
+            'MA50': self._window_reduce(p.close, lengths, np.minimum(50, lengths), np.nanmean),
+            'ATR': self.atr(p, 14),
+            'Stoch_K': stoch_k[:, -1],
+            'Stoch_D': stoch_d,
+            'RSI_9': self.rsi(p.close, 9),
+            'OBV': self.obv(p),
+            'Momentum': self.roc(p.close, lengths, np.minimum(10, lengths)),
+            'ADL': self.adl(p),
+            'Williams_R': self.williams_r(p, np.minimum(14, lengths)),
+        }
+
+    @staticmethod
+    def _window_reduce(values: np.ndarray, lengths: np.ndarray, window: ArrayLike, func, offset: int = 0) -> np.ndarray:
+        """对每行以倒数第 offset+1 天结尾、长度为 window 的窗口做聚合，数据不足一个窗口时为 NaN"""
+        n, days = values.shape
+        window = np.broadcast_to(np.asarray(window), (n,))
+        end = days - offset
+        columns = np.arange(days)[None, :]
+        mask = (columns >= (end - window)[:, None]) & (columns < end)
+        result = func(np.where(mask, values, np.nan), axis=1)
+        return np.where(lengths - offset >= window, result, np.nan)
+
+    @staticmethod
+    def _ema(values: np.ndarray, alpha: ArrayLike, min_periods: ArrayLike) -> np.ndarray:
+        """pandas ewm(adjust=False) 的最新值，从每行第一个有效值开始递推"""
+        n, days = values.shape
+        alpha = np.broadcast_to(np.asarray(alpha, dtype=np.float64), (n,))
+        state = np.full(n, np.nan)
+        count = np.zeros(n, dtype=np.int64)
+        for t in range(days):
+            x = values[:, t]
+            valid = ~np.isnan(x)
+            state = np.where(valid, np.where(np.isnan(state), x, alpha * x + (1 - alpha) * state), state)
+            count += valid
+        return np.where(count >= min_periods, state, np.nan)
+
+    def rsi(self, close: np.ndarray, window: ArrayLike) -> np.ndarray:
+        diff = np.diff(close, axis=1, prepend=np.nan)
+        # 与 ta 一致：第一天的涨跌记为 0 而不是 NaN
+        up = np.where(np.isnan(close), np.nan, np.where(diff > 0, diff, 0.0))
+        down = np.where(np.isnan(close), np.nan, np.where(diff < 0, -diff, 0.0))
+        alpha = 1.0 / np.asarray(window, dtype=np.float64)
+        up_ema = self._ema(up, alpha, window)
+        down_ema = self._ema(down, alpha, window)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100 - 100 / (1 + up_ema / down_ema)
+        return np.where(down_ema == 0, 100.0, rsi)
+
+    def macd(self, p: IndicatorPanel, fast: int = 12, slow: int = 26, signal: int = 9):
+        n, days = p.close.shape
+        fast_alpha, slow_alpha, signal_alpha = 2 / (fast + 1), 2 / (slow + 1), 2 / (signal + 1)
+        fast_ema = np.full(n, np.nan)
+        slow_ema = np.full(n, np.nan)
+        signal_ema = np.full(n, np.nan)
+        count = np.zeros(n, dtype=np.int64)
+        signal_count = np.zeros(n, dtype=np.int64)
+        macd = np.full(n, np.nan)
+        for t in range(days):
+            x = p.close[:, t]
+            valid = ~np.isnan(x)
+            fast_ema = np.where(valid, np.where(np.isnan(fast_ema), x, fast_alpha * x + (1 - fast_alpha) * fast_ema), fast_ema)
+            slow_ema = np.where(valid, np.where(np.isnan(slow_ema), x, slow_alpha * x + (1 - slow_alpha) * slow_ema), slow_ema)
+            count += valid
+            # 快慢线都满足 min_periods 之后才有 MACD，信号线从第一个 MACD 值开始递推
+            macd = np.where(valid & (count >= slow), fast_ema - slow_ema, np.nan)
+            has_macd = ~np.isnan(macd)
+            signal_ema = np.where(has_macd, np.where(np.isnan(signal_ema), macd,
+                                                     signal_alpha * macd + (1 - signal_alpha) * signal_ema), signal_ema)
+            signal_count += has_macd
+        return macd, np.where(signal_count >= signal, signal_ema, np.nan)
+
+    def atr(self, p: IndicatorPanel, window: int = 14) -> np.ndarray:
+        prev_close = np.concatenate([np.full((p.close.shape[0], 1), np.nan), p.close[:, :-1]], axis=1)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            true_range = np.nanmax(np.stack([p.high - p.low, np.abs(p.high - prev_close), np.abs(p.low - prev_close)]), axis=0)
+        n, days = true_range.shape
+        atr = np.zeros(n)
+        total = np.zeros(n)
+        count = np.zeros(n, dtype=np.int64)
+        for t in range(days):
+            tr = true_range[:, t]
+            valid = ~np.isnan(tr)
+            count += valid
+            total = np.where(valid & (count <= window), total + np.nan_to_num(tr), total)
+            # 第 window 天取前 window 天的平均值，之后按 Wilder 平滑递推
+            atr = np.where(valid & (count == window), total / window, atr)
+            atr = np.where(valid & (count > window), (atr * (window - 1) + np.nan_to_num(tr)) / window, atr)
+        return np.where(count >= window, atr, np.nan)
+
+    def stoch_k(self, p: IndicatorPanel, offset: int = 0, window: int = 14) -> np.ndarray:
+        lowest = self._window_reduce(p.low, p.lengths, window, np.nanmin, offset)
+        highest = self._window_reduce(p.high, p.lengths, window, np.nanmax, offset)
+        close = p.close[:, p.close.shape[1] - 1 - offset] if p.close.shape[1] > offset else np.full(len(p.lengths), np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return 100 * (close - lowest) / (highest - lowest)
+
+    def williams_r(self, p: IndicatorPanel, window: ArrayLike = 14) -> np.ndarray:
+        lowest = self._window_reduce(p.low, p.lengths, window, np.nanmin)
+        highest = self._window_reduce(p.high, p.lengths, window, np.nanmax)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return -100 * (highest - p.close[:, -1]) / (highest - lowest)
+
+    @staticmethod
+    def roc(close: np.ndarray, lengths: np.ndarray, window: ArrayLike) -> np.ndarray:
+        n, days = close.shape
+        window = np.broadcast_to(np.asarray(window), (n,))
+        index = np.clip(days - 1 - window, 0, None)
+        previous = np.take_along_axis(close, index[:, None], axis=1)[:, 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            roc = (close[:, -1] - previous) / previous * 100
+        return np.where(lengths > window, roc, np.nan)
+
+    @staticmethod
+    def obv(p: IndicatorPanel) -> np.ndarray:
+        prev_close = np.concatenate([np.full((p.close.shape[0], 1), np.nan), p.close[:, :-1]], axis=1)
+        signed = np.where(p.close < prev_close, -p.volume, p.volume)
+        return np.nansum(signed, axis=1)
+
+    @staticmethod
+    def adl(p: IndicatorPanel) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            clv = ((p.close - p.low) - (p.high - p.close)) / (p.high - p.low)
+        valid = ~np.isnan(p.close)
+        clv = np.where(valid & np.isnan(clv), 0.0, clv)
+        return np.nansum(clv * p.volume, axis=1)
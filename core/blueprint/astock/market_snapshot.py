@@ -0,0 +1,122 @@
+import threading
+from datetime import datetime, time as dtime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+import pandas as pd
+import pytz
+import akshare as ak
+from core.utils.single_ton import Singleton
+from core.utils.log import logger
+from .batch_fetcher import rate_limiter
+from .trading_calendar import TradingCalendar
+
+TIMEZONE = pytz.timezone('Asia/Shanghai')
+# 集合竞价开始到收盘，这段时间内行情会变化
+SESSIONS = [(dtime(9, 15), dtime(11, 30)), (dtime(13, 0), dtime(15, 0))]
+
+
+class MarketSnapshot(metaclass=Singleton):
+    """
+    全市场 A 股实时行情快照（ak.stock_zh_a_spot_em），所有调用方共用一份。
+    交易时段内快照在 spot_snapshot_ttl 秒（默认 30）后过期；
+    非交易时段行情不变，快照保留到下一个交易时段开始，最长 spot_snapshot_closed_ttl 秒（默认 6 小时）。
+    每次刷新时建立 代码 -> 行号 的索引，按代码查询不需要扫描整张表。
+    返回的 DataFrame 是共享的，需要修改时先 copy()。
+    """
+    def __init__(self, ttl: Optional[int] = None, closed_ttl: Optional[int] = None):
+        from core.utils.config_setting import Config
+        config = Config()
+        if ttl is None:
+            ttl = int(config.get("spot_snapshot_ttl")) if config.has_key("spot_snapshot_ttl") else 30
+        if closed_ttl is None:
+            closed_ttl = int(config.get("spot_snapshot_closed_ttl")) if config.has_key("spot_snapshot_closed_ttl") else 6 * 3600
+        self.ttl = timedelta(seconds=ttl)
+        self.closed_ttl = timedelta(seconds=closed_ttl)
+        self.frame: Optional[pd.DataFrame] = None
+        self.fetched_at: Optional[datetime] = None
+        self.expires_at: Optional[datetime] = None
+        self._state: Optional[Tuple[pd.DataFrame, Dict[str, int]]] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> pd.DataFrame:
+        """返回当前快照，过期时刷新；多个线程同时刷新时只请求一次"""
+        return self._current()[0]
+
+    def refresh(self) -> pd.DataFrame:
+        """忽略有效期，立即刷新"""
+        with self._lock:
+            self._refresh()
+            return self.frame
+
+    def row(self, symbol: str) -> Optional[pd.Series]:
+        """按代码取一行，不存在时返回 None"""
+        frame, positions = self._current()
+        position = positions.get(self._normalize(symbol))
+        if position is None:
+            return None
+        return frame.iloc[position]
+
+    def rows(self, symbols: Iterable[str]) -> pd.DataFrame:
+        """按代码批量取行，保持 symbols 的顺序，不存在的代码被忽略"""
+        frame, positions = self._current()
+        return frame.iloc[[positions[code] for code in map(self._normalize, symbols) if code in positions]]
+
+    def price(self, symbol: str) -> Optional[float]:
+        row = self.row(symbol)
+        if row is None or pd.isna(row['最新价']):
+            return None
+        return float(row['最新价'])
+
+    def _current(self):
+        # frame 和索引总是成对替换，读取时一起取出，避免拿到不同批次的数据
+        state = self._state
+        if state is not None and self._now() < self.expires_at:
+            return state
+        with self._lock:
+            if self._state is None or self._now() >= self.expires_at:
+                self._refresh()
+            return self._state
+
+    def _refresh(self):
+        rate_limiter("eastmoney").acquire()
+        frame = ak.stock_zh_a_spot_em()
+        now = self._now()
+        positions = {code: i for i, code in enumerate(frame['代码'].astype(str))}
+        self._state = (frame, positions)
+        self.frame = frame
+        self.fetched_at = now
+        self.expires_at = self._expires_at(now)
+        logger.debug(f"刷新全市场行情快照，共 {len(frame)} 条，有效期至 {self.expires_at}")
+
+    def _expires_at(self, now: datetime) -> datetime:
+        if self.is_trading_time(now):
+            return now + self.ttl
+        return min(now + self.closed_ttl, self._next_session_start(now))
+
+    @staticmethod
+    def is_trading_time(now: Optional[datetime] = None) -> bool:
+        now = now or MarketSnapshot._now()
+        if not TradingCalendar().is_trading_day(now):
+            return False
+        return any(start <= now.time() < end for start, end in SESSIONS)
+
+    @staticmethod
+    def _next_session_start(now: datetime) -> datetime:
+        day = now
+        while True:
+            if TradingCalendar().is_trading_day(day):
+                for start, _ in SESSIONS:
+                    candidate = day.replace(hour=start.hour, minute=start.minute, second=0, microsecond=0)
+                    if candidate > now:
+                        return candidate
+            day = (day + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(TIMEZONE)
+
+    @staticmethod
+    def _normalize(symbol: str) -> str:
+        symbol = str(symbol)
+        if "." in symbol:
+            symbol = symbol.split(".")[0]
+        return symbol
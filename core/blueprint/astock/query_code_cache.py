@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+import pandas as pd
+from core.utils.single_ton import Singleton
+from core.utils.log import logger
+
+
+class QueryCodeCache(metaclass=Singleton):
+    """
+    LLM 生成的 DataFrame 筛选代码的持久化缓存。
+    key 由 (用途, 规范化后的查询, DataFrame 列名和类型的指纹) 组成：同样的查询作用于同样结构的数据时
+    直接用缓存的代码处理最新的数据，不再调用 LLM；列结构变化后 key 随之变化。
+    只保存执行成功并通过检查的代码，条目数超过 query_code_cache_size（默认 1000）时淘汰最久未使用的。
+    """
+    def __init__(self, cache_file_path: str = './json/query_code_cache.json', max_entries: Optional[int] = None):
+        if max_entries is None:
+            from core.utils.config_setting import Config
+            config = Config()
+            max_entries = int(config.get("query_code_cache_size")) if config.has_key("query_code_cache_size") else 1000
+        self.cache_file_path = cache_file_path
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """全角转半角、小写、合并空白"""
+        return " ".join(unicodedata.normalize("NFKC", query).lower().split())
+
+    @staticmethod
+    def fingerprint(df: pd.DataFrame) -> str:
+        schema = [(str(column), str(dtype)) for column, dtype in df.dtypes.items()]
+        return hashlib.sha1(json.dumps(schema, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+    def key(self, kind: str, query: str, df: pd.DataFrame) -> str:
+        return f"{kind}|{self.fingerprint(df)}|{self.normalize(query)}"
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            return entry["code"]
+
+    def put(self, key: str, query: str, code: str):
+        with self._lock:
+            self.entries[key] = {"query": query, "code": code}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._save()
+
+    def discard(self, key: str):
+        with self._lock:
+            if self.entries.pop(key, None) is not None:
+                self._save()
+
+    def _load(self):
+        try:
+            if os.path.exists(self.cache_file_path):
+                with open(self.cache_file_path, 'r', encoding='utf-8') as f:
+                    self.entries = OrderedDict(json.load(f))
+        except Exception as e:
+            logger.warning(f"读取查询代码缓存失败: {str(e)}")
+            self.entries = OrderedDict()
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_file_path) or ".", exist_ok=True)
+            with open(self.cache_file_path + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=2)
+            os.replace(self.cache_file_path + ".tmp", self.cache_file_path)
+        except Exception as e:
+            logger.warning(f"保存查询代码缓存失败: {str(e)}")
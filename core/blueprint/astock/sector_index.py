@@ -0,0 +1,187 @@
+import os
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+import akshare as ak
+from core.utils.single_ton import Singleton
+from core.utils.log import logger
+from .batch_fetcher import BatchFetcher, RateLimiter
+
+# 板块名称 -> (板块代码, 公司家数, 成分股代码)
+Boards = Dict[str, Tuple[str, Optional[int], Tuple[str, ...]]]
+
+
+class SectorIndex(metaclass=Singleton):
+    """
+    行业板块成分股的双向索引：股票代码 -> 所属行业，行业 -> 成分股代码。
+    数据来自 ak.stock_board_industry_name_em / ak.stock_board_industry_cons_em，保存在本地文件中。
+
+    更新在后台线程中进行，查询使用上一次完整的数据，不等待更新；只有第一次启动、没有任何数据时才等待更新完成：
+    - 板块列表与上次相比，只重新获取新增的板块和公司家数变化的板块，其余沿用上次的成分股；
+      距上次全量更新超过 sector_full_refresh_days 天（默认 7）时重新获取全部板块
+    - 成分股通过 BatchFetcher 获取，但使用自己的线程池（sector_index_workers，默认 2）和限速
+      （sector_index_rate，每秒请求数，默认 2），不挤占用户请求的线程池和 eastmoney 的请求额度；
+      获取失败的板块保留上次的数据
+    - 更新完成后一次性替换索引，文件先写临时文件再替换
+    """
+    def __init__(self, cache_file_path: str = './json/sector.pickle', max_age: Optional[timedelta] = None,
+                 full_refresh_age: Optional[timedelta] = None):
+        from core.utils.config_setting import Config
+        config = Config()
+        if max_age is None:
+            hours = float(config.get("sector_index_max_age_hours")) if config.has_key("sector_index_max_age_hours") else 24
+            max_age = timedelta(hours=hours)
+        if full_refresh_age is None:
+            days = float(config.get("sector_full_refresh_days")) if config.has_key("sector_full_refresh_days") else 7
+            full_refresh_age = timedelta(days=days)
+        workers = int(config.get("sector_index_workers")) if config.has_key("sector_index_workers") else 2
+        rate = float(config.get("sector_index_rate")) if config.has_key("sector_index_rate") else 2.0
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="sector-index")
+        self._limiter = RateLimiter(rate)
+        self.cache_file_path = cache_file_path
+        self.max_age = max_age
+        self.full_refresh_age = full_refresh_age
+        self.boards: Boards = {}
+        self.updated_at: Optional[datetime] = None
+        self.full_refreshed_at: Optional[datetime] = None
+        self.attempted_at: Optional[datetime] = None
+        # (股票 -> 行业, 行业 -> 股票) 成对替换
+        self._index: Tuple[Dict[str, Tuple[str, ...]], Dict[str, Tuple[str, ...]]] = ({}, {})
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._load()
+
+    def sectors_of(self, symbol: str) -> List[str]:
+        """股票所属的行业，没有数据时返回空列表；数据过期时在后台更新"""
+        self.ensure_fresh(wait=self.empty)
+        return list(self._index[0].get(str(symbol), ()))
+
+    def symbols_of(self, sector: str) -> List[str]:
+        """行业的成分股代码，没有数据时返回空列表；数据过期时在后台更新"""
+        self.ensure_fresh(wait=self.empty)
+        return list(self._index[1].get(sector, ()))
+
+    def sectors(self) -> List[str]:
+        self.ensure_fresh(wait=self.empty)
+        return list(self._index[1])
+
+    def __len__(self) -> int:
+        return len(self._index[0])
+
+    @property
+    def empty(self) -> bool:
+        return not self._index[0]
+
+    @property
+    def updating(self) -> bool:
+        worker = self._worker
+        return worker is not None and worker.is_alive()
+
+    def ensure_fresh(self, wait: bool = False):
+        """数据过期时启动更新；wait=True 时等待正在进行的更新完成"""
+        # 更新失败时十分钟内不再重试
+        now = datetime.now()
+        if self.attempted_at is not None and now - self.attempted_at < timedelta(minutes=10):
+            worker = self._worker
+            if wait and worker is not None:
+                worker.join()
+            return
+        if self.updated_at is None or now - self.updated_at >= self.max_age:
+            self.refresh(wait=wait)
+
+    def refresh(self, wait: bool = False, full: bool = False) -> Optional[threading.Thread]:
+        """启动后台更新，已经在更新时不重复启动；wait=True 时等待更新完成"""
+        with self._lock:
+            if not self.updating:
+                self.attempted_at = datetime.now()
+                self._worker = threading.Thread(target=self._update, args=(full,), name="sector-index", daemon=True)
+                self._worker.start()
+            worker = self._worker
+        if wait:
+            worker.join()
+        return worker
+
+    def _update(self, full: bool):
+        try:
+            industry_df = ak.stock_board_industry_name_em()
+            now = datetime.now()
+            full = full or self.full_refreshed_at is None or now - self.full_refreshed_at >= self.full_refresh_age
+            previous = self.boards
+            boards: Boards = {}
+            stale = []
+            for _, industry in industry_df.iterrows():
+                name = industry['板块名称']
+                count = int(industry['公司家数']) if pd.notna(industry.get('公司家数')) else None
+                old = previous.get(name)
+                if full or old is None or count is None or old[1] != count:
+                    stale.append(name)
+                    boards[name] = (industry['板块代码'], count, old[2] if old else ())
+                else:
+                    boards[name] = old
+
+            batch = BatchFetcher().fetch(self._fetch_members, stale, host="eastmoney", executor=self._executor)
+            for name, cons_df in batch.results.items():
+                code, count, _ = boards[name]
+                boards[name] = (code, count, tuple(str(c) for c in cons_df['代码'].values))
+            for name in batch.errors:
+                # 失败的板块保留上次的成分股，公司家数也用上次的，下次更新时会再次获取
+                old = previous.get(name)
+                code = boards[name][0]
+                boards[name] = (code, old[1], old[2]) if old else (code, None, ())
+
+            self._publish(boards, now, now if full and batch.ok else self.full_refreshed_at)
+            self._save()
+            removed = len(set(previous) - set(boards))
+            logger.info(f"行业板块索引已更新：{len(boards)} 个板块，重新获取 {len(stale)} 个，"
+                        f"失败 {len(batch.errors)} 个，移除 {removed} 个，共 {len(self)} 只股票")
+        except Exception as e:
+            logger.error(f"更新行业板块索引失败: {str(e)}")
+
+    def _fetch_members(self, name: str) -> pd.DataFrame:
+        # 先经过后台更新自己的限速器，再经过 eastmoney 共用的限速器
+        self._limiter.acquire()
+        return ak.stock_board_industry_cons_em(symbol=name)
+
+    def _publish(self, boards: Boards, updated_at: Optional[datetime], full_refreshed_at: Optional[datetime]):
+        symbol_to_sectors: Dict[str, List[str]] = {}
+        sector_to_symbols: Dict[str, Tuple[str, ...]] = {}
+        for name, (_, _, members) in boards.items():
+            sector_to_symbols[name] = members
+            for symbol in members:
+                symbol_to_sectors.setdefault(symbol, []).append(name)
+        self._index = ({symbol: tuple(names) for symbol, names in symbol_to_sectors.items()}, sector_to_symbols)
+        self.boards = boards
+        self.updated_at = updated_at
+        self.full_refreshed_at = full_refreshed_at
+
+    def _load(self):
+        try:
+            if not os.path.exists(self.cache_file_path):
+                return
+            with open(self.cache_file_path, 'rb') as f:
+                data = pickle.load(f)
+            if "boards" in data:
+                self._publish(data["boards"], data["updated_at"], data["full_refreshed_at"])
+            else:
+                # 旧格式：股票代码 -> "行业1, 行业2"，没有板块代码和公司家数，下次更新时全部重新获取
+                members: Dict[str, List[str]] = {}
+                for symbol, names in data.items():
+                    for name in names.split(", "):
+                        members.setdefault(name, []).append(symbol)
+                self._publish({name: ("", None, tuple(symbols)) for name, symbols in members.items()}, None, None)
+            logger.info(f"从 {self.cache_file_path} 加载行业板块索引，共 {len(self)} 只股票")
+        except Exception as e:
+            logger.warning(f"读取行业板块索引失败: {str(e)}")
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_file_path) or ".", exist_ok=True)
+            data = {"boards": self.boards, "updated_at": self.updated_at, "full_refreshed_at": self.full_refreshed_at}
+            with open(self.cache_file_path + ".tmp", 'wb') as f:
+                pickle.dump(data, f)
+            os.replace(self.cache_file_path + ".tmp", self.cache_file_path)
+        except Exception as e:
+            logger.error(f"保存行业板块索引失败: {str(e)}")
@@ -15,7 +15,15 @@ from core.interpreter.ast_code_runner import ASTCodeRunner
 from .baidu_news import BaiduFinanceAPI
 from .index_finder import index_finder
 from .stock_symbol_provider import StockSymbolProvider
-import ta
+from .historical_data_store import HistoricalDataStore
+from .batch_fetcher import BatchFetcher
+from .market_snapshot import MarketSnapshot
+from .indicator_engine import IndicatorEngine, IndicatorPanel
+from .trading_calendar import TradingCalendar, intraday, until_reported, until_settled
+from .summary_table import SummaryTable
+from .sector_index import SectorIndex
+from .query_code_cache import QueryCodeCache
+from core.utils.method_cache import cached
 from tenacity import retry,retry_if_exception,stop_after_attempt,wait_fixed,wait_exponential
 
 
@@ -30,27 +38,12 @@ class StockDataProvider:
         self.stock_finder = StockSymbolProvider()
         
         self.code_name_list = {}
-        self.previous_trading_date_cache = None
-        self.previous_trading_date_cache_time = None
-        self.latest_trading_date_cache = None
-        self.latest_trading_date_cache_time = None
-        self.cash_flow_cache = {}
-        self.profit_cache = {}
-        self.balance_sheet_cache = {}
-        self.forecast_cache = {}
-        self.report_cache = {}
-        self.comment_cache = {}
-        self.historical_data_cache = {}
-        self.rebound_stock_pool_cache = {}  
-        self.new_stock_pool_cache = {} 
-        self.strong_stock_pool_cache = {}  
-        self.previous_day_stock_pool_cache = {}
-        self.institutional_holdings_cache = {}
-        self.big_deal_cache = {}
-        self.sector_cache = {}
-        self.stock_lg_code_cache = {}
-        self.stock_sector_update_time = None
-        self.sector_cache_file_path = './json/sector.pickle'
+        self.trading_calendar = TradingCalendar()
+        self.historical_data_store = HistoricalDataStore()
+        self.batch_fetcher = BatchFetcher()
+        self.market_snapshot = MarketSnapshot()
+        self.sector_index = SectorIndex()
+        self.query_code_cache = QueryCodeCache()
         self.logger = logging.getLogger(__name__)
 
     def search_index_code(self,name:str)->str:
@@ -77,74 +70,11 @@ class StockDataProvider:
         """
         查询指定股票(symbol)的所属行业。
         """
-        # 如果缓存为空，尝试从文件加载
-        if not self.sector_cache:
-            self._load_sector_cache()
-
-        # 检查缓存中是否已存在该symbol的行业信息
-        if symbol in self.sector_cache:
-            return self.sector_cache[symbol]
-
-        # 如果缓存中没有，更新整个缓存
-        self._update_sector_cache()
-
-        # 再次检查缓存
-        return self.sector_cache.get(symbol, "未找到所属行业")
-
-    def _load_sector_cache(self):
-        """从文件加载缓存"""
-        try:
-            if os.path.exists(self.sector_cache_file_path):
-                with open(self.sector_cache_file_path, 'rb') as f:
-                    self.sector_cache = pickle.load(f)
-                self.logger.info(f"Loaded {len(self.sector_cache)} items from sector cache.")
-            else:
-                self.logger.info("Sector cache file does not exist. Will create a new one.")
-        except Exception as e:
-            self.logger.error(f"Error loading sector cache: {str(e)}")
-            self.sector_cache = {}
-
-    def _update_sector_cache(self):
-        """更新整个行业缓存"""
-        if self.stock_sector_update_time and datetime.now() - self.stock_sector_update_time < timedelta(days=1):
-            self.logger.info("Sector cache is up to date. Skipping update.")
-            return
-        try:
-            # 获取所有行业板块数据
-            industry_df = ak.stock_board_industry_name_em()
-            
-            new_cache = {}
-            for _, industry in industry_df.iterrows():
-                industry_code = industry['板块代码']
-                industry_name = industry['板块名称']
-
-                try:
-                    cons_df = ak.stock_board_industry_cons_em(symbol=industry_name)
-                    for code in cons_df['代码'].values:
-                        code_str = str(code)
-                        if code_str in new_cache:
-                            new_cache[code_str] += f", {industry_name}"
-                        else:
-                            new_cache[code_str] = industry_name
-                except Exception as e:
-                    self.logger.warning(f"Error fetching constituents for industry {industry_name}: {str(e)}")
-
-            # 更新缓存
-            self.sector_cache = new_cache
-            self._save_sector_cache()
-            self.stock_sector_update_time = datetime.now()
-            self.logger.info(f"Updated sector cache with {len(self.sector_cache)} items.")
-        except Exception as e:
-            self.logger.error(f"Error updating sector cache: {str(e)}")
-
-    def _save_sector_cache(self):
-        """保存缓存到文件"""
-        try:
-            with open(self.sector_cache_file_path, 'wb') as f:
-                pickle.dump(self.sector_cache, f)
-            self.logger.info(f"Saved {len(self.sector_cache)} items to sector cache file.")
-        except Exception as e:
-            self.logger.error(f"Error saving sector cache: {str(e)}")
+        # 行业索引在后台更新，这里读取最近一次完整的数据；第一次启动没有数据时等待更新完成
+        sectors = self.sector_index.sectors_of(symbol)
+        if sectors:
+            return ", ".join(sectors)
+        return "未找到所属行业"
 
     def get_macro_economic_indicators(self) -> str:
 
@@ -514,84 +444,25 @@ class StockDataProvider:
         
         return news_list
 
-    def _fetch_trading_dates(self):
-        # 获取当前时间
-        now = datetime.now()
-
-        # 定义今天的日期
-        today_str = now.strftime("%Y%m%d")
-        start_date_str = (now - timedelta(days=10)).strftime("%Y%m%d")
-
-        # 获取最近10天的交易数据，假设使用上证指数（000001.SH）
-        stock_data = ak.stock_zh_a_hist(symbol="000001", period="daily", start_date=start_date_str, end_date=today_str, adjust="")
-
-        # 提取交易日期
-        trading_dates = stock_data['日期'].apply(lambda x: x.strftime( "%Y%m%d")).tolist()
-        trading_dates.sort()
-        return trading_dates
-
     def get_previous_trading_date(self) -> str:
         """
         获取最近一个交易日，不包含今天的日期,返回str 格式：YYYYMMDD
         """
-        now = datetime.now()
-        
-        # 检查缓存是否有效
-        if self.previous_trading_date_cache and self.previous_trading_date_cache_time.date() == now.date():
-            return self.previous_trading_date_cache
-
-        trading_dates = self._fetch_trading_dates()  # 假设这个函数返回字符串列表
-
-        # 如果最近交易日期是今天，则返回上一个交易日期
-        today_str = now.strftime("%Y%m%d")
-        if trading_dates[-1] == today_str:
-            previous_trading_date = trading_dates[-2]
-        else:
-            previous_trading_date = trading_dates[-1]
-
-        self.previous_trading_date_cache = previous_trading_date
-        self.previous_trading_date_cache_time = now
-
-        return self.previous_trading_date_cache
+        return self.trading_calendar.previous_trading_day()
     
     def get_latest_trading_date(self) -> str:
         """
         获取最近一个交易日。返回str 格式：YYYYMMDD
         如果当前时间是9:30之后，则，最近包含今天，否则不包含
         """
-        now = datetime.now()
-        cache_valid = False
-
-        # 检查缓存是否有效
-        if self.latest_trading_date_cache and self.latest_trading_date_cache_time.date() == now.date():
-            if now.time() < datetime.strptime('09:30', '%H:%M').time():
-                if self.latest_trading_date_cache_time.time() < datetime.strptime('09:30', '%H:%M').time():
-                    cache_valid = True
-            else:
-                cache_valid = True
-
-        if cache_valid:
-            return self.latest_trading_date_cache
-
-        trading_dates = self._fetch_trading_dates()
-        include_today = now.time() >= datetime.strptime('09:30', '%H:%M').time()
-
-        if include_today and trading_dates[-1].strftime("%Y%m%d") == now.strftime("%Y%m%d"):
-            latest_trading_date = trading_dates[-1]
-        else:
-            latest_trading_date = trading_dates[-2] if trading_dates[-1].strftime("%Y%m%d") == now.strftime("%Y%m%d") else trading_dates[-1]
-
-        self.latest_trading_date_cache = latest_trading_date.strftime("%Y%m%d")
-        self.latest_trading_date_cache_time = now
-        return self.latest_trading_date_cache
+        return self.trading_calendar.latest_trading_day()
 
     def get_stock_big_deal(self, symbol: str) -> str:
         """
-        获取指定股票的大单追踪数据，并根据交易时间决定是否缓存结果。
+        获取指定股票的大单追踪数据。
 
-        在交易时间内（9:30 - 15:00），直接获取数据并返回，不进行缓存。
-        在非交易时间，如果缓存中有该股票的数据，则返回缓存数据；
-        如果缓存中没有，则获取数据后进行缓存，并返回格式化的结果。
+        全市场大单数据在交易时间内（9:15 - 15:00）每次重新获取；
+        非交易时间数据不再变化，缓存到下一个交易时段开始。
 
         Args:
             symbol (str): 要查询的股票代码（symbol）。
@@ -601,59 +472,35 @@ class StockDataProvider:
                  如果找不到对应的symbol，返回“暂时没有数据”。
                  如果数据获取失败，返回错误信息。
         """
-        # 检查并初始化big_deal_cache
-        if not hasattr(self, "big_deal_cache"):
-            self.big_deal_cache = {}
-
-        now = datetime.now()
-        market_open_time = now.replace(hour=9, minute=30, second=0, microsecond=0)
-        market_close_time = now.replace(hour=15, minute=0, second=0, microsecond=0)
+        try:
+            big_deal_table = self._big_deal_table()
+        except Exception as e:
+            return f"获取数据失败: {str(e)}"
 
-        # 判断是否在交易时间内
-        if market_open_time <= now <= market_close_time:
-            # 交易时间内，不进行缓存，直接获取数据
-            try:
-                stock_fund_flow_big_deal_df = ak.stock_fund_flow_big_deal()
-            except Exception as e:
-                return f"获取数据失败: {str(e)}"
-
-            # 查找并返回symbol对应的数据
-            result_row = stock_fund_flow_big_deal_df[stock_fund_flow_big_deal_df['股票代码'] == int(symbol)]
-            if not result_row.empty:
-                row = result_row.iloc[0]
-                formatted_row = (
-                    f"成交时间: {row['成交时间']}, 股票代码: {row['股票代码']}, 股票简称: {row['股票简称']}, "
-                    f"成交价格: {row['成交价格']}, 成交量: {row['成交量']}股, 成交额: {row['成交额']}万元, "
-                    f"大单性质: {row['大单性质']}, 涨跌幅: {row['涨跌幅']}, 涨跌额: {row['涨跌额']}"
-                )
-                return formatted_row
-            else:
-                return "暂时没有数据"
-        else:
-            # 非交易时间，从缓存中获取数据
-            if symbol in self.big_deal_cache:
-                return self.big_deal_cache[symbol]
-            else:
-                # 如果缓存中没有，则获取数据并缓存
-                try:
-                    stock_fund_flow_big_deal_df = ak.stock_fund_flow_big_deal()
-                except Exception as e:
-                    return f"获取数据失败: {str(e)}"
-
-                # 缓存数据
-                for index, row in stock_fund_flow_big_deal_df.iterrows():
-                    code = str(row['股票代码'])
-                    formatted_row = (
-                        f"成交时间: {row['成交时间']}, 股票代码: {row['股票代码']}, 股票简称: {row['股票简称']}, "
-                        f"成交价格: {row['成交价格']}, 成交量: {row['成交量']}股, 成交额: {row['成交额']}万元, "
-                        f"大单性质: {row['大单性质']}, 涨跌幅: {row['涨跌幅']}, 涨跌额: {row['涨跌额']}"
-                    )
-                    self.big_deal_cache[code] = formatted_row
-
-                if symbol in self.big_deal_cache:
-                    return self.big_deal_cache[symbol]
-                else:
-                    return "暂时没有数据"
+        # 股票代码列是整数，同一只股票有多笔大单时取第一笔
+        try:
+            code = int(symbol)
+        except ValueError:
+            return "暂时没有数据"
+        if code in big_deal_table:
+            return big_deal_table[code]
+        return "暂时没有数据"
+
+    @cached(ttl=intraday(300), maxsize=1)
+    def _big_deal_table(self) -> SummaryTable:
+        stock_fund_flow_big_deal_df = ak.stock_fund_flow_big_deal()
+        stock_fund_flow_big_deal_df = stock_fund_flow_big_deal_df.drop_duplicates('股票代码', keep='first')
+        return SummaryTable(stock_fund_flow_big_deal_df, '股票代码', [
+            ('成交时间', '成交时间', ''),
+            ('股票代码', '股票代码', ''),
+            ('股票简称', '股票简称', ''),
+            ('成交价格', '成交价格', ''),
+            ('成交量', '成交量', '股'),
+            ('成交额', '成交额', '万元'),
+            ('大单性质', '大单性质', ''),
+            ('涨跌幅', '涨跌幅', ''),
+            ('涨跌额', '涨跌额', ''),
+        ])
 
     def get_rebound_stock_pool(self, date: str = None) -> dict:
         """
@@ -668,10 +515,10 @@ class StockDataProvider:
         if not date:
             date = self.get_previous_trading_date()
         
-        # 检查缓存
-        if date in self.rebound_stock_pool_cache:
-            return self.rebound_stock_pool_cache[date]
+        return self._rebound_stock_pool(date)
 
+    @cached(ttl=until_settled, maxsize=32, disk=True)
+    def _rebound_stock_pool(self, date: str) -> dict:
         # 获取数据
         stock_pool_df = ak.stock_zt_pool_zbgc_em(date=date)
 
@@ -696,9 +543,6 @@ class StockDataProvider:
             )
             result[row['代码']] = stock_info
 
-        # 缓存结果
-        self.rebound_stock_pool_cache[date] = result
-
         return result
 
     def get_new_stock_pool(self, date: str = None) -> dict:
@@ -714,10 +558,10 @@ class StockDataProvider:
         if not date:
             date = self.get_previous_trading_date()
         
-        # 检查缓存
-        if date in self.new_stock_pool_cache:
-            return self.new_stock_pool_cache[date]
+        return self._new_stock_pool(date)
 
+    @cached(ttl=until_settled, maxsize=32, disk=True)
+    def _new_stock_pool(self, date: str) -> dict:
         # 获取数据
         new_stock_pool_df = ak.stock_zt_pool_sub_new_em(date=date)
 
@@ -742,9 +586,6 @@ class StockDataProvider:
             )
             result[row['代码']] = stock_info
 
-        # 缓存结果
-        self.new_stock_pool_cache[date] = result
-
         return result
 
     def get_strong_stock_pool(self, date: str = None) -> dict:
@@ -760,10 +601,10 @@ class StockDataProvider:
         if not date:
             date = self.get_previous_trading_date()
         
-        # 检查缓存
-        if date in self.strong_stock_pool_cache:
-            return self.strong_stock_pool_cache[date]
+        return self._strong_stock_pool(date)
 
+    @cached(ttl=until_settled, maxsize=32, disk=True)
+    def _strong_stock_pool(self, date: str) -> dict:
         # 获取数据
         strong_stock_pool_df = ak.stock_zt_pool_strong_em(date=date)
 
@@ -788,9 +629,6 @@ class StockDataProvider:
             )
             result[row['代码']] = stock_info
 
-        # 缓存结果
-        self.strong_stock_pool_cache[date] = result
-
         return result
 
     def get_previous_day_stock_pool(self, date: str = None) -> dict:
@@ -806,10 +644,10 @@ class StockDataProvider:
         if not date:
             date = self.get_previous_trading_date()
         
-        # 检查缓存
-        if date in self.previous_day_stock_pool_cache:
-            return self.previous_day_stock_pool_cache[date]
+        return self._previous_day_stock_pool(date)
 
+    @cached(ttl=until_settled, maxsize=32, disk=True)
+    def _previous_day_stock_pool(self, date: str) -> dict:
         # 获取数据
         previous_day_stock_pool_df = ak.stock_zt_pool_previous_em(date)
 
@@ -834,9 +672,6 @@ class StockDataProvider:
             )
             result[row['代码']] = stock_info
 
-        # 缓存结果
-        self.previous_day_stock_pool_cache[date] = result
-
         return result
 
     def get_market_anomaly(self, indicator: Literal['火箭发射', '快速反弹', '大笔买入', '封涨停板', '打开跌停板', '有大买盘', '竞价上涨', '高开5日线', '向上缺口', '60日新高', '60日大幅上涨', '加速下跌', '高台跳水', '大笔卖出', '封跌停板', '打开涨停板', '有大卖盘', '竞价下跌', '低开5日线', '向下缺口', '60日新低', '60日大幅下跌'] = '大笔买入') -> dict:
@@ -983,8 +818,8 @@ class StockDataProvider:
         获取下一个财报发布日期(即将发生的). 返回值：str 格式：yyyymmdd
 
         """
-        # 当前日期
-        today = datetime.today()
+        # 当前日期（北京时间）
+        today = datetime.strptime(self.trading_calendar.today(), "%Y%m%d")
         year = today.year
         month = today.month
 
@@ -1009,8 +844,8 @@ class StockDataProvider:
         获取最近的财报发布日期(已经发生的)。 返回值：str 格式：yyyymmdd
 
         """
-        # 当前日期
-        today = datetime.today()
+        # 当前日期（北京时间）
+        today = datetime.strptime(self.trading_calendar.today(), "%Y%m%d")
         year = today.year
         month = today.month
 
@@ -1164,11 +999,7 @@ class StockDataProvider:
             - 股息率TTM
             - 总市值
         """
-        if len(self.stock_lg_code_cache) == 0:
-            df = ak.stock_a_indicator_lg(symbol="all")
-            for _, row in df.iterrows():
-                self.stock_lg_code_cache[row['code']] = row['stock_name']
-        if symbol not in self.stock_lg_code_cache:
+        if symbol not in self._stock_lg_codes():
             return f"股票代码{symbol}暂无数据"
         # 获取数据
         data = ak.stock_a_indicator_lg(symbol=symbol)
@@ -1192,6 +1023,11 @@ class StockDataProvider:
         
         return stock_indicators_info
 
+    @cached(ttl=24 * 3600)
+    def _stock_lg_codes(self) -> Dict[str, str]:
+        df = ak.stock_a_indicator_lg(symbol="all")
+        return dict(zip(df['code'], df['stock_name']))
+
     def get_industry_pe_ratio(self, symbol: str, date: str = None) -> Dict[str, str]:
         """
         获取指定日期和行业分类的行业市盈率数据。
@@ -1599,33 +1435,28 @@ class StockDataProvider:
         # 获取最近的财报发行日期
         date = self.get_latest_financial_report_date()
 
-        # 检查缓存是否存在
-        if date in self.cash_flow_cache:
-            return self.cash_flow_cache[date]
-        
+        # 缓存的是按需格式化的 SummaryTable，对外返回普通字典
+        return self._cash_flow_statement_table(date).to_dict()
+
+    @cached(ttl=until_reported(3600), maxsize=8, disk=True)
+    def _cash_flow_statement_table(self, date: str) -> SummaryTable:
         # 获取数据
         data = ak.stock_xjll_em(date=date)
         
-        # 生成描述性字符串的字典
-        summary_dict = {}
-        for index, row in data.iterrows():
-            description = (
-                f"股票简称: {row['股票简称']}, "
-                f"净现金流: {row['净现金流-净现金流']}元, "
-                f"净现金流同比增长: {row['净现金流-同比增长']}%, "
-                f"经营性现金流净额: {row['经营性现金流-现金流量净额']}元, "
-                f"经营性现金流净额占比: {row['经营性现金流-净现金流占比']}%, "
-                f"投资性现金流净额: {row['投资性现金流-现金流量净额']}元, "
-                f"投资性现金流净额占比: {row['投资性现金流-净现金流占比']}%, "
-                f"融资性现金流净额: {row['融资性现金流-现金流量净额']}元, "
-                f"融资性现金流净额占比: {row['融资性现金流-净现金流占比']}%, "
-            )
-            summary_dict[row['股票代码']] = description
-        
-        # 缓存结果
-        self.cash_flow_cache[date] = summary_dict
-        
-        return summary_dict
+        # 只保存原始数据，按代码取值时才格式化
+        summary_table = SummaryTable(data, '股票代码', [
+            ('股票简称', '股票简称', ''),
+            ('净现金流', '净现金流-净现金流', '元'),
+            ('净现金流同比增长', '净现金流-同比增长', '%'),
+            ('经营性现金流净额', '经营性现金流-现金流量净额', '元'),
+            ('经营性现金流净额占比', '经营性现金流-净现金流占比', '%'),
+            ('投资性现金流净额', '投资性现金流-现金流量净额', '元'),
+            ('投资性现金流净额占比', '投资性现金流-净现金流占比', '%'),
+            ('融资性现金流净额', '融资性现金流-现金流量净额', '元'),
+            ('融资性现金流净额占比', '融资性现金流-净现金流占比', '%'),
+        ], trailing=', ')
+        
+        return summary_table
 
     def get_profit_statement_summary(self) -> dict:
         """
@@ -1649,36 +1480,30 @@ class StockDataProvider:
         """
         date = self.get_latest_financial_report_date()
 
-        # 检查缓存是否存在
-        if date in self.profit_cache:
-            return self.profit_cache[date]
-        
+        return self._profit_statement_table(date).to_dict()
+
+    @cached(ttl=until_reported(3600), maxsize=8, disk=True)
+    def _profit_statement_table(self, date: str) -> SummaryTable:
         # 获取数据
         data = ak.stock_lrb_em(date=date)
         
-        # 生成描述性字符串的字典
-        summary_dict = {}
-        for index, row in data.iterrows():
-            description = (
-                f"股票简称: {row['股票简称']}, "
-                f"净利润: {row['净利润']}元, "
-                f"净利润同比: {row['净利润同比']}%, "
-                f"营业总收入: {row['营业总收入']}元, "
-                f"营业总收入同比: {row['营业总收入同比']}%, "
-                f"营业总支出-营业支出: {row['营业总支出-营业支出']}元, "
-                f"营业总支出-销售费用: {row['营业总支出-销售费用']}元, "
-                f"营业总支出-管理费用: {row['营业总支出-管理费用']}元, "
-                f"营业总支出-财务费用: {row['营业总支出-财务费用']}元, "
-                f"营业总支出-营业总支出: {row['营业总支出-营业总支出']}元, "
-                f"营业利润: {row['营业利润']}元, "
-                f"利润总额: {row['利润总额']}元, "
-            )
-            summary_dict[row['股票代码']] = description
-        
-        # 缓存结果
-        self.profit_cache[date] = summary_dict
-        
-        return summary_dict
+        # 只保存原始数据，按代码取值时才格式化
+        summary_table = SummaryTable(data, '股票代码', [
+            ('股票简称', '股票简称', ''),
+            ('净利润', '净利润', '元'),
+            ('净利润同比', '净利润同比', '%'),
+            ('营业总收入', '营业总收入', '元'),
+            ('营业总收入同比', '营业总收入同比', '%'),
+            ('营业总支出-营业支出', '营业总支出-营业支出', '元'),
+            ('营业总支出-销售费用', '营业总支出-销售费用', '元'),
+            ('营业总支出-管理费用', '营业总支出-管理费用', '元'),
+            ('营业总支出-财务费用', '营业总支出-财务费用', '元'),
+            ('营业总支出-营业总支出', '营业总支出-营业总支出', '元'),
+            ('营业利润', '营业利润', '元'),
+            ('利润总额', '利润总额', '元'),
+        ], trailing=', ')
+        
+        return summary_table
 
     def get_latest_market_fund_flow(self) -> Dict:
         """
@@ -1717,37 +1542,31 @@ class StockDataProvider:
         """
         date = self.get_latest_financial_report_date()
 
-        # 检查缓存是否存在
-        if date in self.balance_sheet_cache:
-            return self.balance_sheet_cache[date]
-        
+        return self._balance_sheet_table(date).to_dict()
+
+    @cached(ttl=until_reported(3600), maxsize=8, disk=True)
+    def _balance_sheet_table(self, date: str) -> SummaryTable:
         # 获取数据
         data = ak.stock_zcfz_em(date=date)
         
-        # 生成描述性字符串的字典
-        summary_dict = {}
-        for index, row in data.iterrows():
-            description = (
-                f"股票简称: {row['股票简称']}, "
-                f"资产-货币资金: {row['资产-货币资金']}元, "
-                f"资产-应收账款: {row['资产-应收账款']}元, "
-                f"资产-存货: {row['资产-存货']}元, "
-                f"资产-总资产: {row['资产-总资产']}元, "
-                f"资产-总资产同比: {row['资产-总资产同比']}%, "
-                f"负债-应付账款: {row['负债-应付账款']}元, "
-                f"负债-总负债: {row['负债-总负债']}元, "
-                f"负债-预收账款: {row['负债-预收账款']}元, "
-                f"负债-总负债同比: {row['负债-总负债同比']}%, "
-                f"资产负债率: {row['资产负债率']}%, "
-                f"股东权益合计: {row['股东权益合计']}元, "
-                f"公告日期: {row['公告日期']}"
-            )
-            summary_dict[row['股票代码']] = description
-        
-        # 缓存结果
-        self.balance_sheet_cache[date] = summary_dict
-        
-        return summary_dict
+        # 只保存原始数据，按代码取值时才格式化
+        summary_table = SummaryTable(data, '股票代码', [
+            ('股票简称', '股票简称', ''),
+            ('资产-货币资金', '资产-货币资金', '元'),
+            ('资产-应收账款', '资产-应收账款', '元'),
+            ('资产-存货', '资产-存货', '元'),
+            ('资产-总资产', '资产-总资产', '元'),
+            ('资产-总资产同比', '资产-总资产同比', '%'),
+            ('负债-应付账款', '负债-应付账款', '元'),
+            ('负债-总负债', '负债-总负债', '元'),
+            ('负债-预收账款', '负债-预收账款', '元'),
+            ('负债-总负债同比', '负债-总负债同比', '%'),
+            ('资产负债率', '资产负债率', '%'),
+            ('股东权益合计', '股东权益合计', '元'),
+            ('公告日期', '公告日期', ''),
+        ])
+        
+        return summary_table
 
     def get_stock_info_df(self,symbol:str)->pd.DataFrame:
         """
@@ -1845,33 +1664,27 @@ class StockDataProvider:
         """
         date = self.get_latest_financial_report_date()
 
-        # 检查缓存是否存在
-        if date in self.forecast_cache:
-            return self.forecast_cache[date]
-        
+        return self._financial_forecast_table(date).to_dict()
+
+    @cached(ttl=until_reported(3600), maxsize=8, disk=True)
+    def _financial_forecast_table(self, date: str) -> SummaryTable:
         # 获取数据
         data = ak.stock_yjyg_em(date=date)
         
-        # 生成描述性字符串的字典
-        summary_dict = {}
-        for index, row in data.iterrows():
-            description = (
-                f"股票简称: {row['股票简称']}, "
-                f"预测指标: {row['预测指标']}, "
-                f"业绩变动: {row['业绩变动']}, "
-                f"预测数值: {row['预测数值']}元, "
-                f"业绩变动幅度: {row['业绩变动幅度']}%, "
-                f"业绩变动原因: {row['业绩变动原因']}, "
-                f"预告类型: {row['预告类型']}, "
-                f"上年同期值: {row['上年同期值']}元, "
-                f"公告日期: {row['公告日期']}"
-            )
-            summary_dict[row['股票代码']] = description
-        
-        # 缓存结果
-        self.forecast_cache[date] = summary_dict
-        
-        return summary_dict
+        # 只保存原始数据，按代码取值时才格式化
+        summary_table = SummaryTable(data, '股票代码', [
+            ('股票简称', '股票简称', ''),
+            ('预测指标', '预测指标', ''),
+            ('业绩变动', '业绩变动', ''),
+            ('预测数值', '预测数值', '元'),
+            ('业绩变动幅度', '业绩变动幅度', '%'),
+            ('业绩变动原因', '业绩变动原因', ''),
+            ('预告类型', '预告类型', ''),
+            ('上年同期值', '上年同期值', '元'),
+            ('公告日期', '公告日期', ''),
+        ])
+        
+        return summary_table
 
     def get_financial_report_summary(self) -> dict:
         """
@@ -1896,38 +1709,32 @@ class StockDataProvider:
         """
         date = self.get_latest_financial_report_date()
 
-        # 检查缓存是否存在
-        if date in self.report_cache:
-            return self.report_cache[date]
-        
+        return self._financial_report_table(date).to_dict()
+
+    @cached(ttl=until_reported(3600), maxsize=8, disk=True)
+    def _financial_report_table(self, date: str) -> SummaryTable:
         # 获取数据
         data = ak.stock_yjbb_em(date=date)
         
-        # 生成描述性字符串的字典
-        summary_dict = {}
-        for index, row in data.iterrows():
-            description = (
-                f"股票简称: {row['股票简称']}, "
-                f"每股收益: {row['每股收益']}元, "
-                f"营业收入: {row['营业收入-营业收入']}元, "
-                f"营业收入同比增长: {row['营业收入-同比增长']}%, "
-                f"营业收入季度环比增长: {row['营业收入-季度环比增长']}%, "
-                f"净利润: {row['净利润-净利润']}元, "
-                f"净利润同比增长: {row['净利润-同比增长']}%, "
-                f"净利润季度环比增长: {row['净利润-季度环比增长']}%, "
-                f"每股净资产: {row['每股净资产']}元, "
-                f"净资产收益率: {row['净资产收益率']}%, "
-                f"每股经营现金流量: {row['每股经营现金流量']}元, "
-                f"销售毛利率: {row['销售毛利率']}%, "
-                f"所处行业: {row['所处行业']}, "
-                f"最新公告日期: {row['最新公告日期']}"
-            )
-            summary_dict[row['股票代码']] = description
-        
-        # 缓存结果
-        self.report_cache[date] = summary_dict
-        
-        return summary_dict
+        # 只保存原始数据，按代码取值时才格式化
+        summary_table = SummaryTable(data, '股票代码', [
+            ('股票简称', '股票简称', ''),
+            ('每股收益', '每股收益', '元'),
+            ('营业收入', '营业收入-营业收入', '元'),
+            ('营业收入同比增长', '营业收入-同比增长', '%'),
+            ('营业收入季度环比增长', '营业收入-季度环比增长', '%'),
+            ('净利润', '净利润-净利润', '元'),
+            ('净利润同比增长', '净利润-同比增长', '%'),
+            ('净利润季度环比增长', '净利润-季度环比增长', '%'),
+            ('每股净资产', '每股净资产', '元'),
+            ('净资产收益率', '净资产收益率', '%'),
+            ('每股经营现金流量', '每股经营现金流量', '元'),
+            ('销售毛利率', '销售毛利率', '%'),
+            ('所处行业', '所处行业', ''),
+            ('最新公告日期', '最新公告日期', ''),
+        ])
+        
+        return summary_table
 
     def get_top_holdings_by_market(self, market: Literal["北向", "沪股通", "深股通"] = "北向", indicator: Literal["今日排行", "3日排行", "5日排行", "10日排行", "月排行", "季排行", "年排行"] = "月排行") -> dict:
         """
@@ -1989,36 +1796,30 @@ class StockDataProvider:
             - 关注指数
             - 交易日
         """
-        # 检查缓存是否存在
-        if "stock_comments" in self.comment_cache:
-            return self.comment_cache["stock_comments"]
-        
+        return self._stock_comments_table().to_dict()
+
+    @cached(ttl=intraday(1800), maxsize=1)
+    def _stock_comments_table(self) -> SummaryTable:
         # 获取数据
         data = ak.stock_comment_em()
         
-        # 生成描述性字符串的字典
-        summary_dict = {}
-        for index, row in data.iterrows():
-            description = (
-                f"名称: {row['名称']}, "
-                f"最新价: {row['最新价']}, "
-                f"涨跌幅: {row['涨跌幅']}%, "
-                f"换手率: {row['换手率']}%, "
-                f"市盈率: {row['市盈率']}, "
-                f"主力成本: {row['主力成本']}, "
-                f"机构参与度: {row['机构参与度']}%, "
-                f"综合得分: {row['综合得分']}, "
-                f"上升: {row['上升']}, "
-                f"目前排名: {row['目前排名']}, "
-                f"关注指数: {row['关注指数']}, "
-                f"交易日: {row['交易日']}"
-            )
-            summary_dict[row['代码']] = description
-        
-        # 缓存结果
-        self.comment_cache["stock_comments"] = summary_dict
-        
-        return summary_dict
+        # 只保存原始数据，按代码取值时才格式化
+        summary_table = SummaryTable(data, '代码', [
+            ('名称', '名称', ''),
+            ('最新价', '最新价', ''),
+            ('涨跌幅', '涨跌幅', '%'),
+            ('换手率', '换手率', '%'),
+            ('市盈率', '市盈率', ''),
+            ('主力成本', '主力成本', ''),
+            ('机构参与度', '机构参与度', '%'),
+            ('综合得分', '综合得分', ''),
+            ('上升', '上升', ''),
+            ('目前排名', '目前排名', ''),
+            ('关注指数', '关注指数', ''),
+            ('交易日', '交易日', ''),
+        ])
+        
+        return summary_table
 
     def get_stock_profit_forecast(self, symbol: str) -> str:
         """
@@ -2030,33 +1831,34 @@ class StockDataProvider:
         返回:
         str: 格式化的盈利预测信息字符串
         """
-        if not hasattr(self, 'profit_forecast_cache'):
-            self.profit_forecast_cache = {}
-
-        if not self.profit_forecast_cache:
-            try:
-                df = ak.stock_profit_forecast_em()
-                for _, row in df.iterrows():
-                    code = row['代码']
-                    forecast_info = (
-                        f"名称: {row['名称']}, "
-                        f"研报数: {row['研报数']}, "
-                        f"机构投资评级(近六个月): 买入 {row['机构投资评级(近六个月)-买入']}%, "
-                        f"增持 {row['机构投资评级(近六个月)-增持']}%, "
-                        f"中性 {row['机构投资评级(近六个月)-中性']}%, "
-                        f"减持 {row['机构投资评级(近六个月)-减持']}%, "
-                        f"卖出 {row['机构投资评级(近六个月)-卖出']}%, "
-                        f"2022预测每股收益: {row['2022预测每股收益']:.4f}, "
-                        f"2023预测每股收益: {row['2023预测每股收益']:.4f}, "
-                        f"2024预测每股收益: {row['2024预测每股收益']:.4f}, "
-                        f"2025预测每股收益: {row['2025预测每股收益']:.4f}"
-                    )
-                    self.profit_forecast_cache[code] = forecast_info
+        try:
+            profit_forecast = self._profit_forecast_table()
+        except Exception as e:
+            return f"获取盈利预测数据时发生错误: {str(e)}"
 
-            except Exception as e:
-                return f"获取盈利预测数据时发生错误: {str(e)}"
+        return profit_forecast.get(symbol, f"未找到股票代码 {symbol} 的盈利预测数据")
 
-        return self.profit_forecast_cache.get(symbol, f"未找到股票代码 {symbol} 的盈利预测数据")
+    @cached(ttl=intraday(3600), maxsize=1)
+    def _profit_forecast_table(self) -> Dict[str, str]:
+        profit_forecast = {}
+        df = ak.stock_profit_forecast_em()
+        for _, row in df.iterrows():
+            code = row['代码']
+            forecast_info = (
+                f"名称: {row['名称']}, "
+                f"研报数: {row['研报数']}, "
+                f"机构投资评级(近六个月): 买入 {row['机构投资评级(近六个月)-买入']}%, "
+                f"增持 {row['机构投资评级(近六个月)-增持']}%, "
+                f"中性 {row['机构投资评级(近六个月)-中性']}%, "
+                f"减持 {row['机构投资评级(近六个月)-减持']}%, "
+                f"卖出 {row['机构投资评级(近六个月)-卖出']}%, "
+                f"2022预测每股收益: {row['2022预测每股收益']:.4f}, "
+                f"2023预测每股收益: {row['2023预测每股收益']:.4f}, "
+                f"2024预测每股收益: {row['2024预测每股收益']:.4f}, "
+                f"2025预测每股收益: {row['2025预测每股收益']:.4f}"
+            )
+            profit_forecast[code] = forecast_info
+        return profit_forecast
 
     def get_stock_comments_dataframe(self)->pd.DataFrame:
         """
@@ -2176,7 +1978,7 @@ class StockDataProvider:
             涨跌额	float64	注意单位: 元
             换手率	float64	注意单位: %
         """
-        return ak.stock_zh_a_hist(symbol=symbol,period="daily", start_date=start_date, end_date=end_date)
+        return self.historical_data_store.get(symbol, start_date, end_date)
 
     def calculate_stock_correlations(self, symbols: List[str], days: int = 120) -> pd.DataFrame:
         """
@@ -2203,15 +2005,14 @@ class StockDataProvider:
 
         close_prices = pd.DataFrame()
 
-        for symbol in symbols:
-            try:
-                df = self.get_historical_daily_data(symbol, start_date, end_date)
-                if not df.empty and '收盘' in df.columns:
-                    close_prices[symbol] = df['收盘']
-                else:
-                    print(f"未找到股票 {symbol} 的数据或数据不完整")
-            except Exception as e:
-                print(f"获取股票 {symbol} 的数据时出错：{str(e)}")
+        batch = self.batch_fetcher.fetch(lambda symbol: self.historical_data_store.get(symbol, start_date, end_date), symbols)
+        for symbol, e in batch.errors.items():
+            print(f"获取股票 {symbol} 的数据时出错：{str(e)}")
+        for symbol, df in batch.results.items():
+            if not df.empty and '收盘' in df.columns:
+                close_prices[symbol] = df['收盘']
+            else:
+                print(f"未找到股票 {symbol} 的数据或数据不完整")
 
         if close_prices.empty:
             print("没有足够的数据来计算相关性")
@@ -2467,7 +2268,7 @@ class StockDataProvider:
         """
         result = {}
         for index in index_symbols:
-            data = ak.index_zh_a_hist(symbol=index,period="daily",start_date=start_date,end_date=end_date)
+            data = self.historical_data_store.get(index, start_date, end_date, kind="index")
             result[index] = data
         return result
 
@@ -2492,17 +2293,17 @@ class StockDataProvider:
         result = {}
         end_date = datetime.now().strftime("%Y%m%d")
         start_date = (datetime.now() - timedelta(days=days)).strftime("%Y%m%d")
-        
-        for symbol in symbols:
-            try:
-                df = ak.stock_zh_index_daily_em(symbol=symbol, start_date=start_date, end_date=end_date)
-                if not df.empty:
-                    result[symbol] = df
-                else:
-                    print(f"No data found for symbol: {symbol}")
-            except Exception as e:
-                print(f"Error fetching data for symbol {symbol}: {str(e)}")
-        
+
+        batch = self.batch_fetcher.fetch(
+            lambda symbol: self.historical_data_store.get(symbol, start_date, end_date, kind="index_em"), symbols)
+        for symbol, e in batch.errors.items():
+            print(f"Error fetching data for symbol {symbol}: {str(e)}")
+        for symbol, df in batch.results.items():
+            if not df.empty:
+                result[symbol] = df
+            else:
+                print(f"No data found for symbol: {symbol}")
+
         return result
 
     def calculate_industry_correlations(self, names: List[str], days: int = 120) -> pd.DataFrame:
@@ -2558,10 +2359,12 @@ class StockDataProvider:
             新闻链接	object	-
         """
         result = {}
-        for symbol in symbols:
-            news = ak.stock_news_em(symbol=symbol)
-            
+        batch = self.batch_fetcher.fetch(lambda symbol: ak.stock_news_em(symbol=symbol), symbols, host="eastmoney")
+        for symbol, news in batch.results.items():
             result[symbol] = news.to_dict(orient="list")
+        for symbol, e in batch.errors.items():
+            result[symbol] = {"error": f"获取新闻失败: {str(e)}"}
+        return result
 
     def get_one_stock_news(self, symbol: str, num: int = 5, days: int = 7) -> List[Dict[str, str]]:
         """
@@ -2734,11 +2537,10 @@ class StockDataProvider:
         str: 最新行情数据的格式化字符串，包括代码、现价、涨幅、最高价、最低价、市盈率、成交量等信息。
         """
 
-        # 获取实时行情数据
-        stock_spot_df = ak.stock_zh_a_spot_em()
-        stock_spot_df = stock_spot_df[stock_spot_df['代码'] == symbol]
+        # 从共享的全市场快照中按代码取出这一行
+        row = self.market_snapshot.row(symbol)
 
-        if stock_spot_df.empty:
+        if row is None:
             return f"未找到证券代码 {symbol} 的数据"
 
         # 定义需要显示的字段及其格式化方式
@@ -2770,8 +2572,8 @@ class StockDataProvider:
         # 格式化数据
         formatted_data = []
         for field, format_str in fields:
-            if field in stock_spot_df.columns:
-                value = stock_spot_df[field].values[0]
+            if field in row.index:
+                value = row[field]
                 if pd.notna(value):  # 检查是否为NaN
                     formatted_value = format_str.format(value)
                     formatted_data.append(f"{field}: {formatted_value}")
@@ -2798,20 +2600,8 @@ class StockDataProvider:
         # 获取实时行情数据
         stock_spot_df = ak.stock_sz_a_spot_em()
 
-        # 初始化一个字典来存储结果
-        formatted_data = {}
-
-        # 遍历实时数据的每一行
-        for _, row in stock_spot_df.iterrows():
-            symbol = row['代码']
-            
-            # 将数据转换为可读的字符串格式
-            stock_spot_str = "\n".join([f"{item}: {value}" for item, value in row.items() if item != '代码'])
-
-            # 存储在字典中
-            formatted_data[symbol] = stock_spot_str
-
-        return formatted_data
+        # 除代码外的每一列格式化为一行，按列批量格式化
+        return SummaryTable(stock_spot_df, '代码', separator="\n").to_dict()
 
     def get_stock_announcements(self,symbols: List[str], date: str = None) -> Dict[str, List[str]]:
         """
@@ -2827,12 +2617,11 @@ class StockDataProvider:
         result = {}
         if not date:
             date = self.get_latest_trading_date()
+        # 一次请求取回全市场当天的公告，再按代码分组，不需要逐个代码请求
         df = ak.stock_gsrl_gsdt_em(date=date)
+        grouped = df[df['股票代码'].isin(symbols)].groupby('股票代码')['具体事项'].apply(list).to_dict()
         for symbol in symbols:
-            result[symbol] = []
-            filtered_df = df[df['股票代码'] == symbol]
-            for row in filtered_df.itertuples():
-                result[symbol].append(row["具体事项"])
+            result[symbol] = grouped.get(symbol, [])
         return result
 
     def stock_info_global_ths(self):
@@ -2881,176 +2670,95 @@ class StockDataProvider:
         """
         return ak.stock_info_global_em()
 
-    def summarize_historical_data_dict(self, symbols: List[str], days: int = 180) -> Dict[str, Dict[str, Any]]:
-        summary_dict = {}
+    def _historical_indicator_panel(self, symbols: List[str], days: int, summary_dict: dict, errors: Dict[str, Any]):
+        """
+        并发获取日线数据，数据缺失或不足的股票直接写入 summary_dict，
+        其余股票组成面板一次性计算指标，返回 (指标最新值, 统计摘要)
+        """
         end_date = datetime.now().strftime("%Y%m%d")
         start_date = (datetime.now() - timedelta(days=days)).strftime("%Y%m%d")
 
+        batch = self.batch_fetcher.fetch(lambda symbol: self.historical_data_store.get(symbol, start_date, end_date), symbols)
+        frames = {}
         for symbol in symbols:
-            if symbol in self.historical_data_cache:
-                df = self.historical_data_cache[symbol]
-            else:
-                df = self.get_historical_daily_data(symbol, start_date, end_date)
-                self.historical_data_cache[symbol] = df
-            
-            if df.empty:
-                summary_dict[symbol] = {"error": "未找到数据"}
-                continue
-
-            if len(df) < 14:
-                summary_dict[symbol] = {"error": f"数据点不足，仅有 {len(df)} 个数据点，无法计算所有技术指标"}
+            if symbol in batch.errors:
+                summary_dict[symbol] = errors["fetch"](batch.errors[symbol])
                 continue
+            df = batch.results[symbol]
+            if df.empty:
+                summary_dict[symbol] = errors["empty"]
+            elif len(df) < 14:
+                summary_dict[symbol] = errors["short"](len(df))
+            else:
+                frames[symbol] = df
+                # 先占位，保持返回结果与输入顺序一致
+                summary_dict[symbol] = None
 
-            # 计算技术指标
-            df['MA20'] = ta.trend.sma_indicator(df['收盘'], window=min(20, len(df)))
-            df['MA50'] = ta.trend.sma_indicator(df['收盘'], window=min(50, len(df)))
-            df['RSI'] = ta.momentum.rsi(df['收盘'], window=min(14, len(df)))
-            macd = ta.trend.MACD(df['收盘'])
-            df['MACD'] = macd.macd()
-            df['MACD_signal'] = macd.macd_signal()
-            bb = ta.volatility.BollingerBands(df['收盘'], window=min(20, len(df)), window_dev=2)
-            df['BB_upper'] = bb.bollinger_hband()
-            df['BB_lower'] = bb.bollinger_lband()
-
-            if len(df) >= 14:
-                df['ATR'] = ta.volatility.average_true_range(df['最高'], df['最低'], df['收盘'], window=14)
-                stoch = ta.momentum.StochasticOscillator(df['最高'], df['最低'], df['收盘'])
-                df['Stoch_K'] = stoch.stoch()
-                df['Stoch_D'] = stoch.stoch_signal()
-                df['RSI_9'] = ta.momentum.rsi(df['收盘'], window=9)
-                df['OBV'] = ta.volume.on_balance_volume(df['收盘'], df['成交量'])
-                df['Momentum'] = ta.momentum.roc(df['收盘'], window=min(10, len(df)))
-                df['ADL'] = ta.volume.acc_dist_index(df['最高'], df['最低'], df['收盘'], df['成交量'])
-                df['Williams_R'] = ta.momentum.williams_r(high=df['最高'], low=df['最低'], close=df['收盘'], lbp=min(14, len(df)))
+        if not frames:
+            return pd.DataFrame(), pd.DataFrame()
+        panel = IndicatorPanel(frames)
+        engine = IndicatorEngine()
+        return engine.latest(panel), engine.summary(panel)
 
+    def summarize_historical_data_dict(self, symbols: List[str], days: int = 180) -> Dict[str, Dict[str, Any]]:
+        summary_dict = {}
+        indicators, stats = self._historical_indicator_panel(symbols, days, summary_dict, {
+            "fetch": lambda e: {"error": f"获取数据失败: {str(e)}"},
+            "empty": {"error": "未找到数据"},
+            "short": lambda n: {"error": f"数据点不足，仅有 {n} 个数据点，无法计算所有技术指标"},
+        })
+
+        for symbol in indicators.index:
+            row = stats.loc[symbol]
             # 构建结构化的摘要字典
-            summary = {
+            summary_dict[symbol] = {
                 "股票代码": symbol,
-                "当前价格": df['收盘'].iloc[-1],
-                "最高收盘价": df['收盘'].max(),
-                "最低收盘价": df['收盘'].min(),
-                "平均成交量": df['成交量'].mean(),
-                "平均成交额": df['成交额'].mean(),
-                "技术指标": {}
+                "当前价格": row["当前价格"],
+                "最高收盘价": row["最高收盘价"],
+                "最低收盘价": row["最低收盘价"],
+                "平均成交量": row["平均成交量"],
+                "平均成交额": row["平均成交额"],
+                "技术指标": indicators.loc[symbol].to_dict()
             }
 
-            # 添加技术指标
-            indicators = ['RSI', 'MACD', 'MACD_signal', 'BB_upper', 'BB_lower', 'MA20', 'MA50', 
-                          'ATR', 'Stoch_K', 'Stoch_D', 'RSI_9', 'OBV', 'Momentum', 'ADL', 'Williams_R']
-            
-            for indicator in indicators:
-                if indicator in df.columns:
-                    summary["技术指标"][indicator] = df[indicator].iloc[-1]
-
-            summary_dict[symbol] = summary
-
         return summary_dict
 
     def summarize_historical_data(self, symbols: List[str],days: int = 180) -> dict:
         summary_dict = {}
-        end_date = datetime.now().strftime("%Y%m%d")
-        start_date = (datetime.now() - timedelta(days=days)).strftime("%Y%m%d")
-
-        for symbol in symbols:
-            if symbol in self.historical_data_cache:
-                df = self.historical_data_cache[symbol]
-            else:
-                df = self.get_historical_daily_data(symbol, start_date, end_date)
-                self.historical_data_cache[symbol] = df
-            
-            if df.empty:
-                summary_dict[symbol] = "未找到数据"
-                continue
-
-            # 检查数据点是否足够
-            if len(df) < 14:
-                summary_dict[symbol] = f"数据点不足，仅有 {len(df)} 个数据点，无法计算所有技术指标"
-                continue
+        indicators, stats = self._historical_indicator_panel(symbols, days, summary_dict, {
+            "fetch": lambda e: f"获取数据失败: {str(e)}",
+            "empty": "未找到数据",
+            "short": lambda n: f"数据点不足，仅有 {n} 个数据点，无法计算所有技术指标",
+        })
 
-            # 保留原有的指标计算
-            df['MA20'] = ta.trend.sma_indicator(df['收盘'], window=min(20, len(df)))
-            df['MA50'] = ta.trend.sma_indicator(df['收盘'], window=min(50, len(df)))
-            df['RSI'] = ta.momentum.rsi(df['收盘'], window=min(14, len(df)))
-            macd = ta.trend.MACD(df['收盘'])
-            df['MACD'] = macd.macd()
-            df['MACD_signal'] = macd.macd_signal()
-            bb = ta.volatility.BollingerBands(df['收盘'], window=min(20, len(df)), window_dev=2)
-            df['BB_upper'] = bb.bollinger_hband()
-            df['BB_lower'] = bb.bollinger_lband()
-
-            # 新增指标，确保数据点足够
-            if len(df) >= 14:
-                df['ATR'] = ta.volatility.average_true_range(df['最高'], df['最低'], df['收盘'], window=14)
-                
-                stoch = ta.momentum.StochasticOscillator(df['最高'], df['最低'], df['收盘'])
-                df['Stoch_K'] = stoch.stoch()
-                df['Stoch_D'] = stoch.stoch_signal()
-                
-                df['RSI_9'] = ta.momentum.rsi(df['收盘'], window=9)
-                
-                df['OBV'] = ta.volume.on_balance_volume(df['收盘'], df['成交量'])
-                
-                df['Momentum'] = ta.momentum.roc(df['收盘'], window=min(10, len(df)))
-                
-                df['ADL'] = ta.volume.acc_dist_index(df['最高'], df['最低'], df['收盘'], df['成交量'])
-                
-                df['Williams_R'] = ta.momentum.williams_r(high=df['最高'], low=df['最低'], close=df['收盘'], lbp=min(14, len(df)))
-
-            # 获取数据统计（包括新增指标）
-            latest_close = df['收盘'].iloc[-1]
-            highest_close = df['收盘'].max()
-            lowest_close = df['收盘'].min()
-            avg_volume = df['成交量'].mean()
-            latest_rsi = df['RSI'].iloc[-1] if 'RSI' in df else None
-            latest_macd = df['MACD'].iloc[-1] if 'MACD' in df else None
-            latest_macd_signal = df['MACD_signal'].iloc[-1] if 'MACD_signal' in df else None
-            bb_upper = df['BB_upper'].iloc[-1] if 'BB_upper' in df else None
-            bb_lower = df['BB_lower'].iloc[-1] if 'BB_lower' in df else None
-            latest_atr = df['ATR'].iloc[-1] if 'ATR' in df else None
-            latest_stoch_k = df['Stoch_K'].iloc[-1] if 'Stoch_K' in df else None
-            latest_stoch_d = df['Stoch_D'].iloc[-1] if 'Stoch_D' in df else None
-            latest_rsi_9 = df['RSI_9'].iloc[-1] if 'RSI_9' in df else None
-            latest_obv = df['OBV'].iloc[-1] if 'OBV' in df else None
-            latest_momentum = df['Momentum'].iloc[-1] if 'Momentum' in df else None
-            latest_adl = df['ADL'].iloc[-1] if 'ADL' in df else None
-            latest_williams_r = df['Williams_R'].iloc[-1] if 'Williams_R' in df else None
+        for symbol in indicators.index:
+            row = stats.loc[symbol]
+            latest = indicators.loc[symbol]
 
             # 生成描述性的字符串
             description = (
                 f"股票代码: {symbol}\n"
-                f"当前价格: {latest_close:.2f}\n"
-                f"最高收盘价: {highest_close:.2f}\n"
-                f"最低收盘价: {lowest_close:.2f}\n"
-                f"平均成交量: {avg_volume:.0f}\n"
+                f"当前价格: {row['当前价格']:.2f}\n"
+                f"最高收盘价: {row['最高收盘价']:.2f}\n"
+                f"最低收盘价: {row['最低收盘价']:.2f}\n"
+                f"平均成交量: {row['平均成交量']:.0f}\n"
+                f"最新RSI(14): {latest['RSI']:.2f}\n"
+                f"最新MACD: {latest['MACD']:.2f}\n"
+                f"最新MACD信号线: {latest['MACD_signal']:.2f}\n"
+                f"布林带上轨: {latest['BB_upper']:.2f}\n"
+                f"布林带下轨: {latest['BB_lower']:.2f}\n"
+                f"MA20: {latest['MA20']:.2f}\n"
+                f"MA50: {latest['MA50']:.2f}\n"
+                f"ATR(14): {latest['ATR']:.2f}\n"
+                f"随机振荡器K(14): {latest['Stoch_K']:.2f}\n"
+                f"随机振荡器D(14): {latest['Stoch_D']:.2f}\n"
+                f"RSI(9): {latest['RSI_9']:.2f}\n"
+                f"OBV: {latest['OBV']:.0f}\n"
+                f"价格动量(10): {latest['Momentum']:.2f}%\n"
+                f"ADL: {latest['ADL']:.0f}\n"
+                f"威廉指标(14): {latest['Williams_R']:.2f}"
             )
 
-            if latest_rsi is not None:
-                description += f"最新RSI(14): {latest_rsi:.2f}\n"
-            if latest_macd is not None and latest_macd_signal is not None:
-                description += f"最新MACD: {latest_macd:.2f}\n"
-                description += f"最新MACD信号线: {latest_macd_signal:.2f}\n"
-            if bb_upper is not None and bb_lower is not None:
-                description += f"布林带上轨: {bb_upper:.2f}\n"
-                description += f"布林带下轨: {bb_lower:.2f}\n"
-            if 'MA20' in df and 'MA50' in df:
-                description += f"MA20: {df['MA20'].iloc[-1]:.2f}\n"
-                description += f"MA50: {df['MA50'].iloc[-1]:.2f}\n"
-            if latest_atr is not None:
-                description += f"ATR(14): {latest_atr:.2f}\n"
-            if latest_stoch_k is not None and latest_stoch_d is not None:
-                description += f"随机振荡器K(14): {latest_stoch_k:.2f}\n"
-                description += f"随机振荡器D(14): {latest_stoch_d:.2f}\n"
-            if latest_rsi_9 is not None:
-                description += f"RSI(9): {latest_rsi_9:.2f}\n"
-            if latest_obv is not None:
-                description += f"OBV: {latest_obv:.0f}\n"
-            if latest_momentum is not None:
-                description += f"价格动量(10): {latest_momentum:.2f}%\n"
-            if latest_adl is not None:
-                description += f"ADL: {latest_adl:.0f}\n"
-            if latest_williams_r is not None:
-                description += f"威廉指标(14): {latest_williams_r:.2f}"
-            
             summary_dict[symbol] = description
         
         return summary_dict
@@ -3071,12 +2779,7 @@ class StockDataProvider:
         start_date = (datetime.now() - timedelta(days=180)).strftime("%Y%m%d")
 
         for symbol in index_symbols:
-            # 检查缓存
-            if symbol in self.historical_data_cache:
-                df = self.historical_data_cache[symbol]
-            else:
-                df = self.get_index_data([symbol], start_date, end_date)[symbol]
-                self.historical_data_cache[symbol] = df
+            df = self.get_index_data([symbol], start_date, end_date)[symbol]
             
             if df.empty:
                 summary_dict[symbol] = "未找到数据"
@@ -3156,27 +2859,29 @@ class StockDataProvider:
 
         # 获取数据
         try:
-            stock_institute_hold_df = ak.stock_institute_hold(symbol=report_symbol)
+            institutional_holdings = self._institutional_holdings_table(report_symbol)
         except Exception as e:
             return f"获取数据失败: {str(e)}"
 
-        # 遍历数据，将其保存到缓存中
-        for index, row in stock_institute_hold_df.iterrows():
-            code = row['证券代码']
-            formatted_row = (
-                f"证券代码: {row['证券代码']}, 证券简称: {row['证券简称']}, "
-                f"机构数: {row['机构数']}, 机构数变化: {row['机构数变化']}, "
-                f"持股比例: {row['持股比例']}%, 持股比例增幅: {row['持股比例增幅']}%, "
-                f"占流通股比例: {row['占流通股比例']}%, 占流通股比例增幅: {row['占流通股比例增幅']}%"
-            )
-            self.institutional_holdings_cache[code] = formatted_row
-
-        # 从缓存中获取数据
-        if symbol in self.institutional_holdings_cache:
-            return self.institutional_holdings_cache[symbol]
+        if symbol in institutional_holdings:
+            return institutional_holdings[symbol]
         else:
             return "上个季报暂无数据"
 
+    @cached(ttl=until_reported(3600), maxsize=4, disk=True)
+    def _institutional_holdings_table(self, report_symbol: str) -> SummaryTable:
+        stock_institute_hold_df = ak.stock_institute_hold(symbol=report_symbol)
+        return SummaryTable(stock_institute_hold_df, '证券代码', [
+            ('证券代码', '证券代码', ''),
+            ('证券简称', '证券简称', ''),
+            ('机构数', '机构数', ''),
+            ('机构数变化', '机构数变化', ''),
+            ('持股比例', '持股比例', '%'),
+            ('持股比例增幅', '持股比例增幅', '%'),
+            ('占流通股比例', '占流通股比例', '%'),
+            ('占流通股比例增幅', '占流通股比例增幅', '%'),
+        ])
+
     def get_stock_fund_flow(self, indicator: Literal[ "即时", "3日排行", "5日排行", "10日排行", "20日排行"]="即时") -> Dict[str, Dict]:
         """
         获取个股资金流量表，参数 indicator: Literal[ "即时", "3日排行", "5日排行", "10日排行", "20日排行"]="即时" 返回值 Dict[str, Dict]
@@ -3225,7 +2930,8 @@ class StockDataProvider:
         >>> select_stock_by_query("5分钟涨跌幅大于1%的股票")
         {'000001': '名称: 平安银行, 现价: 10.5, 涨跌幅: 1.2%, ...', ...}
         """
-        df = ak.stock_zh_a_spot_em()
+        # 生成的代码可能修改 df，不能直接使用共享的快照
+        df = self.market_snapshot.get().copy()
         df_summary = self.data_summarizer.get_data_summary(df)
         global_vars={}
         global_vars["df"]=df
@@ -3260,23 +2966,37 @@ class StockDataProvider:
             6. 不要使用任何不在 df 中的列名
             7. 使用名字查询的时候，注意使用模糊查询的方法，避免名字不精确查询不到数据
         """
+        return self._run_generated_code("select_stock_by_query", query, prompt, df, global_vars, dict,
+                                        "result必须是字典格式，请修改代码，把结果保存于字典格式的dict")
+
+    def _run_generated_code(self, kind: str, query: str, prompt: str, df: pd.DataFrame, global_vars: dict,
+                            result_type: type, type_error: str):
+        """
+        让 LLM 按 prompt 生成筛选代码并执行，返回代码中 result 变量的值。
+        执行成功的代码按 (kind, query, df 的列结构) 缓存：相同的查询直接用缓存的代码处理最新的数据，
+        缓存的代码执行失败或者列结构变化时才重新调用 LLM。
+        """
+        key = self.query_code_cache.key(kind, query, df)
+        code = self.query_code_cache.get(key)
+        if code:
+            try:
+                return self._execute_generated_code(code, global_vars, result_type, type_error)
+            except Exception as e:
+                self.logger.info(f"缓存的筛选代码执行失败，重新生成: {str(e)}")
+                self.query_code_cache.discard(key)
+
         new_prompt = prompt
+        code = ""
         while True:
             response = self.llm_client.one_chat(new_prompt)
             try:
                 code = self._extract_code(response)
                 if not code:
                     raise ValueError("No Python code found in the response, 请提供python代码，并包裹在```python  ```之中")
-                
-                execute_result = self.code_runner.run(code,global_vars=global_vars)
-                if execute_result["error"]:
-                    raise execute_result["error"]
-                if "result" not in execute_result["updated_vars"]:
-                    raise Exception("代码执行完以后，没有检测到result变量，必须把结果保存在result变量之中")
-                if not isinstance(execute_result["updated_vars"]["result"], dict):
-                    raise Exception("result必须是字典格式，请修改代码，把结果保存于字典格式的dict")
-                
-                return execute_result["updated_vars"]["result"]
+
+                result = self._execute_generated_code(code, global_vars, result_type, type_error)
+                self.query_code_cache.put(key, query, code)
+                return result
             except Exception as e:
                 fix_prompt = f"""
                 刚刚用下面的提示词
@@ -3293,6 +3013,16 @@ class StockDataProvider:
                 """
                 new_prompt = fix_prompt
 
+    def _execute_generated_code(self, code: str, global_vars: dict, result_type: type, type_error: str):
+        execute_result = self.code_runner.run(code, global_vars=global_vars)
+        if execute_result["error"]:
+            raise Exception(execute_result["error"])
+        if "result" not in execute_result["updated_vars"]:
+            raise Exception("代码执行完以后，没有检测到result变量，必须把结果保存在result变量之中")
+        if not isinstance(execute_result["updated_vars"]["result"], result_type):
+            raise Exception(type_error)
+        return execute_result["updated_vars"]["result"]
+
     def _extract_code(self, response):
         """
         从LLM的响应中提取Python代码。
@@ -3360,9 +3090,12 @@ class StockDataProvider:
         ValueError: 如果无法获取股票价格
         """
         try:
-            # 使用 akshare 的 stock_bid_ask_em 函数获取行情数据
             if "." in symbol:
                 symbol= symbol.split(".")[0]
+            # 优先使用共享的全市场快照，快照中没有的代码再单独请求盘口数据
+            latest_price = self.market_snapshot.price(symbol)
+            if latest_price is not None:
+                return latest_price
             df = ak.stock_bid_ask_em(symbol=symbol)
             
             # 从返回的数据中提取最新价格
@@ -3468,45 +3201,17 @@ class StockDataProvider:
             8. 如果没有完全匹配的结果，考虑返回部分匹配或相关的结果
             9. 添加注释解释你的匹配逻辑
         """
-        new_prompt = prompt
-        while True:
-            response = self.llm_client.one_chat(new_prompt)
-            try:
-                code = self._extract_code(response)
-                if not code:
-                    raise ValueError("No Python code found in the response, 请提供python代码，并包裹在```python  ```之中")
-                
-                execute_result = self.code_runner.run(code,global_vars=global_vars)
-                if execute_result["error"]:
-                    raise execute_result["error"]
-                if "result" not in execute_result["updated_vars"]:
-                    raise Exception("代码执行完以后，没有检测到result变量，必须把结果保存在result变量之中")
-                if not isinstance(execute_result["updated_vars"]["result"], list):
-                    raise Exception("result必须是列表格式，请修改代码，确保返回的是板块名称的列表")
-                
-                # 获取成分股
-                selected_boards = execute_result["updated_vars"]["result"]
-                all_stocks = {}
-                for board_name in selected_boards:
-                    stocks = self.get_concept_board_components(board_name)
-                    all_stocks.update(stocks)
-                
-                return all_stocks
-            except Exception as e:
-                fix_prompt = f"""
-                刚刚用下面的提示词
-                {prompt}
-
-                生成了下面的代码
-                {code}
+        selected_boards = self._run_generated_code("select_stocks_by_concept_board_query", query, prompt, df_concepts,
+                                                   global_vars, list,
+                                                   "result必须是列表格式，请修改代码，确保返回的是板块名称的列表")
 
-                发生了下面的错误：
-                {str(e)}
+        # 获取成分股
+        all_stocks = {}
+        for board_name in selected_boards:
+            stocks = self.get_concept_board_components(board_name)
+            all_stocks.update(stocks)
 
-                请帮我修正代码，代码要求不变，输出的代码包裹在```python  ```之中
-                修正代码不用加任何解释
-                """
-                new_prompt = fix_prompt
+        return all_stocks
 
     def get_board_industry_components(self, symbol: str) -> dict:
         """
@@ -3600,45 +3305,17 @@ class StockDataProvider:
             8. 如果没有完全匹配的结果，考虑返回部分匹配或相关的结果
             9. 添加注释解释你的匹配逻辑
         """
-        new_prompt = prompt
-        while True:
-            response = self.llm_client.one_chat(new_prompt)
-            try:
-                code = self._extract_code(response)
-                if not code:
-                    raise ValueError("No Python code found in the response, 请提供python代码，并包裹在```python  ```之中")
-                
-                execute_result = self.code_runner.run(code,global_vars=global_vars)
-                if execute_result["error"]:
-                    raise execute_result["error"]
-                if "result" not in execute_result["updated_vars"]:
-                    raise Exception("代码执行完以后，没有检测到result变量，必须把结果保存在result变量之中")
-                if not isinstance(execute_result["updated_vars"]["result"], list):
-                    raise Exception("result必须是列表格式，请修改代码，确保返回的是板块名称的列表")
-                
-                # 获取成分股
-                selected_boards = execute_result["updated_vars"]["result"]
-                all_stocks = {}
-                for board_name in selected_boards:
-                    stocks = self.get_board_industry_components(board_name)
-                    all_stocks.update(stocks)
-                
-                return all_stocks
-            except Exception as e:
-                fix_prompt = f"""
-                刚刚用下面的提示词
-                {prompt}
+        selected_boards = self._run_generated_code("select_stocks_by_industry_board_query", query, prompt, df_industries,
+                                                   global_vars, list,
+                                                   "result必须是列表格式，请修改代码，确保返回的是板块名称的列表")
 
-                生成了下面的代码
-                {code}
+        # 获取成分股
+        all_stocks = {}
+        for board_name in selected_boards:
+            stocks = self.get_board_industry_components(board_name)
+            all_stocks.update(stocks)
 
-                发生了下面的错误：
-                {str(e)}
-
-                请帮我修正代码，代码要求不变，输出的代码包裹在```python  ```之中
-                修正代码不用加任何解释
-                """
-                new_prompt = fix_prompt
+        return all_stocks
 
     def select_by_query(self, 
                         data_source: Union[pd.DataFrame, Callable[[], pd.DataFrame]], 
@@ -3709,51 +3386,20 @@ class StockDataProvider:
             6. 不要使用任何不在 df 中的列名
             7. 使用名字查询的时候，注意使用模糊查询的方法，避免名字不精确查询不到数据
         """
-        new_prompt = prompt
-        while True:
-            response = self.llm_client.one_chat(new_prompt)
-            try:
-                code = self._extract_code(response)
-                if not code:
-                    raise ValueError("No Python code found in the response, 请提供python代码，并包裹在```python  ```之中")
-                
-                execute_result = self.code_runner.run(code,global_vars=global_vars)
-                if execute_result["error"]:
-                    raise execute_result["error"]
-                if "result" not in execute_result["updated_vars"]:
-                    raise Exception("代码执行完以后，没有检测到result变量，必须把结果保存在result变量之中")
-                if not isinstance(execute_result["updated_vars"]["result"], pd.DataFrame):
-                    raise Exception("result必须是DataFrame格式，请修改代码，确保返回的是筛选后的DataFrame")
-                
-                filtered_df = execute_result["updated_vars"]["result"]
-                
-                if result_type == 'dict':
-                    if not key_column or not value_columns:
-                        raise ValueError("For dict result type, key_column and value_columns must be specified")
-                    return {
-                        row[key_column]: ", ".join([f"{col}: {row[col]}" for col in value_columns])
-                        for _, row in filtered_df.iterrows()
-                    }
-                elif result_type == 'list':
-                    return filtered_df.iloc[:, 0].tolist()
-                else:
-                    raise ValueError("Invalid result_type. Must be 'dict' or 'list'")
-            
-            except Exception as e:
-                fix_prompt = f"""
-                刚刚用下面的提示词
-                {prompt}
-
-                生成了下面的代码
-                {code}
+        filtered_df = self._run_generated_code("select_by_query", query, prompt, df, global_vars, pd.DataFrame,
+                                               "result必须是DataFrame格式，请修改代码，确保返回的是筛选后的DataFrame")
 
-                发生了下面的错误：
-                {str(e)}
-
-                请帮我修正代码，代码要求不变，输出的代码包裹在```python  ```之中
-                修正代码不用加任何解释
-                """
-                new_prompt = fix_prompt
+        if result_type == 'dict':
+            if not key_column or not value_columns:
+                raise ValueError("For dict result type, key_column and value_columns must be specified")
+            return {
+                row[key_column]: ", ".join([f"{col}: {row[col]}" for col in value_columns])
+                for _, row in filtered_df.iterrows()
+            }
+        elif result_type == 'list':
+            return filtered_df.iloc[:, 0].tolist()
+        else:
+            raise ValueError("Invalid result_type. Must be 'dict' or 'list'")
 
     def select_by_stock_comments(self, query: str) -> dict:
         """
@@ -0,0 +1,65 @@
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import pandas as pd
+
+# (显示名称, 列名, 单位)
+Field = Tuple[str, str, str]
+
+
+class SummaryTable(Mapping):
+    """
+    全市场报表的只读映射：股票代码 -> 描述字符串。
+    只保存原始 DataFrame 和 代码 -> 行号 的索引，按代码取值时才格式化这一行；
+    需要整个字典时用 to_dict() 按列批量格式化。
+    代码重复时与逐行构建字典一致：保留第一次出现的位置，取最后一行的数据。
+    """
+    def __init__(self, frame: pd.DataFrame, key_column: str, fields: Optional[Sequence[Field]] = None,
+                 separator: str = ", ", trailing: str = ""):
+        self.frame = frame
+        self.key_column = key_column
+        if fields is None:
+            fields = [(column, column, "") for column in frame.columns if column != key_column]
+        self.fields: List[Field] = list(fields)
+        self.separator = separator
+        self.trailing = trailing
+        self._columns = [frame.columns.get_loc(column) for _, column, _ in self.fields]
+        self._positions: Dict[str, int] = {}
+        for position, key in enumerate(frame[key_column].tolist()):
+            self._positions[key] = position
+
+    def __getitem__(self, key) -> str:
+        position = self._positions[key]
+        values = [self.frame.iat[position, column] for column in self._columns]
+        return self.separator.join(f"{label}: {value}{unit}"
+                                   for (label, _, unit), value in zip(self.fields, values)) + self.trailing
+
+    def __iter__(self) -> Iterator:
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, key) -> bool:
+        return key in self._positions
+
+    def items(self):
+        return self.to_dict().items()
+
+    def values(self):
+        return self.to_dict().values()
+
+    def to_dict(self) -> Dict[str, str]:
+        """一次性格式化所有行"""
+        positions = list(self._positions.values())
+        frame = self.frame.iloc[positions]
+        text = None
+        for i, (label, column, unit) in enumerate(self.fields):
+            part = pd.Series([str(v) for v in frame[column].tolist()], dtype=object)
+            part = (self.separator if i else "") + label + ": " + part + unit
+            text = part if text is None else text + part
+        if text is None:
+            text = pd.Series([""] * len(positions), dtype=object)
+        return dict(zip(self._positions.keys(), (text + self.trailing).tolist()))
+
+    def __repr__(self) -> str:
+        return f"SummaryTable({len(self)} rows, key={self.key_column})"
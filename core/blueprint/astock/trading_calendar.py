@@ -0,0 +1,233 @@
+import os
+import pickle
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time as dtime, timedelta
+from typing import List, Optional, Union
+import pytz
+import akshare as ak
+from core.utils.single_ton import Singleton
+from core.utils.log import logger
+
+TIMEZONE = pytz.timezone('Asia/Shanghai')
+DateLike = Union[str, date, datetime, None]
+
+PRE_OPEN = "pre_open"        # 交易日开盘前（含集合竞价）
+CONTINUOUS = "continuous"    # 连续竞价
+BREAK = "break"              # 午间休市
+CLOSED = "closed"            # 收盘后或非交易日
+
+MORNING = (dtime(9, 30), dtime(11, 30))
+AFTERNOON = (dtime(13, 0), dtime(15, 0))
+AUCTION_START = dtime(9, 15)
+
+
+class TradingCalendar(metaclass=Singleton):
+    """
+    A 股交易日历，来自 ak.tool_trade_date_hist_sina()，保存在本地文件中。
+    新浪的日历包含到当年年底的交易日，日历覆盖不到今天或者文件超过一年时才重新下载，
+    平时查询不需要访问网络。日期以 YYYYMMDD 字符串有序保存，查询都是二分查找。
+    """
+    def __init__(self, cache_file_path: str = './json/trade_calendar.pickle', max_age_days: int = 365):
+        self.cache_file_path = cache_file_path
+        self.max_age = timedelta(days=max_age_days)
+        self.trading_days: List[str] = []
+        self.updated_at: Optional[datetime] = None
+        self.attempted_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def now() -> datetime:
+        """北京时间的当前时间（不带时区信息）"""
+        return datetime.now(TIMEZONE).replace(tzinfo=None)
+
+    def today(self) -> str:
+        return self.now().strftime("%Y%m%d")
+
+    def is_trading_day(self, day: DateLike = None) -> bool:
+        day = self._resolve(day)
+        days = self._days(day)
+        if not days or day > days[-1]:
+            # 日历没有覆盖的日期按工作日计算
+            return self._is_weekday(day)
+        i = bisect_left(days, day)
+        return i < len(days) and days[i] == day
+
+    def previous_trading_day(self, day: DateLike = None) -> str:
+        """day 之前（不含 day）的最近一个交易日，YYYYMMDD"""
+        day = self._resolve(day)
+        days = self._days(day)
+        i = bisect_left(days, day)
+        if days and 0 < i < len(days):
+            return days[i - 1]
+        return self._step_weekday(day, -1)
+
+    def next_trading_day(self, day: DateLike = None) -> str:
+        """day 之后（不含 day）的第一个交易日，YYYYMMDD"""
+        day = self._resolve(day)
+        days = self._days(day)
+        i = bisect_right(days, day)
+        if i < len(days):
+            return days[i]
+        return self._step_weekday(day, 1)
+
+    def latest_trading_day(self, now: Optional[datetime] = None) -> str:
+        """今天是交易日且已经开盘（9:30 之后）时返回今天，否则返回之前最近的交易日"""
+        now = now or self.now()
+        today = now.strftime("%Y%m%d")
+        if now.time() >= MORNING[0] and self.is_trading_day(today):
+            return today
+        return self.previous_trading_day(today)
+
+    def trading_days_between(self, start: DateLike, end: DateLike) -> List[str]:
+        """[start, end] 之间的所有交易日"""
+        start, end = self._resolve(start), self._resolve(end)
+        days = self._days(end)
+        return days[bisect_left(days, start):bisect_right(days, end)]
+
+    def session_phase(self, now: Optional[datetime] = None) -> str:
+        now = now or self.now()
+        if not self.is_trading_day(now):
+            return CLOSED
+        current = now.time()
+        if current < MORNING[0]:
+            return PRE_OPEN
+        if MORNING[0] <= current < MORNING[1] or AFTERNOON[0] <= current < AFTERNOON[1]:
+            return CONTINUOUS
+        if MORNING[1] <= current < AFTERNOON[0]:
+            return BREAK
+        return CLOSED
+
+    def next_session_start(self, now: Optional[datetime] = None) -> datetime:
+        """下一个交易日集合竞价开始（9:15）的时间；今天是交易日且还没到 9:15 时返回今天的"""
+        now = now or self.now()
+        today = now.strftime("%Y%m%d")
+        day = today if now.time() < AUCTION_START and self.is_trading_day(today) else self.next_trading_day(today)
+        return datetime.combine(datetime.strptime(day, "%Y%m%d").date(), AUCTION_START)
+
+    def seconds_until_next_session(self, now: Optional[datetime] = None) -> float:
+        """收盘后的数据在下一个交易时段开始前不会变化，用作缓存有效期；交易时段内返回 0"""
+        now = now or self.now()
+        if self.session_phase(now) in (CONTINUOUS, BREAK) or (
+                self.session_phase(now) == PRE_OPEN and now.time() >= AUCTION_START):
+            return 0
+        return (self.next_session_start(now) - now).total_seconds()
+
+    def refresh(self):
+        with self._lock:
+            self._refresh()
+
+    def _days(self, day: str) -> List[str]:
+        # 日历覆盖不到要查询的日期或者过期时重新下载，失败或者下载后仍然覆盖不到时一小时内不再重试
+        if self._stale(day):
+            with self._lock:
+                if self._stale(day):
+                    self._refresh()
+        return self.trading_days
+
+    def _stale(self, day: str) -> bool:
+        now = self.now()
+        if self.attempted_at is not None and now - self.attempted_at < timedelta(hours=1):
+            return False
+        return not self.trading_days or self.trading_days[-1] < day or now - self.updated_at > self.max_age
+
+    def _refresh(self):
+        now = self.now()
+        self.attempted_at = now
+        try:
+            df = ak.tool_trade_date_hist_sina()
+            self.trading_days = sorted(d.strftime("%Y%m%d") if hasattr(d, "strftime") else str(d).replace("-", "")
+                                       for d in df['trade_date'])
+            self.updated_at = now
+            self._save()
+            logger.info(f"交易日历已更新，共 {len(self.trading_days)} 天，截至 {self.trading_days[-1]}")
+        except Exception as e:
+            # 下载失败时继续使用旧日历；没有日历时退化为按工作日计算
+            logger.warning(f"更新交易日历失败: {str(e)}")
+
+    def _load(self):
+        try:
+            if os.path.exists(self.cache_file_path):
+                with open(self.cache_file_path, 'rb') as f:
+                    data = pickle.load(f)
+                self.trading_days = data["trading_days"]
+                self.updated_at = data["updated_at"]
+        except Exception as e:
+            logger.warning(f"读取交易日历失败: {str(e)}")
+            self.trading_days, self.updated_at = [], None
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.cache_file_path) or ".", exist_ok=True)
+        with open(self.cache_file_path + ".tmp", 'wb') as f:
+            pickle.dump({"trading_days": self.trading_days, "updated_at": self.updated_at}, f)
+        os.replace(self.cache_file_path + ".tmp", self.cache_file_path)
+
+    def _resolve(self, day: DateLike) -> str:
+        if day is None:
+            return self.today()
+        if isinstance(day, (date, datetime)):
+            return day.strftime("%Y%m%d")
+        return str(day).replace("-", "")
+
+    @staticmethod
+    def _is_weekday(day: str) -> bool:
+        return datetime.strptime(day, "%Y%m%d").weekday() < 5
+
+    @staticmethod
+    def _step_weekday(day: str, step: int) -> str:
+        current = datetime.strptime(day, "%Y%m%d")
+        while True:
+            current += timedelta(days=step)
+            if current.weekday() < 5:
+                return current.strftime("%Y%m%d")
+
+
+# 以下函数用作 core.utils.method_cache.cached 的 ttl，参数是被缓存函数的调用参数
+
+def until_next_session(*args, **kwargs) -> float:
+    """到下一个交易时段开始为止，交易时段内不缓存"""
+    return TradingCalendar().seconds_until_next_session()
+
+
+def intraday(seconds: float):
+    """交易时段内 seconds 秒，其余时间到下一个交易时段开始为止"""
+    def ttl(*args, **kwargs) -> float:
+        return until_next_session() or seconds
+    return ttl
+
+
+def until_settled(day: DateLike, *args, **kwargs) -> Optional[float]:
+    """第一个参数是交易日的数据：当天收盘后不再变化，不过期；否则到下一个交易时段开始为止"""
+    calendar = TradingCalendar()
+    now = calendar.now()
+    day = calendar._resolve(day)
+    today = now.strftime("%Y%m%d")
+    if day < today or (day == today and now.time() >= AFTERNOON[1]):
+        return None
+    return until_next_session()
+
+
+# 定期报告的法定披露截止日：报告期月日 -> (相差年数, 截止月日)
+REPORT_DEADLINES = {"0331": (0, "0430"), "0630": (0, "0831"), "0930": (0, "1031"), "1231": (1, "0430")}
+
+
+def until_reported(seconds: float):
+    """
+    第一个参数是报告期（YYYYMMDD，或 ak.stock_institute_hold 使用的 YYYYQ）：
+    过了披露截止日后数据不再变化，不过期；否则同 intraday(seconds)，披露期内的新公告能及时出现
+    """
+    fallback = intraday(seconds)
+
+    def ttl(period: str, *args, **kwargs) -> Optional[float]:
+        period = str(period).replace("-", "")
+        if len(period) == 5:
+            period = period[:4] + ("0331", "0630", "0930", "1231")[int(period[4]) - 1]
+        if period[4:] not in REPORT_DEADLINES:
+            return fallback()
+        years, deadline = REPORT_DEADLINES[period[4:]]
+        deadline = f"{int(period[:4]) + years}{deadline}"
+        if TradingCalendar().today() > deadline:
+            return None
+        return fallback()
+    return ttl
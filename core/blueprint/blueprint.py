@@ -1,3 +1,4 @@
+import contextvars
 import os
 import pickle
 from typing import Generator
@@ -8,9 +9,26 @@ from .blueprint_builder import BluePrintBuilder
 from .blueprint_coder import BluePrintCoder
 from .blueprint_executor import BluePrintExecutor
 from .blueprint_reporter import BluePrintReporter
+from .blueprint_scheduler import BluePrintScheduler
 from .step_model_collection import StepModelCollection
+from ..llms.telemetry import tagged
+from ..planner.message import send_message
+from ..utils.log import logger
+from concurrent.futures import Future, ThreadPoolExecutor
 from tenacity import retry, stop_after_attempt
 
+
+class _Speculation:
+    """后台预生成的某一步的代码，以及生成时看到的数据状态"""
+    def __init__(self, step: BaseStepModel, gen_code: bool):
+        self.step = step
+        self.gen_code = gen_code
+        self.future: Future = None
+        self.pre_messages: list = None
+        self.code_messages: list = None
+        self.assumptions: dict = None
+
+
 class BluePrint:
     def __init__(self):
         self.blueprint_builder = BluePrintBuilder()
@@ -20,6 +38,9 @@ class BluePrint:
         self._blueprint:StepModelCollection =None
         self.max_retry = 3
         self.step_data = StepData()
+        from ..utils.config_setting import Config
+        config = Config()
+        self.pipeline_enabled = config.get("blueprint_pipeline") != "false" if config.has_key("blueprint_pipeline") else True
     
     @property
     def blueprint(self)->StepModelCollection:
@@ -31,42 +52,123 @@ class BluePrint:
         self.blueprint_builder.blueprint = value
     
     def build_blueprint(self,query:str)->Generator[dict[str,any],None,None]:
-        yield from self.blueprint_builder.build_blueprint(query)
+        yield from tagged(self.blueprint_builder.build_blueprint(query), site="plan")
         self._blueprint = self.blueprint_builder.blueprint
 
     def modify_blueprint(self,query:str,steps:dict[str,any])->Generator[dict[str,any],None,None]:
-        yield from self.blueprint_builder.modify_blueprint(query)
+        yield from tagged(self.blueprint_builder.modify_blueprint(query), site="plan")
         self._blueprint = self.blueprint_builder.blueprint
     
-    def generate_and_execute_all(self)->Generator[dict[str,any],None,None]:
+    def generate_and_execute_all(self,on_step_start=None)->Generator[dict[str,any],None,None]:
+        """
+        按数据依赖执行所有步骤，互不依赖的步骤并行生成代码和执行；
+        无法并行时按顺序执行，并在执行当前步骤的同时预先生成下一步的代码
+
+        :param on_step_start: 可选，接收一个步骤，返回该步骤开始时要发送的消息
+        """
+        self._ensure_components()
+        scheduler = BluePrintScheduler(self._blueprint,self.step_data)
+        yield from scheduler.run(
+            lambda step: self._announce(step,on_step_start,self.generate_step(step)),
+            sequential=lambda steps: self.generate_and_execute_pipelined(steps,on_step_start))
+
+    def generate_and_execute_pipelined(self,steps:list[BaseStepModel]=None,on_step_start=None)->Generator[dict[str,any],None,None]:
+        """
+        顺序执行步骤，执行第 N 步的同时在后台生成第 N+1 步的代码。
+        第 N+1 步依赖第 N 步的输出时只预先做提示增强；
+        执行完第 N 步后如果第 N+1 步看到的数据和预生成时不一样，就重新生成代码。
+        """
+        self._ensure_components()
+        steps = list(self._blueprint) if steps is None else steps
+        if not self.pipeline_enabled:
+            for step in steps:
+                yield from self._announce(step,on_step_start,self.generate_step(step))
+            return
+        pool = ThreadPoolExecutor(max_workers=1,thread_name_prefix="speculate")
+        speculation = None
+        try:
+            for index, step in enumerate(steps):
+                if on_step_start is not None:
+                    yield on_step_start(step)
+                if speculation is not None:
+                    yield from self._take_speculation(speculation)
+                else:
+                    yield from self.generate_step_code(step)
+                speculation = None
+                if index + 1 < len(steps):
+                    speculation = self._speculate(pool,step,steps[index + 1])
+                yield from self.execute_step(step)
+        finally:
+            pool.shutdown(wait=False)
+
+    def _speculate(self,pool:ThreadPoolExecutor,current:BaseStepModel,step:BaseStepModel)->"_Speculation":
+        outputs = BluePrintScheduler.step_outputs(current)
+        speculation = _Speculation(step, gen_code=not outputs.intersection(step.required_data))
+
+        def work():
+            speculation.pre_messages = list(self.step_data.bind(self.blueprint_coder.pre_enhance_step(step)))
+            if speculation.gen_code:
+                speculation.assumptions = self.blueprint_coder.data_assumptions(step)
+                speculation.code_messages = list(self.step_data.bind(self.blueprint_coder.gen_step_code(step)))
+
+        # 后台线程沿用当前的 LLM 调用标签（会话等）
+        speculation.future = pool.submit(contextvars.copy_context().run, work)
+        return speculation
+
+    def _take_speculation(self,speculation:"_Speculation")->Generator[dict[str,any],None,None]:
+        step = speculation.step
+        try:
+            speculation.future.result()
+        except Exception as e:
+            logger.warning(f"预生成步骤 {step.step_number} 的代码失败: {str(e)}")
+        if speculation.pre_messages is None:
+            yield from self.generate_step_code(step)
+            return
+        yield from speculation.pre_messages
+        if speculation.code_messages is not None and speculation.assumptions == self.blueprint_coder.data_assumptions(step):
+            yield from speculation.code_messages
+            return
+        if speculation.code_messages is not None:
+            yield send_message(f"步骤 {step.step_number} 依赖的数据已变化，重新生成代码", "info")
+        yield from self.step_data.bind(self.blueprint_coder.gen_step_code(step))
+
+    def _announce(self,step:BaseStepModel,on_step_start,generator)->Generator[dict[str,any],None,None]:
+        if on_step_start is not None:
+            yield on_step_start(step)
+        yield from generator
+
+    def _ensure_components(self):
         if self._blueprint is None:
             raise Exception("请先生成蓝图")
         if self.blueprint_coder is None:
             self.blueprint_coder = BluePrintCoder(self._blueprint,self.step_data)
         if self.blueprint_executor is None:
-            self.blueprint_executor = BluePrintExecutor(self._blueprint,self.step_data) 
-        for step in self._blueprint:
-            yield from self.blueprint_coder.generate_step(step)
-            yield from self.blueprint_executor.excute_step(step)
-    
+            self.blueprint_executor = BluePrintExecutor(self._blueprint,self.step_data)
+
+    def generate_step_code(self,step:BaseStepModel)->Generator[dict[str,any],None,None]:
+        self._ensure_components()
+        yield from self.step_data.bind(self.blueprint_coder.generate_step(step))
+
+    def execute_step(self,step:BaseStepModel)->Generator[dict[str,any],None,None]:
+        self._ensure_components()
+        yield from self.step_data.bind(self.blueprint_executor.excute_step(step))
+
     def generate_step(self,step:BaseStepModel)->Generator[dict[str,any],None,None]:
-        if self._blueprint is None:
-            raise Exception("请先生成蓝图")
-        if self.blueprint_coder is None:
-            self.blueprint_coder = BluePrintCoder(self._blueprint,self.step_data)
-        if self.blueprint_executor is None:
-            self.blueprint_executor = BluePrintExecutor(self._blueprint,self.step_data) 
-        yield from self.blueprint_coder.generate_step(step)
-        yield from self.blueprint_executor.excute_step(step)
+        yield from self.generate_step_code(step)
+        yield from self.execute_step(step)
 
     def final_report(self)->Generator[dict[str,any],None,None]:
         if self.blueprint_reporter is None:
             self.blueprint_reporter = BluePrintReporter(self._blueprint,self.step_data)
-        yield from self.blueprint_reporter.report()
+        yield from tagged(self.step_data.bind(self.blueprint_reporter.report()), site="report")
 
     def clear(self):
         self.blueprint_builder.clear()
         self.step_data = StepData()
+        # 旧的 coder/executor 持有旧的 StepData，需要重新创建
+        self.blueprint_coder = None
+        self.blueprint_executor = None
+        self.blueprint_reporter = None
         self.blueprint = None
 
     
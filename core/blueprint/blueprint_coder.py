@@ -4,6 +4,7 @@ from .step_info_provider import StepInfoProvider
 from .step_model_collection import StepModelCollection
 from ._base_step_model import BaseStepModel
 from typing import Generator, Dict, Any
+from ..llms.telemetry import tagged
 
 class BluePrintCoder:
     def __init__(self,blueprint:StepModelCollection,step_data:StepData):
@@ -12,7 +13,7 @@ class BluePrintCoder:
         self.step_info_provider = StepInfoProvider()
         self.generator_dict:Dict[int,StepCodeGenerator]={}
     
-    def generate_step(self,step_info:BaseStepModel)->Generator[Dict[str,Any],None,None]:
+    def get_code_generator(self,step_info:BaseStepModel)->StepCodeGenerator:
         step_number = step_info.step_number
         if step_number not in self.generator_dict:
             info_generator =self.step_info_provider.select_generator(step_info.type)
@@ -21,13 +22,30 @@ class BluePrintCoder:
             code_generator = code_generator_class(step_info,self.step_data)
             self._code_generator = code_generator
             self.generator_dict[step_number] = code_generator
-        code_generator = self.generator_dict[step_number]
-        yield from code_generator.pre_enhancement()
-        yield from code_generator.gen_step_code()
-        yield from code_generator.post_enhancement()
-        code_generator.make_step_sure()
+        return self.generator_dict[step_number]
+
+    def generate_step(self,step_info:BaseStepModel)->Generator[Dict[str,Any],None,None]:
+        yield from self.pre_enhance_step(step_info)
+        yield from self.gen_step_code(step_info)
+
+    def pre_enhance_step(self,step_info:BaseStepModel)->Generator[Dict[str,Any],None,None]:
+        """增强代码生成提示，不依赖前面步骤产生的数据"""
+        code_generator = self.get_code_generator(step_info)
+        yield from tagged(code_generator.pre_enhancement(), step=step_info.step_number, site="enhancement")
 
+    def gen_step_code(self,step_info:BaseStepModel)->Generator[Dict[str,Any],None,None]:
+        """生成并检查代码，依赖 required_data 的数据摘要"""
+        code_generator = self.get_code_generator(step_info)
+        yield from tagged(code_generator.gen_step_code(), step=step_info.step_number, site="code_gen")
+        yield from tagged(code_generator.post_enhancement(), step=step_info.step_number, site="enhancement")
+        code_generator.make_step_sure()
 
+    def data_assumptions(self,step_info:BaseStepModel)->Dict[str,Any]:
+        """生成代码时能看到的 required_data 状态，用于判断预先生成的代码是否过期"""
+        return {
+            var: (self.step_data.is_exists(var), self.step_data.get(f"{var}_summary"))
+            for var in step_info.required_data
+        }
 
     def generate_code(self)-> Generator[Dict[str, Any], None, None]:
         for step in self.blueprint:
@@ -47,6 +65,6 @@ class BluePrintCoder:
             code_generator = code_generator_class(step, self.step_data)
             self.generator_dict[step_number] = code_generator
         
-        yield from code_generator.modify_step_code(step_number, query)
+        yield from tagged(code_generator.modify_step_code(step_number, query), step=step_number, site="code_modify")
         
         
\ No newline at end of file
@@ -6,6 +6,7 @@ from core.blueprint._step_abstract import StepExecutor
 from core.blueprint.step_data import StepData
 from core.blueprint.step_info_provider import StepInfoProvider
 from core.blueprint.step_model_collection import StepModelCollection
+from core.llms.telemetry import tagged
 
 
 class BluePrintExecutor:
@@ -23,6 +24,6 @@ class BluePrintExecutor:
             step_executor=step_executor_class(step_info,self.step_data)
             self.generator_dict[step_number] = step_executor
         executor = self.generator_dict[step_number]
-        yield from executor.execute_step_code()
+        yield from tagged(executor.execute_step_code(), step=step_number, site="execute")
     
     
\ No newline at end of file
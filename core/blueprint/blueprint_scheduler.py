@@ -0,0 +1,158 @@
+import contextvars
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Generator, List, Optional, Set, Tuple
+
+from ._base_step_model import BaseStepModel
+from .step_data import StepData
+from .step_model_collection import StepModelCollection
+from ..planner.message import send_message
+from ..utils.log import logger
+
+
+class BluePrintScheduler:
+    """
+    根据步骤声明的 required_data / save_data_to 建立依赖图，
+    没有依赖关系的步骤在线程池中同时生成代码和执行。
+    依赖图有环、某个变量被多个步骤写入、或者依赖了没有任何步骤产出的数据时，退回按顺序执行。
+    """
+    def __init__(self, blueprint: StepModelCollection, step_data: StepData, max_workers: Optional[int] = None):
+        self.blueprint = blueprint
+        self.step_data = step_data
+        if max_workers is None:
+            from ..utils.config_setting import Config
+            config = Config()
+            max_workers = int(config.get("blueprint_max_workers")) if config.has_key("blueprint_max_workers") else 4
+        self.max_workers = max(1, max_workers)
+
+    @staticmethod
+    def step_outputs(step: BaseStepModel) -> Set[str]:
+        outputs = set(step.save_data_to)
+        analysis_result = getattr(step, "analysis_result", None)
+        if analysis_result:
+            outputs.add(analysis_result)
+        return outputs
+
+    def build_dependencies(self) -> Tuple[Optional[Dict[int, Set[int]]], str]:
+        """
+        返回 (step_number -> 依赖的 step_number 集合, 错误原因)
+        无法建立可靠的依赖图时返回 (None, 原因)
+        """
+        producers: Dict[str, int] = {}
+        for step in self.blueprint:
+            for var in self.step_outputs(step):
+                if var in producers and producers[var] != step.step_number:
+                    return None, f"变量 {var} 同时被步骤 {producers[var]} 和步骤 {step.step_number} 写入"
+                producers[var] = step.step_number
+
+        dependencies: Dict[int, Set[int]] = {}
+        for step in self.blueprint:
+            deps = set()
+            for var in step.required_data:
+                producer = producers.get(var)
+                if producer is None:
+                    if self.step_data.is_exists(var):
+                        continue
+                    return None, f"步骤 {step.step_number} 依赖的数据 {var} 没有被任何步骤声明"
+                if producer != step.step_number:
+                    deps.add(producer)
+            dependencies[step.step_number] = deps
+
+        # Kahn 算法检查是否有环
+        indegree = {n: len(deps) for n, deps in dependencies.items()}
+        ready = [n for n, d in indegree.items() if d == 0]
+        visited = 0
+        while ready:
+            n = ready.pop()
+            visited += 1
+            for m, deps in dependencies.items():
+                if n in deps:
+                    indegree[m] -= 1
+                    if indegree[m] == 0:
+                        ready.append(m)
+        if visited != len(dependencies):
+            return None, "步骤之间的数据依赖存在循环"
+        return dependencies, ""
+
+    def run(self, step_func: Callable[[BaseStepModel], Generator[Any, None, None]],
+            sequential: Optional[Callable[[List[BaseStepModel]], Generator[Any, None, None]]] = None) -> Generator[Dict[str, Any], None, None]:
+        """
+        执行所有步骤，step_func(step) 返回该步骤的消息生成器。
+        并行执行时每条消息都带上 step 字段，标明来自哪个步骤。
+        退回顺序执行时，如果提供了 sequential(steps)，由它执行全部步骤。
+        """
+        dependencies, reason = self.build_dependencies()
+        if dependencies is None or self.max_workers == 1 or len(self.blueprint) <= 1:
+            if dependencies is None:
+                logger.warning(f"无法并行执行步骤: {reason}")
+                yield send_message(f"{reason}，按顺序执行所有步骤", "info")
+            if sequential is not None:
+                yield from sequential(list(self.blueprint))
+                return
+            for step in self.blueprint:
+                yield from step_func(step)
+            return
+        yield from self._run_parallel(dependencies, step_func)
+
+    def _run_parallel(self, dependencies: Dict[int, Set[int]],
+                      step_func: Callable[[BaseStepModel], Generator[Any, None, None]]) -> Generator[Dict[str, Any], None, None]:
+        events: "queue.Queue[Tuple[str, int, Any]]" = queue.Queue()
+        cancelled = threading.Event()
+        pending = {n: set(deps) for n, deps in dependencies.items()}
+        running: Set[int] = set()
+        error: Optional[BaseException] = None
+
+        def worker(step: BaseStepModel):
+            generator = step_func(step)
+            try:
+                for item in generator:
+                    if cancelled.is_set():
+                        break
+                    events.put(("item", step.step_number, item))
+                events.put(("done", step.step_number, None))
+            except BaseException as e:
+                events.put(("error", step.step_number, e))
+            finally:
+                generator.close()
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="blueprint")
+
+        def submit_ready():
+            for n in sorted(pending):
+                if not pending[n]:
+                    del pending[n]
+                    running.add(n)
+                    # 工作线程沿用当前的 LLM 调用标签（会话等）
+                    executor.submit(contextvars.copy_context().run, worker, self.blueprint[n])
+
+        try:
+            submit_ready()
+            while running:
+                kind, step_number, payload = events.get()
+                if kind == "item":
+                    yield self._tag(payload, step_number)
+                    continue
+                running.discard(step_number)
+                if kind == "error":
+                    # 不再启动新的步骤，等正在运行的步骤结束后抛出第一个错误
+                    error = error or payload
+                    pending.clear()
+                    continue
+                for deps in pending.values():
+                    deps.discard(step_number)
+                if error is None:
+                    submit_ready()
+        finally:
+            cancelled.set()
+            executor.shutdown(wait=False)
+        if error is not None:
+            raise error
+
+    @staticmethod
+    def _tag(item: Any, step_number: int) -> Dict[str, Any]:
+        if isinstance(item, dict):
+            if "step" not in item:
+                item = {**item, "step": step_number}
+            return item
+        return send_message(item, "text", step=step_number)
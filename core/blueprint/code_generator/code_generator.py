@@ -13,7 +13,6 @@ from core.blueprint.llm_tools import LLMTools
 from core.blueprint.step_data import StepData
 from core.planner.code_enhancement_system import CodeEnhancementSystem
 from core.planner.message import send_message
-from core.utils.code_tools import code_tools
 
 
 class CodeGenStepCodeGenerator(StepCodeGenerator):
@@ -46,7 +45,7 @@ class CodeGenStepCodeGenerator(StepCodeGenerator):
         has_callable = False
 
         for data_var in required_data_list:
-            real_var = code_tools[data_var]
+            real_var = self.step_data[data_var]
             if callable(real_var):
                 has_callable = True
             data_summary = self.step_data.get(f"{data_var}_summary", "数据摘要不可用")
@@ -46,7 +46,7 @@ class LLMParseStepCodeGenerator(StepCodeGenerator):
         has_callable = False
 
         for data_var in required_data_list:
-            real_var = code_tools[data_var]
+            real_var = self.step_data[data_var]
             if callable(real_var):
                 has_callable = True
             data_summary = self.step_data.get(f"{data_var}_summary", "数据摘要不可用")
@@ -69,4 +69,9 @@ class LLMProvider:
         return self._embedding_factory.get_instance()
     
     def new_code_runner(self):
+        from ..utils.config_setting import Config
+        config = Config()
+        if config.has_key("code_runner") and config.get("code_runner") == "process":
+            from ..interpreter.process_code_runner import ProcessCodeRunner
+            return ProcessCodeRunner()
         return ASTCodeRunner()
\ No newline at end of file
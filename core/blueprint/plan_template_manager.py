@@ -2,6 +2,7 @@ import json
 import re
 from typing import List, Dict, Optional
 from core.llms._llm_api_client import LLMApiClient
+from core.llms.response_cache import cached_one_chat
 
 class PlanTemplateManager:
     def __init__(self, llm_client: LLMApiClient):
@@ -63,7 +64,7 @@ class PlanTemplateManager:
         }}
         ```
         """
-        response = self.llm_client.one_chat(prompt)
+        response = cached_one_chat(self.llm_client, "plan_template", prompt)
         
         try:
             # 提取JSON字符串
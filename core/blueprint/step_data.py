@@ -2,15 +2,14 @@ from typing import Any, Dict
 from .llm_provider import LLMProvider
 from core.utils.code_tools import code_tools
 
-# 初始化这个类会导致code_tools 清空，所以同一时间，只能有一个StepData ,  因为同一时间只允许一个code_tools ,多了就会错误
+# 每个StepData持有独立的code_tools变量空间，生成的代码需要在 bind/activate 的上下文中执行才能访问到它
 class StepData:
     def __init__(self):
         self._global_vars: Dict[str, Any] = {}
         self._step_vars: Dict[int, Dict[str, Any]] = {}
         self._step_codes: Dict[int, str] = {}
         self.llm_provider = LLMProvider()
-        self._tools = code_tools
-        self._tools.clear()
+        self._tools = code_tools.root.new_namespace()
         self.add_default_vars()
         self._report = ""
 
@@ -62,6 +61,17 @@ class StepData:
     def is_exists(self, name):
         return self._tools.is_exists(name)
 
+    def get(self, name, default=None):
+        if self._tools.is_exists(name):
+            return self._tools[name]
+        return default
+
+    def bind(self, generator):
+        return self._tools.bind(generator)
+
+    def activate(self):
+        return self._tools.activate()
+
     def get_step_code(self, step_id: int):
         return self._step_codes.get(step_id, "")
     
@@ -95,6 +105,5 @@ class StepData:
 
     def __setstate__(self, state):
         self.__dict__.update(state)
-        self._tools = code_tools  # 反序列化时重新获取 code_tools
-        self._tools.clear()
+        self._tools = code_tools.root.new_namespace()  # 反序列化时重新创建变量空间
         self.add_default_vars()
\ No newline at end of file
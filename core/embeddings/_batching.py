@@ -0,0 +1,190 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from ..utils.config_setting import Config
+from ..utils.single_ton import Singleton
+from ..utils.log import logger
+from ._embedding import Embedding
+from ._ranker import Ranker
+
+
+def is_local_model(instance: Any) -> bool:
+    """SentenceTransformer / CrossEncoder 等在本进程内推理的后端（API 类后端的 model 是模型名字符串）"""
+    model = getattr(instance, "model", None)
+    return model is not None and not isinstance(model, str)
+
+
+class MicroBatcher:
+    """
+    把多个线程的小请求合并成大批次交给同一个模型。
+    工作线程取出队列里已有的全部请求；最近有并发请求时再最多等待 max_wait 秒凑批，
+    合并后按长度排序切成 bucket_size 大小的桶，长度相近的文本在一起，每个桶一次前向计算（padding 最少），
+    结果按原来的顺序分回各个请求。单个调用方串行请求时不等待，不增加延迟。
+    """
+    def __init__(self, name: str, func: Callable[[List[Any]], Any], length: Callable[[Any], int] = len,
+                 max_wait: float = 0.005, max_items: int = 128, bucket_size: int = 32):
+        self.name = name
+        self.func = func
+        self.length = length
+        self.max_wait = max_wait
+        self.max_items = max_items
+        self.bucket_size = bucket_size
+        self._queue: "queue.Queue[Tuple[List[Any], Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._concurrent = False
+        self.stats = {"requests": 0, "items": 0, "batches": 0, "forward_passes": 0, "max_batch_requests": 0}
+
+    def submit(self, items: List[Any]) -> List[Any]:
+        if not items:
+            return []
+        future: Future = Future()
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"batch-{self.name}", daemon=True)
+                self._thread.start()
+        self._queue.put((list(items), future))
+        return future.result()
+
+    def _collect(self) -> List[Tuple[List[Any], Future]]:
+        requests = [self._queue.get()]
+        count = len(requests[0][0])
+        deadline = time.monotonic() + (self.max_wait if self._concurrent else 0)
+        while count < self.max_items:
+            try:
+                remaining = deadline - time.monotonic()
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            requests.append(request)
+            count += len(request[0])
+        self._concurrent = len(requests) > 1
+        return requests
+
+    def _run(self):
+        while True:
+            requests = self._collect()
+            try:
+                self._process(requests)
+            except Exception as e:
+                # 合并的批次失败时逐个请求重试，一个请求的错误不影响其他请求
+                logger.warning(f"{self.name} 合并批次失败，逐个重试: {str(e)}")
+                for items, future in requests:
+                    if not future.done():
+                        try:
+                            future.set_result(list(self.func(items)))
+                        except Exception as error:
+                            future.set_exception(error)
+
+    def _process(self, requests: List[Tuple[List[Any], Future]]):
+        flat = [item for items, _ in requests for item in items]
+        order = sorted(range(len(flat)), key=lambda index: self.length(flat[index]))
+        results: List[Any] = [None] * len(flat)
+        passes = 0
+        for start in range(0, len(order), self.bucket_size):
+            bucket = order[start:start + self.bucket_size]
+            for index, value in zip(bucket, self.func([flat[index] for index in bucket])):
+                results[index] = value
+            passes += 1
+        offset = 0
+        for items, future in requests:
+            future.set_result(results[offset:offset + len(items)])
+            offset += len(items)
+        with self._lock:
+            self.stats["requests"] += len(requests)
+            self.stats["items"] += len(flat)
+            self.stats["batches"] += 1
+            self.stats["forward_passes"] += passes
+            self.stats["max_batch_requests"] = max(self.stats["max_batch_requests"], len(requests))
+
+
+class BatchingService(metaclass=Singleton):
+    """
+    本地模型的批处理服务，每个模型类一个 MicroBatcher，同一个类的所有实例共用一个已加载的模型。
+    配置：model_batching（默认开启），model_batch_wait_ms（默认 5），
+    model_batch_max_items（每批最多的文本数，默认 128），model_batch_bucket_size（每次前向计算的文本数，默认 32）
+    """
+    def __init__(self):
+        config = Config()
+        self.enabled = str(config.get("model_batching")).lower() not in ("0", "false", "no", "off") if config.has_key("model_batching") else True
+        self.max_wait = float(config.get("model_batch_wait_ms")) / 1000 if config.has_key("model_batch_wait_ms") else 0.005
+        self.max_items = int(config.get("model_batch_max_items")) if config.has_key("model_batch_max_items") else 128
+        self.bucket_size = int(config.get("model_batch_bucket_size")) if config.has_key("model_batch_bucket_size") else 32
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[Any]:
+        """已经注册过的同名批处理实例，没有时返回 None"""
+        with self._lock:
+            return self._instances.get(name)
+
+    def wrap_embedding(self, name: str, embedding: Embedding) -> Embedding:
+        """本地模型包装成批处理实例并注册；API 类后端或关闭批处理时原样返回"""
+        if not self.enabled or not is_local_model(embedding):
+            return embedding
+        with self._lock:
+            if name not in self._instances:
+                self._instances[name] = BatchedEmbedding(embedding, self._batcher(name, embedding.convert_to_embedding, len))
+            return self._instances[name]
+
+    def wrap_ranker(self, name: str, ranker: Ranker) -> Ranker:
+        if not self.enabled or not is_local_model(ranker):
+            return ranker
+        with self._lock:
+            if name not in self._instances:
+                self._instances[name] = BatchedRanker(ranker, self._batcher(name, ranker.get_scores, _pair_length))
+            return self._instances[name]
+
+    def _batcher(self, name: str, func: Callable[[List[Any]], Any], length: Callable[[Any], int]) -> MicroBatcher:
+        return MicroBatcher(name, func, length, max_wait=self.max_wait, max_items=self.max_items, bucket_size=self.bucket_size)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {name: dict(instance.batcher.stats) for name, instance in self._instances.items()}
+
+
+def _pair_length(pair: List[str]) -> int:
+    return sum(len(text) for text in pair)
+
+
+class BatchedEmbedding(Embedding):
+    """通过 MicroBatcher 调用被包装的 Embedding，其他属性和方法透传"""
+    def __init__(self, embedding: Embedding, batcher: MicroBatcher):
+        self.embedding = embedding
+        self.batcher = batcher
+
+    def convert_to_embedding(self, input_strings: List[str]) -> List[List[float]]:
+        return [vector.tolist() if isinstance(vector, np.ndarray) else vector for vector in self.batcher.submit(input_strings)]
+
+    @property
+    def vector_size(self) -> int:
+        return self.embedding.vector_size
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "embedding":
+            raise AttributeError(name)
+        return getattr(self.embedding, name)
+
+    def __setattr__(self, name: str, value: Any):
+        if name in ("embedding", "batcher"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.embedding, name, value)
+
+
+class BatchedRanker(Ranker):
+    """通过 MicroBatcher 调用被包装的 Ranker，其他属性和方法透传"""
+    def __init__(self, ranker: Ranker, batcher: MicroBatcher):
+        self.ranker = ranker
+        self.batcher = batcher
+
+    def get_scores(self, pairs: List[List[str]]) -> List[float]:
+        return np.asarray(self.batcher.submit(pairs))
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "ranker":
+            raise AttributeError(name)
+        return getattr(self.ranker, name)
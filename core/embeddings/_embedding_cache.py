@@ -0,0 +1,215 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from ..utils.config_setting import Config
+from ..utils.single_ton import Singleton
+from ..utils.log import logger
+from ._embedding import Embedding
+
+# SQLite 单条语句的参数个数有上限，按块查询
+_QUERY_CHUNK = 500
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def model_name_of(embedding: Embedding) -> str:
+    """缓存按模型区分：类名，加上 API 类 Embedding 配置的模型名（如 text-embedding-v2）或本地模型的推理后端，以及向量类型"""
+    # 批处理等包装层用 embedding 属性指向实际的 Embedding
+    while isinstance(getattr(embedding, "embedding", None), Embedding):
+        embedding = embedding.embedding
+    name = type(embedding).__name__
+    model = getattr(embedding, "model", None)
+    if isinstance(model, str) and model:
+        name = f"{name}:{model}"
+    elif isinstance(getattr(model, "backend", None), str):
+        # 本地模型换用 ONNX / int8 后端时向量略有差别，分开缓存
+        name = f"{name}:{model.backend}"
+    # MiniMax 等区分 query / db 两种向量
+    emb_type = getattr(embedding, "emb_type", None)
+    return f"{name}|{emb_type}" if isinstance(emb_type, str) else name
+
+
+class EmbeddingCache(metaclass=Singleton):
+    """
+    按 (模型, 文本哈希) 缓存向量，所有 Embedding 共用。
+    内存中是一个 LRU（embedding_cache_memory_items，默认 50000 条），
+    磁盘上是 SQLite（embedding_cache_path，默认 ./database/embedding_cache.db），
+    条目数超过 embedding_cache_max_entries（默认 200000）时删除最早写入的。
+    """
+    def __init__(self, db_path: Optional[str] = None):
+        config = Config()
+        if db_path is None:
+            db_path = config.get("embedding_cache_path") if config.has_key("embedding_cache_path") else './database/embedding_cache.db'
+        self.memory_items = int(config.get("embedding_cache_memory_items")) if config.has_key("embedding_cache_memory_items") else 50000
+        self.max_entries = int(config.get("embedding_cache_max_entries")) if config.has_key("embedding_cache_max_entries") else 200000
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._writes = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        try:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (model, hash)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_created_at ON embeddings (created_at)")
+        except Exception as e:
+            logger.error(f"初始化向量缓存的磁盘存储失败，只使用内存缓存: {str(e)}")
+            self._conn = None
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """批量查找，返回命中的 hash -> 向量；先查内存，再查磁盘，磁盘命中的放入内存"""
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            stats = self._model_stats(model)
+            missing = []
+            for h in hashes:
+                vector = self._lru.get((model, h))
+                if vector is None:
+                    missing.append(h)
+                    continue
+                self._lru.move_to_end((model, h))
+                found[h] = vector
+            stats["memory_hits"] += len(found)
+            if missing and self._conn is not None:
+                for start in range(0, len(missing), _QUERY_CHUNK):
+                    chunk = missing[start:start + _QUERY_CHUNK]
+                    rows = self._conn.execute(
+                        f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({','.join('?' * len(chunk))})",
+                        [model, *chunk]).fetchall()
+                    for h, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        found[h] = vector
+                        self._remember(model, h, vector)
+                    stats["disk_hits"] += len(rows)
+            stats["misses"] += len(hashes) - len(found)
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, np.ndarray]):
+        now = time.time()
+        with self._lock:
+            for h, vector in vectors.items():
+                self._remember(model, h, vector)
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute("BEGIN")
+                self._conn.executemany("INSERT OR REPLACE INTO embeddings (model, hash, vector, created_at) VALUES (?, ?, ?, ?)",
+                                       [(model, h, vector.astype(np.float32).tobytes(), now) for h, vector in vectors.items()])
+                self._conn.execute("COMMIT")
+            except Exception as e:
+                self._conn.execute("ROLLBACK")
+                logger.warning(f"写入向量缓存失败: {str(e)}")
+                return
+            self._writes += len(vectors)
+            if self._writes >= 1000:
+                self._writes = 0
+                self._prune()
+
+    def _remember(self, model: str, h: str, vector: np.ndarray):
+        # 调用方持有锁
+        self._lru[(model, h)] = vector
+        self._lru.move_to_end((model, h))
+        while len(self._lru) > self.memory_items:
+            self._lru.popitem(last=False)
+
+    def _prune(self):
+        overflow = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY created_at LIMIT ?)", (overflow,))
+
+    def _model_stats(self, model: str) -> Dict[str, int]:
+        return self._stats.setdefault(model, {"memory_hits": 0, "disk_hits": 0, "misses": 0, "deduplicated": 0})
+
+    def count_duplicates(self, model: str, duplicates: int):
+        with self._lock:
+            self._model_stats(model)["deduplicated"] += duplicates
+
+    def stats(self) -> Dict[str, Any]:
+        """本进程内各模型的命中情况，以及磁盘上各模型的条目数"""
+        with self._lock:
+            session = {}
+            for model, stats in self._stats.items():
+                lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+                hits = stats["memory_hits"] + stats["disk_hits"]
+                session[model] = dict(stats, hit_rate=round(hits / lookups, 4) if lookups else 0.0)
+            stored = {}
+            if self._conn is not None:
+                stored = dict(self._conn.execute("SELECT model, COUNT(*) FROM embeddings GROUP BY model").fetchall())
+            return {"session": session, "stored": stored, "memory_items": len(self._lru)}
+
+    def clear(self, model: Optional[str] = None):
+        with self._lock:
+            if model is None:
+                self._lru.clear()
+            else:
+                for key in [key for key in self._lru if key[0] == model]:
+                    del self._lru[key]
+            if self._conn is not None:
+                if model is None:
+                    self._conn.execute("DELETE FROM embeddings")
+                else:
+                    self._conn.execute("DELETE FROM embeddings WHERE model = ?", (model,))
+
+
+class CachedEmbedding(Embedding):
+    """
+    包装任意 Embedding：同一批内重复的文本只算一次，整批先查缓存，只有未命中的文本交给模型 / API。
+    返回的向量统一为 float32 精度，命中和未命中时结果一致。其他属性和方法透传给被包装的 Embedding。
+    """
+    def __init__(self, embedding: Embedding, cache: Optional[EmbeddingCache] = None):
+        self.embedding = embedding
+        self.cache = cache or EmbeddingCache()
+
+    @property
+    def model_name(self) -> str:
+        # emb_type 等属性可能在创建后修改，每次调用时重新计算
+        return model_name_of(self.embedding)
+
+    def convert_to_embedding(self, input_strings: List[str]) -> List[List[float]]:
+        model_name = self.model_name
+        hashes = [text_hash(text) for text in input_strings]
+        unique = dict(zip(hashes, input_strings))
+        if len(unique) < len(hashes):
+            self.cache.count_duplicates(model_name, len(hashes) - len(unique))
+        found = self.cache.get_many(model_name, list(unique))
+        missing = [(h, text) for h, text in unique.items() if h not in found]
+        if missing:
+            vectors = np.asarray(self.embedding.convert_to_embedding([text for _, text in missing]), dtype=np.float32)
+            computed = {h: vector for (h, _), vector in zip(missing, vectors)}
+            self.cache.put_many(model_name, computed)
+            found.update(computed)
+        return [found[h].tolist() for h in hashes]
+
+    @property
+    def vector_size(self) -> int:
+        return self.embedding.vector_size
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "embedding":
+            raise AttributeError(name)
+        return getattr(self.embedding, name)
+
+    def __setattr__(self, name: str, value: Any):
+        # 设置 emb_type 等属性时作用在被包装的 Embedding 上
+        if name in ("embedding", "cache"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.embedding, name, value)
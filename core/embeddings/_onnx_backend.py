@@ -0,0 +1,215 @@
+import json
+import os
+import shutil
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from ..utils.config_setting import Config
+from ..utils.log import logger
+
+# 本地 bge 向量 / 重排模型的推理后端，setting.ini 的 [Default] 中配置：
+#   local_model_backend = torch | onnx | onnx-int8   （默认 torch，即 SentenceTransformer / CrossEncoder）
+#   onnx_threads = 4                                 （ONNX Runtime 的线程数，默认由 ONNX Runtime 决定）
+#   onnx_model_dir = ./database/onnx                 （导出的模型存放位置）
+# onnx 后端第一次使用时用 optimum 把 HuggingFace 模型导出为 ONNX（需要 optimum[exporters] 和 torch），
+# onnx-int8 再做一次动态 int8 量化；之后推理只需要 onnxruntime 和 transformers 的 tokenizer。
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+_tokenizers: Dict[str, Tuple[Any, threading.Lock]] = {}
+_export_lock = threading.Lock()
+
+
+def local_model_backend() -> str:
+    config = Config()
+    backend = str(config.get("local_model_backend")).strip().lower() if config.has_key("local_model_backend") else "torch"
+    if backend not in BACKENDS:
+        logger.warning(f"未知的 local_model_backend: {backend}，使用 torch")
+        return "torch"
+    return backend
+
+
+def load_sentence_model(model_id: str, device: str, token: Optional[str] = None, backend: Optional[str] = None) -> Any:
+    """按 local_model_backend（或指定的 backend）创建 SentenceTransformer 或接口相同（encode）的 ONNX 模型"""
+    backend = backend or local_model_backend()
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_id, device=device, token=token)
+    return OnnxSentenceEncoder(model_id, quantize=backend == "onnx-int8", token=token)
+
+
+def load_cross_encoder(model_id: str, device: str, max_length: int, token: Optional[str] = None,
+                       backend: Optional[str] = None) -> Any:
+    """按 local_model_backend（或指定的 backend）创建 CrossEncoder 或接口相同（predict）的 ONNX 模型"""
+    backend = backend or local_model_backend()
+    if backend == "torch":
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(model_id, device=device, max_length=max_length)
+    return OnnxCrossEncoder(model_id, quantize=backend == "onnx-int8", max_length=max_length, token=token)
+
+
+def _model_dir(model_id: str, task: str, variant: str) -> str:
+    config = Config()
+    root = config.get("onnx_model_dir") if config.has_key("onnx_model_dir") else "./database/onnx"
+    return os.path.join(root, model_id.replace("/", "--"), task, variant)
+
+
+def _download_sentence_config(model_id: str, target: str, token: Optional[str]):
+    # SentenceTransformer 的池化方式、是否归一化、最大长度保存在模型仓库的这几个文件里
+    from huggingface_hub import hf_hub_download
+    for filename in ("modules.json", "sentence_bert_config.json", "1_Pooling/config.json"):
+        try:
+            path = hf_hub_download(model_id, filename, token=token or None)
+        except Exception:
+            continue
+        destination = os.path.join(target, filename.replace("/", "_"))
+        shutil.copyfile(path, destination)
+
+
+def prepare_model(model_id: str, task: str, quantize: bool, token: Optional[str] = None) -> str:
+    """
+    返回可以直接加载的 ONNX 模型目录，不存在时导出（量化版本由 fp32 版本生成）。
+    task 为 optimum 的任务名：feature-extraction（向量模型）或 text-classification（重排模型）
+    """
+    fp32_dir = _model_dir(model_id, task, "fp32")
+    target = _model_dir(model_id, task, "int8") if quantize else fp32_dir
+    if os.path.exists(os.path.join(target, "model.onnx")):
+        return target
+    with _export_lock:
+        if not os.path.exists(os.path.join(fp32_dir, "model.onnx")):
+            try:
+                from optimum.exporters.onnx import main_export
+                from transformers import AutoTokenizer
+            except ImportError as e:
+                raise ImportError(f"导出 ONNX 模型需要安装 optimum[exporters]、onnxruntime 和 torch: {e}")
+            logger.info(f"导出 {model_id} 的 ONNX 模型到 {fp32_dir}，只在第一次使用时执行")
+            temp_dir = fp32_dir + ".tmp"
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            main_export(model_id, output=temp_dir, task=task, token=token or None)
+            AutoTokenizer.from_pretrained(model_id, token=token or None).save_pretrained(temp_dir)
+            if task == "feature-extraction":
+                _download_sentence_config(model_id, temp_dir, token)
+            shutil.rmtree(fp32_dir, ignore_errors=True)
+            os.replace(temp_dir, fp32_dir)
+        if quantize and not os.path.exists(os.path.join(target, "model.onnx")):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            logger.info(f"对 {model_id} 做动态 int8 量化，保存到 {target}")
+            temp_dir = target + ".tmp"
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            # 只复制 tokenizer 和配置文件，模型文件由量化生成
+            shutil.copytree(fp32_dir, temp_dir, ignore=shutil.ignore_patterns("*.onnx", "*.onnx_data", "*.onnx.data"))
+            source = os.path.join(fp32_dir, "model.onnx")
+            # 超过 2GB 的模型（如 bge-m3）导出时权重在外部文件里，量化结果同样使用外部文件
+            external = any(name.startswith("model.onnx_data") or name.endswith(".onnx.data") for name in os.listdir(fp32_dir))
+            quantize_dynamic(source, os.path.join(temp_dir, "model.onnx"), weight_type=QuantType.QInt8,
+                             use_external_data_format=external)
+            shutil.rmtree(target, ignore_errors=True)
+            os.replace(temp_dir, target)
+    return target
+
+
+def cached_tokenizer(model_dir: str) -> Tuple[Any, threading.Lock]:
+    """同一个模型目录的 tokenizer 只加载一次；fast tokenizer 不能被多个线程同时使用，一起返回它的锁"""
+    with _export_lock:
+        if model_dir not in _tokenizers:
+            from transformers import AutoTokenizer
+            _tokenizers[model_dir] = (AutoTokenizer.from_pretrained(model_dir), threading.Lock())
+        return _tokenizers[model_dir]
+
+
+def _session(model_dir: str) -> Any:
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    config = Config()
+    if config.has_key("onnx_threads"):
+        options.intra_op_num_threads = int(config.get("onnx_threads"))
+    # 同一时刻只有一个批次在推理（见 _batching.MicroBatcher），算子之间不需要并行
+    options.inter_op_num_threads = 1
+    return ort.InferenceSession(os.path.join(model_dir, "model.onnx"), options, providers=["CPUExecutionProvider"])
+
+
+class _OnnxModel:
+    """ONNX 模型的公共部分：分词、按长度分批、运行 session"""
+    def __init__(self, model_id: str, task: str, quantize: bool, max_length: int, token: Optional[str]):
+        self.model_id = model_id
+        self.backend = "onnx-int8" if quantize else "onnx"
+        self.model_dir = prepare_model(model_id, task, quantize, token)
+        self.tokenizer, self._tokenizer_lock = cached_tokenizer(self.model_dir)
+        self.session = _session(self.model_dir)
+        self.input_names = {item.name for item in self.session.get_inputs()}
+        self.max_length = min(max_length, getattr(self.tokenizer, "model_max_length", max_length) or max_length)
+
+    def _forward(self, texts: Sequence[Any], text_pairs: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        with self._tokenizer_lock:
+            encoded = self.tokenizer(list(texts), list(text_pairs) if text_pairs is not None else None, padding=True,
+                                     truncation=True, max_length=self.max_length, return_tensors="np")
+        feed = {name: value.astype(np.int64) for name, value in encoded.items() if name in self.input_names}
+        output = self.session.run(None, feed)[0]
+        return output, encoded["attention_mask"]
+
+    def _batched(self, items: Sequence[Any], batch_size: int, run) -> np.ndarray:
+        # 与 SentenceTransformer 一样按长度排序后分批，减少 padding
+        order = np.argsort([-len(item) if isinstance(item, str) else -sum(len(text) for text in item) for item in items], kind="stable")
+        outputs = [run([items[index] for index in order[start:start + batch_size]]) for start in range(0, len(items), batch_size)]
+        result = np.concatenate(outputs) if outputs else np.zeros((0,), dtype=np.float32)
+        restored = np.empty_like(result)
+        restored[order] = result
+        return restored
+
+
+class OnnxSentenceEncoder(_OnnxModel):
+    """与 SentenceTransformer.encode 结果一致的 ONNX 向量模型，池化方式和归一化读取模型自带的 SentenceTransformer 配置"""
+    def __init__(self, model_id: str, quantize: bool = False, token: Optional[str] = None):
+        # 最大长度以模型的 sentence_bert_config.json 为准
+        super().__init__(model_id, "feature-extraction", quantize, 8192, token)
+        settings = self._read_json("sentence_bert_config.json")
+        self.max_length = min(self.max_length, settings.get("max_seq_length", self.max_length))
+        pooling = self._read_json("1_Pooling_config.json")
+        self.pooling = "mean" if pooling.get("pooling_mode_mean_tokens") and not pooling.get("pooling_mode_cls_token") else "cls"
+        modules = self._read_json("modules.json")
+        self.normalize = any("Normalize" in module.get("type", "") for module in modules) if modules else True
+        self.dimension: Optional[int] = pooling.get("word_embedding_dimension")
+
+    def _read_json(self, filename: str) -> Any:
+        path = os.path.join(self.model_dir, filename)
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        hidden, mask = self._forward(texts)
+        if self.pooling == "cls":
+            vectors = hidden[:, 0]
+        else:
+            mask = mask[:, :, None].astype(hidden.dtype)
+            vectors = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors.astype(np.float32)
+
+    def encode(self, sentences: List[str], batch_size: int = 32, **kwargs) -> np.ndarray:
+        if isinstance(sentences, str):
+            return self._encode_batch([sentences])[0]
+        return self._batched(sentences, batch_size, self._encode_batch)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self.dimension is None:
+            self.dimension = int(self._encode_batch(["dimension"]).shape[1])
+        return self.dimension
+
+
+class OnnxCrossEncoder(_OnnxModel):
+    """与 CrossEncoder.predict 结果一致的 ONNX 重排模型（单输出的模型同样经过 sigmoid）"""
+    def __init__(self, model_id: str, quantize: bool = False, max_length: int = 512, token: Optional[str] = None):
+        super().__init__(model_id, "text-classification", quantize, max_length, token)
+
+    def _predict_batch(self, pairs: List[Sequence[str]]) -> np.ndarray:
+        logits, _ = self._forward([pair[0] for pair in pairs], [pair[1] for pair in pairs])
+        if logits.shape[1] == 1:
+            return (1 / (1 + np.exp(-logits[:, 0]))).astype(np.float32)
+        return logits.astype(np.float32)
+
+    def predict(self, sentences: List[Sequence[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        return self._batched(sentences, batch_size, self._predict_batch)
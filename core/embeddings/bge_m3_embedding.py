@@ -1,4 +1,3 @@
-from sentence_transformers import SentenceTransformer
 from typing import List
 from ._embedding import Embedding
 
@@ -15,7 +14,9 @@ class BGEM3Embedding(Embedding):
         if api_key:
             import os
             os.environ['HUGGING_FACE_HUB_TOKEN'] = api_key
-        self.model = SentenceTransformer('BAAI/bge-m3',device=device,token=api_key)
+        from ._onnx_backend import load_sentence_model
+        # local_model_backend 配置为 onnx / onnx-int8 时使用 ONNX Runtime 推理
+        self.model = load_sentence_model('BAAI/bge-m3',device=device,token=api_key)
 
     def convert_to_embedding(self, input_strings: List[str]) -> List[List[float]]:
         return self.model.encode(input_strings).tolist()
@@ -1,4 +1,3 @@
-from sentence_transformers import CrossEncoder
 from typing import List
 from ._ranker import Ranker
 
@@ -15,7 +14,9 @@ class BGEM3Reranker(Ranker):
         if api_key:
             import os
             os.environ['HUGGING_FACE_HUB_TOKEN'] = api_key
-        self.model = CrossEncoder('BAAI/bge-m3',device=device,max_length=max_length)
+        from ._onnx_backend import load_cross_encoder
+        # local_model_backend 配置为 onnx / onnx-int8 时使用 ONNX Runtime 推理
+        self.model = load_cross_encoder('BAAI/bge-m3',device=device,max_length=max_length,token=api_key)
 
     def get_scores(self, pairs:List[List[str]]) -> List[List[float]]:
         return self.model.predict(pairs) 
\ No newline at end of file
@@ -5,6 +5,8 @@ from typing import Dict, Type
 from ..utils.single_ton import Singleton
 from ..utils.config_setting import Config
 from ._embedding import Embedding
+from ._embedding_cache import CachedEmbedding
+from ._batching import BatchingService
 
 class EmbeddingFactory(metaclass=Singleton):
     def __init__(self):
@@ -25,6 +27,10 @@ class EmbeddingFactory(metaclass=Singleton):
                         self.embedding_classes[class_name] = filename[:-3]  # 存储类名和模块名的映射
 
     def get_instance(self, name: str = "") -> Embedding:
+        """
+        返回的实例默认带向量缓存（见 _embedding_cache.EmbeddingCache），配置 embedding_cache = false 关闭；
+        本地模型通过 _batching.BatchingService 合并并发请求，同一个模型只加载一次
+        """
         config = Config()
         if name == "" and config.has_key("embedding_api"):
             name = config.get("embedding_api")
@@ -33,14 +39,21 @@ class EmbeddingFactory(metaclass=Singleton):
         if module_name is None:
             raise ValueError(f"No Embedding implementation found for name: {name}")
         
-        try:
-            module = importlib.import_module(f'.{module_name}', package=__package__)
-            embedding_class = getattr(module, name)
-            return embedding_class()
-        except ImportError as e:
-            raise ImportError(f"Error importing module {module_name}: {e}")
-        except AttributeError:
-            raise ValueError(f"Class {name} not found in module {module_name}")
+        service = BatchingService()
+        embedding = service.get(f"embedding:{name}")
+        if embedding is None:
+            try:
+                module = importlib.import_module(f'.{module_name}', package=__package__)
+                embedding_class = getattr(module, name)
+                embedding = embedding_class()
+            except ImportError as e:
+                raise ImportError(f"Error importing module {module_name}: {e}")
+            except AttributeError:
+                raise ValueError(f"Class {name} not found in module {module_name}")
+            embedding = service.wrap_embedding(f"embedding:{name}", embedding)
+        if config.has_key("embedding_cache") and str(config.get("embedding_cache")).lower() in ("0", "false", "no", "off"):
+            return embedding
+        return CachedEmbedding(embedding)
 
     def list_available_embeddings(self) -> list[str]:
         return list(self.embedding_classes.keys())
\ No newline at end of file
@@ -5,6 +5,7 @@ from typing import Dict, Type
 from ..utils.single_ton import Singleton
 from ..utils.config_setting import Config
 from ._ranker import Ranker
+from ._batching import BatchingService
 
 class RankerFactory(metaclass=Singleton):
     def __init__(self):
@@ -25,6 +26,7 @@ class RankerFactory(metaclass=Singleton):
                         self.ranker_classes[class_name.lower()] = filename[:-3]  # 存储类名和模块名的映射
 
     def get_instance(self, name: str = "") -> Ranker:
+        """本地模型通过 _batching.BatchingService 合并并发请求，同一个模型只加载一次"""
         config = Config()
         if name == "" and config.has_key("ranker_api"):
             name = config.get("ranker_api")
@@ -33,14 +35,19 @@ class RankerFactory(metaclass=Singleton):
         if module_name is None:
             raise ValueError(f"No Ranker_classes implementation found for name: {name}")
         
+        service = BatchingService()
+        ranker = service.get(f"ranker:{name.lower()}")
+        if ranker is not None:
+            return ranker
         try:
             module = importlib.import_module(f'.{module_name}', package=__package__)
             ranker_class = getattr(module, name)
-            return ranker_class()
+            ranker = ranker_class()
         except ImportError as e:
             raise ImportError(f"Error importing module {module_name}: {e}")
         except AttributeError:
             raise ValueError(f"Class {name} not found in module {module_name}")
+        return service.wrap_ranker(f"ranker:{name.lower()}", ranker)
 
     def list_available_rankers(self) -> list[str]:
         return list(self.ranker_classes.keys())
\ No newline at end of file
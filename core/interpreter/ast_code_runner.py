@@ -2,16 +2,55 @@ import ast
 import sys
 import io
 import os
-from typing import Any, Dict, Generator, Tuple
+import threading
+from typing import Any, Dict, Generator, Optional, Tuple
+
+class _ThreadLocalStream:
+    """
+    按线程转发写入的 stdout/stderr。
+    多个线程同时执行代码时，各自替换自己线程的输出目标，不会互相覆盖全局的 sys.stdout
+    """
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    @property
+    def current(self):
+        stream = getattr(self.local, "stream", None)
+        return stream if stream is not None else self.default
+
+    def swap(self, stream: Optional[io.TextIOBase]):
+        old = getattr(self.local, "stream", None)
+        self.local.stream = stream
+        return old
+
+    def write(self, s):
+        return self.current.write(s)
+
+    def flush(self):
+        return self.current.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.current, name)
+
+_install_lock = threading.Lock()
+
+def _thread_stream(name: str) -> _ThreadLocalStream:
+    with _install_lock:
+        stream = getattr(sys, name)
+        if not isinstance(stream, _ThreadLocalStream):
+            stream = _ThreadLocalStream(stream)
+            setattr(sys, name, stream)
+        return stream
 
 class ASTCodeRunner:
     def __init__(self, debug=False):
         self.debug = debug
 
     def run_sse(self, code: str, global_vars: Dict[str, Any]) -> Generator[Dict[str, Any], None, None]:
-        old_stdout = sys.stdout
+        stdout = _thread_stream("stdout")
         redirected_output = io.StringIO()
-        sys.stdout = redirected_output
+        old_stdout = stdout.swap(redirected_output)
 
         try:
             if self.debug:
@@ -40,7 +79,7 @@ class ASTCodeRunner:
             yield {"type": "error", "content": str(e)}
             raise e
         finally:
-            sys.stdout = old_stdout
+            stdout.swap(old_stdout)
 
     def run(self, code: str, global_vars: Dict[str, Any]={}) -> Dict[str, Any]:
         """
@@ -55,12 +94,12 @@ class ASTCodeRunner:
                 debug: 调试信息
         """
         # 准备捕获输出
-        old_stdout = sys.stdout
-        old_stderr = sys.stderr
+        stdout = _thread_stream("stdout")
+        stderr = _thread_stream("stderr")
         redirected_output = io.StringIO()
         redirected_error = io.StringIO()
-        sys.stdout = redirected_output
-        sys.stderr = redirected_error
+        old_stdout = stdout.swap(redirected_output)
+        old_stderr = stderr.swap(redirected_error)
 
         result = {
             "output": "",
@@ -90,8 +129,8 @@ class ASTCodeRunner:
             result["error"] += f"\n{redirected_error.getvalue()}"
         finally:
             # 恢复标准输出和错误流
-            sys.stdout = old_stdout
-            sys.stderr = old_stderr
+            stdout.swap(old_stdout)
+            stderr.swap(old_stderr)
 
         return result
 
@@ -1,4 +1,5 @@
 from collections import OrderedDict, defaultdict, namedtuple
+from collections.abc import Mapping
 from datetime import date, datetime
 from typing import Any, Dict, List, Tuple, Union
 import numpy as np
@@ -12,6 +13,9 @@ class DataSummarizer:
             return DataSummarizer.get_multiple_dataframes_summary(data)
         elif isinstance(data, dict):
             return DataSummarizer.get_dict_summary(data)
+        elif isinstance(data, Mapping):
+            # 只读映射（例如 SummaryTable）按字典汇总
+            return DataSummarizer.get_dict_summary(data)
         elif isinstance(data, pd.DataFrame):
             return DataSummarizer.get_dataframe_summary(data)
         elif isinstance(data, np.ndarray):
@@ -0,0 +1,488 @@
+import ast
+import ctypes
+import io
+import pickle
+import sys
+import threading
+import traceback
+import multiprocessing as mp
+from multiprocessing.connection import Connection
+from typing import Any, Dict, Generator, List, Optional, Tuple
+
+from .ast_code_runner import ASTCodeRunner, SecurityException, _thread_stream
+from ..utils.log import logger
+
+# 工作进程启动时预先导入的模块，导入失败的会被跳过
+WARM_MODULES = ["numpy", "pandas", "akshare", "ta", "pyarrow"]
+
+# 超过这个大小的 Arrow 数据通过共享内存传递，而不是直接写进管道
+SHARED_MEMORY_THRESHOLD = 1 << 20
+
+
+class SandboxTimeout(Exception):
+    pass
+
+
+class SandboxCrashed(Exception):
+    pass
+
+
+def _is_dataframe(value: Any) -> bool:
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(value, pd.DataFrame)
+
+
+def _encode_value(value: Any, segments: Optional[List[str]] = None) -> Tuple[str, Any]:
+    """
+    把变量编码成可以跨进程传递的形式
+    DataFrame 使用 Arrow IPC，大的数据放进共享内存（段名记入 segments，由父进程负责 unlink）；其他对象使用 pickle
+    """
+    if _is_dataframe(value):
+        try:
+            import pyarrow as pa
+            sink = pa.BufferOutputStream()
+            table = pa.Table.from_pandas(value)
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            buffer = sink.getvalue()
+            if segments is not None and buffer.size >= SHARED_MEMORY_THRESHOLD:
+                from multiprocessing import shared_memory
+                shm = shared_memory.SharedMemory(create=True, size=buffer.size)
+                try:
+                    # Arrow 的缓冲区格式是有符号字节，转成与共享内存相同的无符号字节才能整体复制
+                    shm.buf[:buffer.size] = memoryview(buffer).cast("B")
+                except BaseException:
+                    shm.close()
+                    shm.unlink()
+                    raise
+                segments.append(shm.name)
+                shm.close()
+                return "arrow_shm", (shm.name, buffer.size)
+            return "arrow", buffer.to_pybytes()
+        except ImportError:
+            pass
+        except Exception:
+            # 某些列类型 Arrow 不支持，退回 pickle
+            pass
+    return "pickle", pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _decode_value(kind: str, payload: Any) -> Any:
+    if kind == "pickle":
+        return pickle.loads(payload)
+    import pyarrow as pa
+    if kind == "arrow":
+        return pa.ipc.open_stream(payload).read_all().to_pandas()
+    if kind == "arrow_shm":
+        # 只读取，不 unlink：共享内存段统一由父进程在执行结束后删除
+        from multiprocessing import shared_memory
+        name, size = payload
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            data = bytes(shm.buf[:size])
+        finally:
+            shm.close()
+        return pa.ipc.open_stream(data).read_all().to_pandas()
+    raise ValueError(f"未知的编码类型: {kind}")
+
+
+def _encode_vars(variables: Dict[str, Any], segments: Optional[List[str]] = None) -> Tuple[Dict[str, Tuple[str, Any]], List[str]]:
+    encoded = {}
+    skipped = []
+    for name, value in variables.items():
+        if name.startswith("__"):
+            continue
+        try:
+            encoded[name] = _encode_value(value, segments)
+        except Exception:
+            skipped.append(name)
+    return encoded, skipped
+
+
+def _decode_vars(encoded: Dict[str, Tuple[str, Any]]) -> Dict[str, Any]:
+    return {name: _decode_value(kind, payload) for name, (kind, payload) in encoded.items()}
+
+
+def _segments_of(encoded: Dict[str, Tuple[str, Any]]) -> List[str]:
+    return [payload[0] for kind, payload in encoded.values() if kind == "arrow_shm"]
+
+
+def _unlink_segments(names: List[str]):
+    from multiprocessing import shared_memory
+    for name in names:
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        except FileNotFoundError:
+            continue
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _apply_limits(cpu_seconds: Optional[int], memory_mb: Optional[int]):
+    try:
+        import resource
+    except ImportError:
+        # Windows 上没有 resource 模块，只能依靠父进程的超时
+        return
+    if cpu_seconds:
+        used = resource.getrusage(resource.RUSAGE_SELF)
+        soft = int(used.ru_utime + used.ru_stime) + cpu_seconds
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    if memory_mb:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        limit = memory_mb * 1024 * 1024
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _reset_limits():
+    try:
+        import resource
+    except ImportError:
+        return
+    for limit in (resource.RLIMIT_CPU, resource.RLIMIT_AS):
+        _, hard = resource.getrlimit(limit)
+        resource.setrlimit(limit, (hard, hard))
+
+
+def _worker_main(conn: Connection, warm_modules: List[str]):
+    for module in warm_modules:
+        try:
+            __import__(module)
+        except Exception:
+            pass
+    from core.utils.code_tools import code_tools
+    runner = ASTCodeRunner()
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        code, encoded_globals, encoded_tools, cpu_seconds, memory_mb = task
+        output = io.StringIO()
+        result = {"output": "", "error": None, "updated_vars": {}, "tools": {}, "skipped": []}
+        namespace = code_tools.root.new_namespace()
+        # 结果中的共享内存段交给父进程，父进程读取后负责删除
+        segments: List[str] = []
+        try:
+            global_vars = _decode_vars(encoded_globals)
+            for name, value in _decode_vars(encoded_tools).items():
+                namespace.set_var(name, value)
+            before = dict(namespace.data)
+            _apply_limits(cpu_seconds, memory_mb)
+
+            exec_globals = global_vars.copy()
+            exec_globals['print'] = lambda *args, **kwargs: print(*args, **kwargs, file=output, flush=True)
+            exec_globals['open'] = runner.safe_open
+            old_stdout, old_stderr = sys.stdout, sys.stderr
+            sys.stdout = sys.stderr = output
+            try:
+                with namespace.activate():
+                    exec(compile(code, '<string>', 'exec'), exec_globals)
+            finally:
+                sys.stdout, sys.stderr = old_stdout, old_stderr
+
+            updated = {k: v for k, v in exec_globals.items()
+                       if k not in global_vars or global_vars[k] is not v}
+            updated.pop('print', None)
+            updated.pop('open', None)
+            updated.pop('__builtins__', None)
+            changed_tools = {k: v for k, v in namespace.data.items()
+                             if k not in before or before[k] is not v}
+            result["updated_vars"], skipped_vars = _encode_vars(updated, segments)
+            result["tools"], skipped_tools = _encode_vars(changed_tools, segments)
+            result["skipped"] = skipped_vars + skipped_tools
+        except MemoryError:
+            result["error"] = "MemoryError: 代码使用的内存超过限制"
+        except BaseException as e:
+            result["error"] = f"{type(e).__name__}: {str(e)}\n{traceback.format_exc()}"
+        finally:
+            _reset_limits()
+        result["output"] = output.getvalue()
+        try:
+            conn.send(result)
+        except Exception as e:
+            _unlink_segments(segments)
+            conn.send({"output": result["output"], "error": f"结果无法传回主进程: {str(e)}",
+                       "updated_vars": {}, "tools": {}, "skipped": []})
+
+
+class _Worker:
+    def __init__(self, ctx, warm_modules: List[str]):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, warm_modules), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.join(timeout=1)
+        except Exception:
+            pass
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    预先启动并导入好 pandas/numpy/akshare/ta 的工作进程池
+    每个工作进程同一时间只执行一段代码，超时或崩溃的进程会被杀掉并重新启动
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, size: Optional[int] = None, warm_modules: Optional[List[str]] = None):
+        from ..utils.config_setting import Config
+        config = Config()
+        if size is None:
+            size = int(config.get("sandbox_workers")) if config.has_key("sandbox_workers") else 2
+        self.size = max(1, size)
+        self.warm_modules = WARM_MODULES if warm_modules is None else warm_modules
+        self.ctx = mp.get_context("spawn")
+        self._lock = threading.Condition()
+        self._idle: List[_Worker] = [_Worker(self.ctx, self.warm_modules) for _ in range(self.size)]
+
+    @classmethod
+    def instance(cls) -> "SandboxPool":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def _acquire(self) -> _Worker:
+        with self._lock:
+            while not self._idle:
+                self._lock.wait()
+            worker = self._idle.pop()
+        if not worker.is_alive():
+            worker.kill()
+            worker = _Worker(self.ctx, self.warm_modules)
+        return worker
+
+    def _release(self, worker: Optional[_Worker]):
+        if worker is None:
+            worker = _Worker(self.ctx, self.warm_modules)
+        with self._lock:
+            self._idle.append(worker)
+            self._lock.notify()
+
+    def execute(self, code: str, encoded_globals: dict, encoded_tools: dict,
+                timeout: Optional[float], cpu_seconds: Optional[int], memory_mb: Optional[int]) -> Dict[str, Any]:
+        worker = self._acquire()
+        try:
+            worker.conn.send((code, encoded_globals, encoded_tools, cpu_seconds, memory_mb))
+            if not worker.conn.poll(timeout):
+                worker.kill()
+                worker = None
+                raise SandboxTimeout(f"代码执行超过 {timeout} 秒，已终止")
+            try:
+                return worker.conn.recv()
+            except EOFError:
+                worker.kill()
+                worker = None
+                raise SandboxCrashed("执行代码的进程意外退出，可能超过了 CPU 时间或内存限制")
+        finally:
+            self._release(worker)
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._idle = self._idle, []
+        for worker in workers:
+            try:
+                worker.conn.send(None)
+            except Exception:
+                pass
+            worker.kill()
+
+
+class _WatchdogTimeout(BaseException):
+    """由看门狗注入到执行线程的异常，继承 BaseException，生成的代码里的 except Exception 拦不住"""
+
+
+class _Watchdog:
+    """
+    超过 timeout 秒后向执行代码的线程注入 _WatchdogTimeout，之后每秒重复一次，直到代码退出。
+    只能打断 Python 字节码，长时间运行的单个 C 调用（如一次很大的 pandas 运算）要等它返回后才会被打断。
+    """
+    def __init__(self, timeout: Optional[float]):
+        self.timeout = timeout
+        self.thread_id = threading.get_ident()
+        self.fired = False
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        if self.timeout:
+            threading.Thread(target=self._watch, name="code-watchdog", daemon=True).start()
+        return self
+
+    def _watch(self):
+        wait = self.timeout
+        while not self._done.wait(wait):
+            with self._lock:
+                if self._done.is_set():
+                    return
+                self.fired = True
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self.thread_id), ctypes.py_object(_WatchdogTimeout))
+            wait = 1.0
+
+    def stop(self):
+        """停止看门狗，可以重复调用；停止之前送达的异常重试即可，之后不会再注入"""
+        while True:
+            try:
+                with self._lock:
+                    self._done.set()
+                    if self.fired:
+                        # 清除还没有送达的异常，避免它出现在执行结束之后的代码里
+                        ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self.thread_id), None)
+                return
+            except _WatchdogTimeout:
+                continue
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+class ProcessCodeRunner(ASTCodeRunner):
+    """
+    在预热的子进程中执行生成的代码，接口与 ASTCodeRunner 相同
+    - 每次执行有墙钟超时、CPU 时间和内存限制
+    - 输出在子进程内捕获，不会修改主进程的 sys.stdout
+    - 代码用到的 code_tools 数据和全局变量会传给子进程，子进程新增或修改的数据会写回当前的 code_tools
+    代码用到了无法传给子进程的对象（比如 stock_data_provider、llm_client）时，退回在本进程中执行：
+    记录日志，同样有墙钟超时（由看门狗线程打断），但没有 CPU 时间和内存限制
+    """
+    def __init__(self, debug=False, timeout: Optional[float] = None,
+                 cpu_seconds: Optional[int] = None, memory_mb: Optional[int] = None):
+        super().__init__(debug)
+        from ..utils.config_setting import Config
+        config = Config()
+        self.timeout = timeout if timeout is not None else float(config.get("sandbox_timeout") or 300)
+        self.cpu_seconds = cpu_seconds if cpu_seconds is not None else int(config.get("sandbox_cpu_seconds") or 120)
+        self.memory_mb = memory_mb if memory_mb is not None else int(config.get("sandbox_memory_mb") or 4096)
+
+    @staticmethod
+    def _referenced_names(tree: ast.AST) -> Tuple[set, set]:
+        """代码中出现的变量名，以及字符串常量（code_tools["name"] 按字符串取数据）"""
+        names, strings = set(), set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name):
+                names.add(node.id)
+            elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+                strings.add(node.value)
+        return names, strings
+
+    def _prepare(self, tree: ast.AST, global_vars: Dict[str, Any], segments: List[str]):
+        """
+        编码代码用到的全局变量和 code_tools 数据，返回 (globals, tools, 无法传给子进程的变量名)。
+        先 pickle 不是 DataFrame 的变量确定能否在子进程执行，能执行时才把大的 DataFrame 放进共享内存
+        """
+        from ..utils.code_tools import code_tools
+        tools = code_tools.current
+        names, strings = self._referenced_names(tree)
+        used_globals = {name: global_vars[name] for name in names if name in global_vars}
+        used_tools = {name: tools[name] for name in names | strings if tools.is_exists(name)}
+        encoded_globals, blocked = _encode_vars({k: v for k, v in used_globals.items() if not _is_dataframe(v)})
+        encoded_tools, skipped = _encode_vars({k: v for k, v in used_tools.items() if not _is_dataframe(v)})
+        blocked += skipped
+        if blocked:
+            return None, None, sorted(set(blocked))
+        frames, skipped = _encode_vars({k: v for k, v in used_globals.items() if _is_dataframe(v)}, segments)
+        encoded_globals.update(frames)
+        blocked += skipped
+        frames, skipped = _encode_vars({k: v for k, v in used_tools.items() if _is_dataframe(v)}, segments)
+        encoded_tools.update(frames)
+        blocked += skipped
+        return encoded_globals, encoded_tools, sorted(set(blocked))
+
+    def _execute(self, code: str, global_vars: Dict[str, Any]) -> Dict[str, Any]:
+        tree = ast.parse(code)
+        self.check_security(tree)
+        # 父进程创建的和子进程返回的共享内存段，执行结束后（包括超时、子进程崩溃）统一删除
+        segments: List[str] = []
+        try:
+            encoded_globals, encoded_tools, blocked = self._prepare(tree, global_vars, segments)
+            if blocked:
+                logger.warning(f"代码用到了无法传给子进程的对象 {blocked}，在本进程中执行"
+                               f"（只有 {self.timeout} 秒的墙钟超时，没有 CPU 时间和内存限制）")
+                return self._execute_in_process(tree, global_vars)
+            result = SandboxPool.instance().execute(code, encoded_globals, encoded_tools,
+                                                    self.timeout, self.cpu_seconds, self.memory_mb)
+            segments += _segments_of(result["tools"]) + _segments_of(result["updated_vars"])
+            from ..utils.code_tools import code_tools
+            tools = code_tools.current
+            for name, value in _decode_vars(result.pop("tools")).items():
+                tools.set_var(name, value)
+            result["updated_vars"] = _decode_vars(result["updated_vars"])
+            return result
+        finally:
+            _unlink_segments(segments)
+
+    def _execute_in_process(self, tree: ast.AST, global_vars: Dict[str, Any]) -> Dict[str, Any]:
+        """在当前线程中执行，超时由看门狗打断；结果格式与子进程相同"""
+        stdout = _thread_stream("stdout")
+        stderr = _thread_stream("stderr")
+        output = io.StringIO()
+        old_stdout, old_stderr = stdout.swap(output), stderr.swap(output)
+        result = {"output": "", "error": None, "updated_vars": {}, "skipped": []}
+        exec_globals = global_vars.copy()
+        exec_globals['print'] = lambda *args, **kwargs: print(*args, **kwargs, file=output, flush=True)
+        exec_globals['open'] = self.safe_open
+        watchdog = _Watchdog(self.timeout)
+        try:
+            with watchdog:
+                exec(compile(tree, '<string>', 'exec'), exec_globals)
+            updated = {k: v for k, v in exec_globals.items() if k not in global_vars or global_vars[k] is not v}
+            updated.pop('print', None)
+            updated.pop('open', None)
+            updated.pop('__builtins__', None)
+            result["updated_vars"] = updated
+        except _WatchdogTimeout:
+            result["error"] = f"SandboxTimeout: 代码执行超过 {self.timeout} 秒，已终止"
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {str(e)}\n{traceback.format_exc()}"
+        finally:
+            watchdog.stop()
+            stdout.swap(old_stdout)
+            stderr.swap(old_stderr)
+        result["output"] = output.getvalue()
+        return result
+
+    def run_sse(self, code: str, global_vars: Dict[str, Any]) -> Generator[Dict[str, Any], None, None]:
+        if self.debug:
+            yield {"type": "debug", "content": f"调试信息: 准备执行下面的代码:\n{code}"}
+        try:
+            result = self._execute(code, global_vars)
+        except Exception as e:
+            yield {"type": "error", "content": str(e)}
+            raise e
+        if result["output"]:
+            yield {"type": "message", "content": result["output"]}
+        if result["error"]:
+            yield {"type": "error", "content": result["error"]}
+            raise Exception(result["error"])
+        yield {"type": "message", "content": result["updated_vars"]}
+
+    def run(self, code: str, global_vars: Dict[str, Any]={}) -> Dict[str, Any]:
+        try:
+            result = self._execute(code, global_vars)
+        except (SecurityException, SandboxTimeout, SandboxCrashed, SyntaxError) as e:
+            return {"output": "", "error": f"{type(e).__name__}: {str(e)}", "updated_vars": {}, "debug": None}
+        return {
+            "output": result["output"],
+            "error": result["error"],
+            "updated_vars": result["updated_vars"],
+            "debug": f"调试信息: 准备执行下面的代码:\n{code}" if self.debug else None,
+        }
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+import asyncio
+import inspect
 import re
-from typing import Generator, Iterator, List, Dict, Any, Union
+from typing import AsyncIterator, Generator, Iterator, List, Dict, Any, Union
 import json
 from ..utils.log import logger
+from .telemetry import INSTRUMENTED_METHODS, instrument
 
 try:
     import pandas as pd
@@ -34,6 +37,14 @@ class LLMApiClient(ABC):
 
     supports_structured_output: bool = False
 
+    def __init_subclass__(cls, **kwargs):
+        # 子类定义的对话方法统一包装一层调用记录（耗时、首个片段时间、token、重试），见 telemetry.py
+        super().__init_subclass__(**kwargs)
+        for name in INSTRUMENTED_METHODS:
+            method = cls.__dict__.get(name)
+            if inspect.isfunction(method):
+                setattr(cls, name, instrument(name, method))
+
     def set_history(self, history: List[Dict[str, str]]):
         if not hasattr(self, "history"):
             self.history = []
@@ -245,6 +256,33 @@ class LLMApiClient(ABC):
     def get_stats(self) -> Dict[str, Any]:
         """返回使用情况统计信息（例如，token使用情况、API调用计数）。"""
         pass
+
+    # 异步接口。默认实现是同步方法的适配：请求在线程中执行，流式结果通过 ThreadedStreamBridge 转为异步迭代；
+    # 基于 httpx / 官方 SDK 的客户端覆盖这几个方法，直接在事件循环中发送请求（supports_native_async = True）。
+    supports_native_async: bool = False
+
+    async def aone_chat(self, message: Union[str, List[Union[str, Any]]]) -> str:
+        """one_chat 的异步版本，不使用或存储聊天历史记录。"""
+        return await asyncio.to_thread(self.one_chat, message)
+
+    async def atext_chat(self, message: str) -> str:
+        """text_chat 的异步版本，使用并更新聊天历史记录。"""
+        return await asyncio.to_thread(self.text_chat, message)
+
+    async def astream(self, message: Union[str, List[Union[str, Any]]], use_history: bool = False) -> AsyncIterator[str]:
+        """
+        异步流式返回回复片段。
+        use_history=False 时相当于 one_chat(message, is_stream=True)，True 时相当于 text_chat(message, is_stream=True)。
+        """
+        from ..scheduler.threaded_stream import ThreadedStreamBridge
+        chat = self.text_chat if use_history else self.one_chat
+        # 创建流时就会发送请求，也放到线程中执行
+        stream = await asyncio.to_thread(chat, message, is_stream=True)
+        if isinstance(stream, str):
+            yield stream
+            return
+        async for chunk in ThreadedStreamBridge().iterate(stream):
+            yield chunk
     def set_system_message(self, system_message: str = "你是一个智能助手,擅长把复杂问题清晰明白通俗易懂地解答出来"):
         if not hasattr(self, "history"):
             self.history = []
@@ -570,6 +608,11 @@ class LLMApiClient(ABC):
         return compressed_history
 
 
+# 基类的默认异步实现也要记录（子类覆盖的在 __init_subclass__ 中包装）
+for _name in ("aone_chat", "atext_chat", "astream"):
+    setattr(LLMApiClient, _name, instrument(_name, getattr(LLMApiClient, _name)))
+
+
 def _parse_json_lenient(raw: Any) -> Any:
     """Tolerant JSON parser used by ``LLMApiClient.json_chat``.
 
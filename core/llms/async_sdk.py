@@ -0,0 +1,42 @@
+import asyncio
+import weakref
+from typing import Any, Callable
+from .http_transport import shared_async_http_client
+
+# 异步 SDK 客户端绑定在事件循环上（底层的 httpx.AsyncClient 也是），
+# 按事件循环缓存在 LLM 客户端对象上，换了事件循环时重新创建。
+
+
+def _per_loop(owner: Any, attribute: str, create: Callable[[], Any]) -> Any:
+    loop = asyncio.get_running_loop()
+    cached = getattr(owner, attribute, None)
+    if cached is None or cached[0]() is not loop:
+        cached = (weakref.ref(loop), create())
+        setattr(owner, attribute, cached)
+    return cached[1]
+
+
+def async_openai(owner: Any) -> Any:
+    """与 owner.client（openai.OpenAI）使用相同 api_key / base_url 的 AsyncOpenAI，连接来自共享连接池"""
+    def create():
+        from openai import AsyncOpenAI
+        client = owner.client
+        base_url = str(client.base_url)
+        return AsyncOpenAI(api_key=client.api_key, base_url=base_url, max_retries=client.max_retries,
+                           http_client=shared_async_http_client(base_url))
+    return _per_loop(owner, "_async_openai", create)
+
+
+def async_anthropic(owner: Any) -> Any:
+    """与 owner.client（Anthropic / AnthropicBedrock）配置相同的异步客户端，连接来自共享连接池"""
+    def create():
+        from anthropic import AnthropicBedrock, AsyncAnthropic, AsyncAnthropicBedrock
+        client = owner.client
+        base_url = str(client.base_url)
+        if isinstance(client, AnthropicBedrock):
+            return AsyncAnthropicBedrock(aws_access_key=client.aws_access_key, aws_secret_key=client.aws_secret_key,
+                                         aws_session_token=client.aws_session_token, aws_region=client.aws_region,
+                                         max_retries=client.max_retries, http_client=shared_async_http_client(base_url))
+        return AsyncAnthropic(api_key=client.api_key, base_url=base_url, max_retries=client.max_retries,
+                              http_client=shared_async_http_client(base_url))
+    return _per_loop(owner, "_async_anthropic", create)
@@ -8,6 +8,7 @@ from PIL import Image
 import io
 import json
 from ._llm_api_client import LLMApiClient
+from .http_transport import shared_http_client
 from ..utils.handle_max_tokens import handle_max_tokens
 
 class AzureGPT4oClient(LLMApiClient):
@@ -53,7 +54,8 @@ class AzureGPT4oClient(LLMApiClient):
         return AzureOpenAI(
             api_key=self.api_key,
             api_version=self.api_version,
-            azure_endpoint=self.azure_endpoint
+            azure_endpoint=self.azure_endpoint,
+            http_client=shared_http_client(self.azure_endpoint)
         )
 
     def _update_usage_stats(self, response):
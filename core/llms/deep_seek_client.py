@@ -2,6 +2,7 @@ from typing import Iterator, List, Dict, Any, Literal, Optional, Union
 import openai
 import json
 from ._llm_api_client import LLMApiClient
+from .http_transport import shared_http_client
 from ..utils.config_setting import Config
 from ..utils.handle_max_tokens import handle_max_tokens
 
@@ -14,7 +15,7 @@ class DeepSeekClient(LLMApiClient):
         config = Config()
         if api_key is None and config.has_key("deep_seek_api_key"):
             api_key = config.get("deep_seek_api_key")
-        self.client = openai.OpenAI(api_key=api_key, base_url=base_url)
+        self.client = openai.OpenAI(api_key=api_key, base_url=base_url, http_client=shared_http_client(base_url))
         self.messages = []
         self.task = "代码"
         self.model = model
@@ -1,10 +1,14 @@
 
-from typing import Union, List, Dict, Any, Iterator
+from typing import Union, List, Dict, Any, Iterator, Optional, Sequence
 from ._llm_api_client import LLMApiClient
 from ..utils.config_setting import Config
+import contextvars
 import random
 import re
-from collections import defaultdict
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
 from core.utils.log import logger
 from traceback import format_exc
 import traceback
@@ -45,13 +49,266 @@ class LoadBalancer:
             for i, llm in enumerate(self.llms)
         }
 
+
+class _BackendState:
+    """单个后端的实时状态：首 token 延迟 / 错误率的 EWMA、最近的延迟样本和熔断器"""
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, window: int, cooldown: float):
+        self.ttft: Optional[float] = None
+        self.error_rate = 0.0
+        self.samples = deque(maxlen=window)
+        self.failures = 0
+        self.in_flight = 0
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.cooldown = cooldown
+        self.probing = False
+        self.trips = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "ttft_ewma": round(self.ttft, 4) if self.ttft is not None else None,
+            "error_rate": round(self.error_rate, 4),
+            "in_flight": self.in_flight,
+            "consecutive_failures": self.failures,
+            "breaker_trips": self.trips,
+        }
+
+
+class _Finished:
+    """流式调用在第一个 chunk 之前就结束了，保留生成器的返回值"""
+    def __init__(self, value: Any):
+        self.value = value
+
+
+def _resume(first: Any, rest: Iterator) -> Iterator:
+    if isinstance(first, _Finished):
+        return first.value
+    yield first
+    return (yield from rest)
+
+
+def _discard(future) -> None:
+    # 对冲中输掉的请求：结果不再使用，流式结果要关闭生成器释放连接
+    if future.exception() is None and hasattr(future.result(), "close"):
+        future.result().close()
+
+
+class AdaptiveLoadBalancer(LoadBalancer):
+    """
+    根据实时延迟和错误率路由的负载均衡器
+    - 每个后端维护首 token 延迟（非流式调用为整体耗时）和错误率的 EWMA，按权重随机抽两个后端，选得分低的（power of two choices）
+    - 熔断器：连续失败 failure_threshold 次、错误率过高或遇到限流时熔断，cooldown 秒后半开，只放一个探测请求，成功则恢复，失败则冷却时间加倍
+    - 对冲：无状态的调用等待超过该后端延迟的 hedge_percentile 分位数仍未返回时，同时发给第二个后端，取先成功的结果
+    """
+    ALPHA = 0.2
+    WINDOW = 200
+    MAX_COOLDOWN = 300.0
+
+    def __init__(self, llms: List[Any], weights: List[float] = None, hedge_percentile: float = 95,
+                 hedge_min_samples: int = 20, failure_threshold: int = 3, cooldown: float = 30.0, max_workers: int = 32):
+        super().__init__(llms, weights)
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_workers = max_workers
+        self._states = {id(llm): _BackendState(self.WINDOW, cooldown) for llm in llms}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def _available(self, state: _BackendState, now: float) -> bool:
+        if state.state == _BackendState.OPEN and now - state.opened_at >= state.cooldown:
+            state.state = _BackendState.HALF_OPEN
+            state.probing = False
+        if state.state == _BackendState.HALF_OPEN:
+            return not state.probing
+        return state.state == _BackendState.CLOSED
+
+    @staticmethod
+    def _score(state: _BackendState) -> float:
+        # 没有样本的后端得分为 0，会先被探测到
+        return (state.ttft or 0.0) * (1 + 4 * state.error_rate) * (1 + state.in_flight)
+
+    def get_next_llm(self, exclude: Sequence[Any] = ()) -> Optional[Any]:
+        """选择下一个后端；exclude 中的和熔断中的后端不参与，全部不可用时返回 None"""
+        excluded = {id(llm) for llm in exclude}
+        with self._lock:
+            now = time.monotonic()
+            candidates = [(llm, weight) for llm, weight in zip(self.llms, self._weights)
+                          if id(llm) not in excluded and self._available(self._states[id(llm)], now)]
+            if not candidates:
+                return None
+            llms, weights = zip(*candidates)
+            chosen = min(random.choices(llms, weights=weights, k=2), key=lambda llm: self._score(self._states[id(llm)]))
+            state = self._states[id(chosen)]
+            if state.state == _BackendState.HALF_OPEN:
+                state.probing = True
+            self.request_counts[id(chosen)] += 1
+            return chosen
+
+    @staticmethod
+    def _is_rate_limited(error: Exception) -> bool:
+        text = f"{type(error).__name__} {error}".lower()
+        return "429" in text or "ratelimit" in text or "rate limit" in text or "too many requests" in text
+
+    def record(self, llm: Any, latency: float, error: Optional[Exception] = None):
+        """记录一次调用的结果：latency 是首 token 延迟（非流式调用为整体耗时），error 为 None 表示成功"""
+        with self._lock:
+            state = self._states[id(llm)]
+            state.error_rate += self.ALPHA * ((1.0 if error else 0.0) - state.error_rate)
+            if error is None:
+                state.ttft = latency if state.ttft is None else state.ttft + self.ALPHA * (latency - state.ttft)
+                state.samples.append(latency)
+                state.failures = 0
+                if state.state != _BackendState.CLOSED:
+                    logger.info(f"{type(llm).__name__} 恢复，关闭熔断")
+                    state.state = _BackendState.CLOSED
+                    state.cooldown = self.base_cooldown
+                return
+            state.failures += 1
+            if state.state == _BackendState.HALF_OPEN:
+                state.cooldown = min(state.cooldown * 2, self.MAX_COOLDOWN)
+            elif not (self._is_rate_limited(error) or state.failures >= self.failure_threshold
+                      or (state.error_rate > 0.5 and len(state.samples) >= self.failure_threshold)):
+                return
+            if state.state != _BackendState.OPEN:
+                state.trips += 1
+                logger.warning(f"{type(llm).__name__} 熔断 {state.cooldown:.0f} 秒：{error}")
+            state.state = _BackendState.OPEN
+            state.opened_at = time.monotonic()
+            state.probing = False
+
+    def hedge_delay(self, llm: Any) -> Optional[float]:
+        """超过这个时间还没有结果时发起对冲请求；样本不足或未开启对冲时为 None"""
+        if not self.hedge_percentile:
+            return None
+        with self._lock:
+            samples = sorted(self._states[id(llm)].samples)
+        if len(samples) < self.hedge_min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * self.hedge_percentile / 100))]
+
+    def _attempt(self, llm: Any, method_name: str, args: tuple, kwargs: dict) -> Any:
+        state = self._states[id(llm)]
+        with self._lock:
+            state.in_flight += 1
+        started = time.perf_counter()
+        try:
+            result = getattr(llm, method_name)(*args, **kwargs)
+            if isinstance(result, Iterator):
+                # 流式调用取到第一个 chunk 才算成功，这样首 token 之前的错误也能故障转移
+                try:
+                    first = next(result)
+                except StopIteration as stop:
+                    first = _Finished(stop.value)
+                result = _resume(first, result)
+        except Exception as e:
+            self.record(llm, time.perf_counter() - started, e)
+            raise
+        finally:
+            with self._lock:
+                state.in_flight -= 1
+        self.record(llm, time.perf_counter() - started)
+        return result
+
+    def _submit(self, llm: Any, method_name: str, args: tuple, kwargs: dict):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm-hedge")
+        context = contextvars.copy_context()
+        return self._executor.submit(context.run, self._attempt, llm, method_name, args, kwargs)
+
+    def _hedged(self, primary: Any, method_name: str, args: tuple, kwargs: dict, tried: List[Any]) -> Any:
+        delay = self.hedge_delay(primary)
+        if delay is None:
+            return self._attempt(primary, method_name, args, kwargs)
+        first = self._submit(primary, method_name, args, kwargs)
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        backup = self.get_next_llm(exclude=tried)
+        if backup is None:
+            return first.result()
+        tried.append(backup)
+        with self._lock:
+            self.hedges += 1
+        second = self._submit(backup, method_name, args, kwargs)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.add_done_callback(_discard)
+                    if future is second:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def call(self, method_name: str, args: tuple, kwargs: dict, hedge: bool = False, force: bool = True) -> Any:
+        """
+        依次在可用的后端上执行 method_name，直到有一个成功；全部失败时抛出最后一个异常。
+        hedge 只能用于无状态的调用（one_chat 等），有对话历史的调用发给两个后端会让历史不一致。
+        force 为 False 时，全部熔断直接抛出异常，交给调用方的备用 LLM 处理。
+        """
+        tried: List[Any] = []
+        error: Optional[Exception] = None
+        while True:
+            llm = self.get_next_llm(exclude=tried)
+            if llm is None:
+                if error is not None:
+                    raise error
+                if not force:
+                    raise Exception("All main LLMs are circuit broken")
+                # 全部熔断时仍然尝试冷却最久的后端，而不是直接失败
+                llm = min((l for l in self.llms if l not in tried), key=lambda l: self._states[id(l)].opened_at, default=None)
+                if llm is None:
+                    raise Exception("All LLMs failed")
+            tried.append(llm)
+            try:
+                if hedge:
+                    return self._hedged(llm, method_name, args, kwargs, tried)
+                return self._attempt(llm, method_name, args, kwargs)
+            except Exception as e:
+                logger.warning(f"{type(llm).__name__} failed: {str(e)}")
+                error = e
+
+    def get_routing_stats(self) -> Dict[str, Any]:
+        """每个后端的路由状态以及对冲次数"""
+        with self._lock:
+            return {
+                "backends": {f"LLM_{i}": {"client": type(llm).__name__, "requests": self.request_counts[id(llm)],
+                                          **self._states[id(llm)].to_dict()}
+                             for i, llm in enumerate(self.llms)},
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+            }
+
+
 class FallbackLLMClient(LLMApiClient):
+    # 可以对冲（同时发给两个后端）的无状态方法
+    HEDGE_METHODS = ("one_chat", "tool_invoke")
+
     def __init__(self):
         config = Config()
         self.main_llm_config = config.get("MAIN_LLM", "FallbackLLMClient") or "QianWenClient"
         self.auxiliary_llms = config.get("AUXILIARY_LLMS", "FallbackLLMClient") or "MiniMaxProClient,GLMFreeClient,SimpleDeepSeekClient"
         # 获取权重配置
         self.weights_config = config.get("MAIN_LLM_WEIGHTS", "FallbackLLMClient") or None
+        # ROUTING = adaptive 时按实时延迟、错误率路由，并启用熔断和对冲
+        self.routing = (config.get("ROUTING", "FallbackLLMClient") or "weighted").strip().lower()
+        self.hedge_percentile = float(config.get("HEDGE_PERCENTILE", "FallbackLLMClient") or 95)
+        self.breaker_failures = int(config.get("BREAKER_FAILURES", "FallbackLLMClient") or 3)
+        self.breaker_cooldown = float(config.get("BREAKER_COOLDOWN", "FallbackLLMClient") or 30)
         self.llm_factory = None
         self.main_balancer = None  # 主LLM负载均衡器
         self.auxiliary_llms_list = None  # 备用LLM列表
@@ -102,7 +359,11 @@ class FallbackLLMClient(LLMApiClient):
             
             # 解析权重并创建负载均衡器
             weights = self._parse_weights(self.weights_config, len(main_llms))
-            self.main_balancer = LoadBalancer(main_llms, weights)
+            if self.routing == "adaptive":
+                self.main_balancer = AdaptiveLoadBalancer(main_llms, weights, hedge_percentile=self.hedge_percentile,
+                                                          failure_threshold=self.breaker_failures, cooldown=self.breaker_cooldown)
+            else:
+                self.main_balancer = LoadBalancer(main_llms, weights)
             
             # 初始化备用LLM实例
             auxiliary_llm_names = self._parse_llm_config(self.auxiliary_llms)
@@ -121,6 +382,9 @@ class FallbackLLMClient(LLMApiClient):
         
         # 首先尝试使用负载均衡的主LLM
         try:
+            if isinstance(self.main_balancer, AdaptiveLoadBalancer):
+                return self.main_balancer.call(method_name, args, kwargs, hedge=method_name in self.HEDGE_METHODS,
+                                               force=not self.auxiliary_llms_list)
             main_llm = self.main_balancer.get_next_llm()
             method = getattr(main_llm, method_name)
             return method(*args, **kwargs)
@@ -176,6 +440,8 @@ class FallbackLLMClient(LLMApiClient):
             "main_llms": self.main_balancer.get_stats(),
             "auxiliary_llms": {}
         }
+        if isinstance(self.main_balancer, AdaptiveLoadBalancer):
+            stats["routing"] = self.main_balancer.get_routing_stats()
         for i, llm in enumerate(self.auxiliary_llms_list):
             stats["auxiliary_llms"][f"AUX_LLM_{i}"] = llm.get_stats()
         return stats
@@ -0,0 +1,206 @@
+import asyncio
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import httpx
+from ..utils.single_ton import Singleton
+from ..utils.log import logger
+from .telemetry import note_request
+
+DEFAULT_TIMEOUT = httpx.Timeout(timeout=600.0, connect=60.0, read=600.0, write=120.0)
+
+
+def endpoint_of(base_url: str) -> str:
+    """连接池按 scheme://host:port 区分，同一主机的不同路径共用连接"""
+    parts = urlsplit(base_url.strip().strip("`").strip())
+    scheme = (parts.scheme or "https").lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port or (443 if scheme == "https" else 80)
+    return f"{scheme}://{host}:{port}"
+
+
+class EndpointStats:
+    """单个主机的请求统计；latency 是从发出请求到收到响应头的时间"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.errors = 0
+        self.status: Dict[int, int] = {}
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.http_versions: Dict[str, int] = {}
+
+    def start(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def finish(self, started: float, response: Optional[httpx.Response]):
+        elapsed = time.perf_counter() - started
+        note_request(response.status_code if response is not None else None)
+        with self._lock:
+            self.in_flight -= 1
+            if response is None:
+                self.errors += 1
+                return
+            self.status[response.status_code] = self.status.get(response.status_code, 0) + 1
+            version = response.extensions.get("http_version", b"")
+            version = version.decode() if isinstance(version, bytes) else str(version)
+            self.http_versions[version] = self.http_versions.get(version, 0) + 1
+            self.latency_total += elapsed
+            self.latency_max = max(self.latency_max, elapsed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self.requests - self.in_flight - self.errors
+            return {
+                "requests": self.requests,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "errors": self.errors,
+                "status": dict(self.status),
+                "http_versions": dict(self.http_versions),
+                "latency_avg": round(self.latency_total / completed, 4) if completed else None,
+                "latency_max": round(self.latency_max, 4),
+            }
+
+
+class _MeteredTransport(httpx.BaseTransport):
+    def __init__(self, transport: httpx.HTTPTransport, stats: EndpointStats):
+        self.transport = transport
+        self.stats = stats
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.start()
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self.transport.handle_request(request)
+            return response
+        finally:
+            self.stats.finish(started, response)
+
+    def close(self):
+        self.transport.close()
+
+
+class _AsyncMeteredTransport(httpx.AsyncBaseTransport):
+    def __init__(self, transport: httpx.AsyncHTTPTransport, stats: EndpointStats):
+        self.transport = transport
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.start()
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await self.transport.handle_async_request(request)
+            return response
+        finally:
+            self.stats.finish(started, response)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def _pool_usage(transport) -> Dict[str, int]:
+    # httpcore 的连接池没有公开的统计接口，读取 connections 列表
+    connections = list(getattr(getattr(transport, "_pool", None), "connections", []) or [])
+    idle = sum(1 for connection in connections if getattr(connection, "is_idle", lambda: False)())
+    return {"connections": len(connections), "idle_connections": idle}
+
+
+class TransportRegistry(metaclass=Singleton):
+    """
+    进程内共享的 LLM HTTP 连接池，按主机（scheme://host:port）各建一个 keep-alive 连接池。
+    客户端对象只保存对话历史等状态，底层连接由这里统一管理，创建再多的客户端也不会重复建立连接和 TLS 握手。
+    安装了 h2 时默认启用 HTTP/2（配置 llm_http2 可以关闭），服务端不支持时自动使用 HTTP/1.1。
+    连接数上限由 llm_max_connections（默认 200）和 llm_max_keepalive_connections（默认 100）决定。
+    """
+    def __init__(self):
+        from ..utils.config_setting import Config
+        config = Config()
+        self.max_connections = int(config.get("llm_max_connections")) if config.has_key("llm_max_connections") else 200
+        self.max_keepalive = int(config.get("llm_max_keepalive_connections")) if config.has_key("llm_max_keepalive_connections") else 100
+        http2 = str(config.get("llm_http2")).lower() not in ("0", "false", "no", "off") if config.has_key("llm_http2") else True
+        self.http2 = http2 and self._h2_available()
+        self._clients: Dict[str, Tuple[httpx.Client, httpx.HTTPTransport]] = {}
+        self._async_clients: Dict[Tuple[str, int], Tuple[httpx.AsyncClient, httpx.AsyncHTTPTransport, weakref.ref]] = {}
+        self._stats: Dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _h2_available() -> bool:
+        try:
+            import h2  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_keepalive_connections=self.max_keepalive, max_connections=self.max_connections)
+
+    def client(self, base_url: str) -> httpx.Client:
+        """base_url 所在主机的共享 httpx.Client，调用方不要关闭它"""
+        endpoint = endpoint_of(base_url)
+        with self._lock:
+            entry = self._clients.get(endpoint)
+            if entry is None or entry[0].is_closed:
+                transport = httpx.HTTPTransport(http2=self.http2, limits=self._limits())
+                stats = self._stats.setdefault(endpoint, EndpointStats())
+                client = httpx.Client(transport=_MeteredTransport(transport, stats), timeout=DEFAULT_TIMEOUT)
+                entry = self._clients[endpoint] = (client, transport)
+                logger.debug(f"创建 {endpoint} 的共享连接池，HTTP/2: {self.http2}")
+            return entry[0]
+
+    def async_client(self, base_url: str, loop: Optional[asyncio.AbstractEventLoop] = None) -> httpx.AsyncClient:
+        """
+        base_url 所在主机的共享 httpx.AsyncClient，调用方不要关闭它。
+        异步连接绑定在事件循环上，每个事件循环各用一个连接池；默认使用当前正在运行的事件循环。
+        """
+        loop = loop or asyncio.get_running_loop()
+        endpoint = endpoint_of(base_url)
+        key = (endpoint, id(loop))
+        with self._lock:
+            entry = self._async_clients.get(key)
+            if entry is None or entry[0].is_closed or entry[2]() is not loop:
+                # 事件循环已经结束的连接池无法再使用，直接丢弃
+                for stale in [k for k, (_, _, ref) in self._async_clients.items() if ref() is None or ref().is_closed()]:
+                    del self._async_clients[stale]
+                transport = httpx.AsyncHTTPTransport(http2=self.http2, limits=self._limits())
+                stats = self._stats.setdefault(endpoint, EndpointStats())
+                client = httpx.AsyncClient(transport=_AsyncMeteredTransport(transport, stats), timeout=DEFAULT_TIMEOUT)
+                entry = self._async_clients[key] = (client, transport, weakref.ref(loop))
+            return entry[0]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {endpoint: stats.to_dict() for endpoint, stats in self._stats.items()}
+            for endpoint, (_, transport) in self._clients.items():
+                result[endpoint].update(_pool_usage(transport))
+            for (endpoint, _), (_, transport, _) in self._async_clients.items():
+                usage = _pool_usage(transport)
+                result[endpoint]["async_connections"] = result[endpoint].get("async_connections", 0) + usage["connections"]
+        return result
+
+    def close(self):
+        """关闭所有同步连接池（进程退出时使用）"""
+        with self._lock:
+            clients = [client for client, _ in self._clients.values()]
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+
+def shared_http_client(base_url: str) -> httpx.Client:
+    return TransportRegistry().client(base_url)
+
+
+def shared_async_http_client(base_url: str) -> httpx.AsyncClient:
+    """当前事件循环中 base_url 所在主机的共享连接池，只能在协程中调用"""
+    return TransportRegistry().async_client(base_url)
@@ -1,8 +1,8 @@
 from typing import Iterator, List, Dict, Any, Optional, Union
 from openai import OpenAI
 import json
-import httpx
 from ._llm_api_client import LLMApiClient
+from .http_transport import shared_http_client
 from ..utils.config_setting import Config
 from ..utils.handle_max_tokens import handle_max_tokens
 from ratelimit import limits, sleep_and_retry
@@ -21,10 +21,8 @@ class MoonShotClient(LLMApiClient):
         if api_key == "" and config.has_key("moonshot_api_key"):
             api_key = config.get("moonshot_api_key")
             
-        http_client = httpx.Client(
-            limits=httpx.Limits(max_keepalive_connections=100, max_connections=200),
-            timeout=httpx.Timeout(timeout=600.0, connect=60.0, read=600.0, write=120.0)
-        )
+        # 同一主机的客户端共用进程内的连接池
+        http_client = shared_http_client(base_url)
             
         self.client = OpenAI(
             api_key=api_key, 
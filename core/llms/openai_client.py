@@ -1,13 +1,15 @@
 import json
 import base64
-import httpx
-from typing import Union, List, Dict, Any, Iterator, Optional
+from typing import AsyncIterator, Union, List, Dict, Any, Iterator, Optional
 from openai import OpenAI
 from ._llm_api_client import LLMApiClient
+from .async_sdk import async_openai
+from .http_transport import shared_http_client
 from ..utils.config_setting import Config
 from ..utils.handle_max_tokens import handle_max_tokens
 
 class OpenAIClient(LLMApiClient):
+    supports_native_async = True
 
     def __init__(self,
                  api_key: str = "",
@@ -24,10 +26,8 @@ class OpenAIClient(LLMApiClient):
             api_key = config.get("openai_api_key")
         self.api_key = api_key
         
-        http_client = httpx.Client(
-            limits=httpx.Limits(max_keepalive_connections=100, max_connections=200),
-            timeout=httpx.Timeout(timeout=600.0, connect=60.0, read=600.0, write=120.0)
-        )
+        # 同一主机的客户端共用进程内的连接池
+        http_client = shared_http_client(base_url or "https://api.openai.com/v1")
         
         if base_url:
             self.base_url = base_url
@@ -86,6 +86,43 @@ class OpenAIClient(LLMApiClient):
         }] if isinstance(message, str) else message
         return self._create_response(msg, is_stream, track_history=False)
 
+    async def atext_chat(self, message: str) -> str:
+        if not self.history:
+            self.set_system_message()
+        self.history.append({"role": "user", "content": message})
+        return await self._acreate_response(self.history, track_history=True)
+
+    async def aone_chat(self, message: Union[str, List[Any]]) -> str:
+        if not self.history:
+            self.set_system_message()
+        msg = [{
+            "role": "user",
+            "content": message
+        }] if isinstance(message, str) else message
+        return await self._acreate_response(msg, track_history=False)
+
+    async def astream(self, message: Union[str, List[Any]], use_history: bool = False) -> AsyncIterator[str]:
+        if not self.history:
+            self.set_system_message()
+        if use_history:
+            self.history.append({"role": "user", "content": message})
+            messages = self.history
+        else:
+            messages = [{"role": "user", "content": message}] if isinstance(message, str) else message
+        chunks: List[str] = []
+        async with async_openai(self).responses.stream(**self._build_response_kwargs(messages)) as stream:
+            async for event in stream:
+                delta = getattr(event, "delta", None)
+                if getattr(event, "type", "") == "response.output_text.delta" and isinstance(delta, str) and delta:
+                    chunks.append(delta)
+                    yield delta
+            final_response = await stream.get_final_response()
+
+        self._update_stats(getattr(final_response, "usage", None))
+        if use_history:
+            final_text = self._extract_response_text(final_response) or "".join(chunks)
+            self.history.append({"role": "assistant", "content": final_text})
+
     def tool_chat(self,
                   user_message: str,
                   tools: List[Dict[str, Any]],
@@ -277,6 +314,14 @@ class OpenAIClient(LLMApiClient):
             self.history.append({"role": "assistant", "content": response_text})
         return response_text
 
+    async def _acreate_response(self, messages: List[Dict[str, Any]], track_history: bool = False) -> str:
+        response = await async_openai(self).responses.create(**self._build_response_kwargs(messages))
+        self._update_stats(getattr(response, "usage", None))
+        response_text = self._extract_response_text(response)
+        if track_history:
+            self.history.append({"role": "assistant", "content": response_text})
+        return response_text
+
     def _stream_response(
             self,
             kwargs: Dict[str, Any],
@@ -1,13 +1,15 @@
+import asyncio
 import os
 import base64
 import json
 import time
 import uuid
-from typing import Any, Dict, Iterator, List, Optional, Union
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
 
 import httpx
 
 from ._llm_api_client import LLMApiClient
+from .http_transport import shared_async_http_client, shared_http_client
 from ..utils.config_setting import Config
 from ..utils.handle_max_tokens import handle_max_tokens
 from ..utils.log import logger
@@ -19,6 +21,7 @@ _RETRYABLE_STATUS_CODES = frozenset({408, 409, 425, 429, 500, 502, 503, 504, 520
 
 
 class OpenAIHttpClient(LLMApiClient):
+    supports_native_async = True
 
     def __init__(self,
                  api_key: str = "",
@@ -44,10 +47,8 @@ class OpenAIHttpClient(LLMApiClient):
         # Defensive: callers sometimes include backticks/whitespace.
         self.base_url = base_url.strip().strip("`").strip().rstrip("/")
         self.client_request_id = client_request_id.strip() if isinstance(client_request_id, str) and client_request_id.strip() else None
-        self.http_client = httpx.Client(
-            limits=httpx.Limits(max_keepalive_connections=100, max_connections=200),
-            timeout=httpx.Timeout(timeout=600.0, connect=60.0, read=600.0, write=120.0)
-        )
+        # 同一主机的客户端共用进程内的连接池
+        self.http_client = shared_http_client(self.base_url)
         self.chat_count = 0
         self.token_count = 0
         self.prompt_token_count = 0
@@ -165,6 +166,48 @@ class OpenAIHttpClient(LLMApiClient):
         }] if isinstance(message, str) else message
         return self._create_response(messages, is_stream, track_history=False)
 
+    async def atext_chat(self, message: str) -> str:
+        if not self.history:
+            self.set_system_message()
+        self.history.append({"role": "user", "content": message})
+        return await self._acreate_response(self.history, track_history=True)
+
+    async def aone_chat(self, message: Union[str, List[Dict[str, Any]]]) -> str:
+        if not self.history:
+            self.set_system_message()
+        messages = [{
+            "role": "user",
+            "content": message
+        }] if isinstance(message, str) else message
+        return await self._acreate_response(messages, track_history=False)
+
+    async def astream(self,
+                      message: Union[str, List[Dict[str, Any]]],
+                      use_history: bool = False) -> AsyncIterator[str]:
+        if not self.history:
+            self.set_system_message()
+        if use_history:
+            self.history.append({"role": "user", "content": message})
+            messages = self.history
+        else:
+            messages = [{"role": "user", "content": message}] if isinstance(message, str) else message
+        payload = self._build_response_payload(messages, stream=True)
+        chunks: List[str] = []
+        final_usage: Optional[Dict[str, Any]] = None
+        async for event in self._astream_json_lines("responses", payload):
+            event_type = event.get("type")
+            if event_type == "response.output_text.delta":
+                delta = event.get("delta")
+                if isinstance(delta, str) and delta:
+                    chunks.append(delta)
+                    yield delta
+            elif event_type == "response.completed":
+                final_usage = (event.get("response") or {}).get("usage")
+
+        self._update_stats(final_usage)
+        if use_history:
+            self.history.append({"role": "assistant", "content": "".join(chunks)})
+
     def tool_chat(self,
                   user_message: str,
                   tools: List[Dict[str, Any]],
@@ -214,20 +257,13 @@ class OpenAIHttpClient(LLMApiClient):
         self.history = []
 
     def close(self) -> None:
-        """Release the underlying httpx connection pool.
+        """Detach from the shared connection pool.
 
-        Story-eval style workloads create a fresh client per dimension
-        (10 dimensions x N stories x up to 2 attempts), so failing to
-        close the pool can leak sockets and file descriptors over a long
-        run. Safe to call multiple times.
+        The pool belongs to TransportRegistry and is shared by every client
+        talking to the same host, so creating a fresh client per task
+        (story-eval style workloads) no longer opens new sockets and there
+        is nothing to release here. Safe to call multiple times.
         """
-        client = getattr(self, "http_client", None)
-        if client is None:
-            return
-        try:
-            client.close()
-        except Exception:
-            pass
         self.http_client = None  # type: ignore[assignment]
 
     def __del__(self) -> None:
@@ -391,6 +427,102 @@ class OpenAIHttpClient(LLMApiClient):
             raise last_error
         raise RuntimeError("OpenAI HTTP stream failed without an exception")
 
+    async def _arequest_json(self, endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Async counterpart of _request_json, same retry policy."""
+        self._ensure_api_key_configured()
+        url = self._build_url(endpoint)
+        http_client = shared_async_http_client(self.base_url)
+
+        for attempt in range(1, self.max_retries + 1):
+            request_id = self.client_request_id or str(uuid.uuid4())
+            try:
+                response = await http_client.post(
+                    url,
+                    headers=self._build_headers(request_id),
+                    json=payload,
+                )
+                response.raise_for_status()
+                return response.json()
+            except httpx.HTTPStatusError as exc:
+                if attempt < self.max_retries and self._is_retryable_exception(exc):
+                    delay = self._retry_delay_seconds(attempt, exc.response)
+                    logger.warning(
+                        "OpenAI HTTP request failed (attempt=%d/%d, status=%d), retrying in %.1fs",
+                        attempt, self.max_retries, exc.response.status_code, delay,
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+                self._raise_http_error(exc)
+                raise
+            except Exception as exc:
+                if attempt < self.max_retries and self._is_retryable_exception(exc):
+                    delay = self._retry_delay_seconds(attempt)
+                    logger.warning(
+                        "OpenAI HTTP request failed (attempt=%d/%d, error=%s: %s), retrying in %.1fs",
+                        attempt, self.max_retries, type(exc).__name__, exc, delay,
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+                raise
+
+        raise RuntimeError("OpenAI HTTP request failed without an exception")
+
+    async def _astream_json_lines(self, endpoint: str, payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Async counterpart of _stream_json_lines; only opening the stream is retried."""
+        self._ensure_api_key_configured()
+        url = self._build_url(endpoint)
+        http_client = shared_async_http_client(self.base_url)
+
+        for attempt in range(1, self.max_retries + 1):
+            request_id = self.client_request_id or str(uuid.uuid4())
+            delay: Optional[float] = None
+            try:
+                async with http_client.stream(
+                    "POST",
+                    url,
+                    headers=self._build_headers(request_id),
+                    json=payload,
+                ) as response:
+                    try:
+                        response.raise_for_status()
+                    except httpx.HTTPStatusError as exc:
+                        if attempt < self.max_retries and self._is_retryable_exception(exc):
+                            delay = self._retry_delay_seconds(attempt, exc.response)
+                            logger.warning(
+                                "OpenAI HTTP stream failed (attempt=%d/%d, status=%d), retrying in %.1fs",
+                                attempt, self.max_retries, exc.response.status_code, delay,
+                            )
+                        else:
+                            await response.aread()
+                            self._raise_http_error(exc)
+                            raise
+                    if delay is None:
+                        async for line in response.aiter_lines():
+                            if not line or not line.startswith("data:"):
+                                continue
+                            data = line[5:].strip()
+                            if data == "[DONE]":
+                                break
+                            try:
+                                yield json.loads(data)
+                            except json.JSONDecodeError:
+                                continue
+                        return
+            except httpx.HTTPStatusError:
+                raise
+            except Exception as exc:
+                if attempt < self.max_retries and self._is_retryable_exception(exc):
+                    delay = self._retry_delay_seconds(attempt)
+                    logger.warning(
+                        "OpenAI HTTP stream failed (attempt=%d/%d, error=%s: %s), retrying in %.1fs",
+                        attempt, self.max_retries, type(exc).__name__, exc, delay,
+                    )
+                else:
+                    raise
+            await asyncio.sleep(delay)
+
+        raise RuntimeError("OpenAI HTTP stream failed without an exception")
+
     def _flatten_message_content(self, content: Any) -> str:
         if content is None:
             return ""
@@ -566,6 +698,17 @@ class OpenAIHttpClient(LLMApiClient):
             self.history.append({"role": "assistant", "content": response_text})
         return response_text
 
+    async def _acreate_response(self,
+                                messages: List[Dict[str, Any]],
+                                track_history: bool = False) -> str:
+        payload = self._build_response_payload(messages, stream=False)
+        response = await self._arequest_json("responses", payload)
+        self._update_stats(response.get("usage"))
+        response_text = self._extract_response_text(response)
+        if track_history:
+            self.history.append({"role": "assistant", "content": response_text})
+        return response_text
+
     def _stream_response(self,
                          payload: Dict[str, Any],
                          track_history: bool = False) -> Iterator[str]:
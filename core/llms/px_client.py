@@ -1,8 +1,8 @@
 import json
-import httpx
 from typing import Union, List, Dict, Any, Iterator, Optional
 from openai import OpenAI
 from ._llm_api_client import LLMApiClient
+from .http_transport import shared_http_client
 from ..utils.config_setting import Config
 from ..utils.handle_max_tokens import handle_max_tokens
 
@@ -32,10 +32,8 @@ class PXClient(LLMApiClient):
 
         self.api_key = api_key
         self.base_url = base_url.strip().strip("`").strip()
-        http_client = httpx.Client(
-            limits=httpx.Limits(max_keepalive_connections=100, max_connections=200),
-            timeout=httpx.Timeout(timeout=600.0, connect=60.0, read=600.0, write=120.0)
-        )
+        # 同一主机的客户端共用进程内的连接池
+        http_client = shared_http_client(self.base_url)
         self.client = OpenAI(
             api_key=self.api_key,
             base_url=self.base_url,
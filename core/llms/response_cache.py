@@ -0,0 +1,290 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from ..utils.config_setting import Config
+from ..utils.single_ton import Singleton
+from ..utils.log import logger
+from ._llm_api_client import _parse_json_lenient
+from .telemetry import tag_context, token_usage
+
+SECTION = "LLMCache"
+
+
+class SiteConfig:
+    """单个调用点的缓存配置：ttl 为缓存秒数，similarity 为语义匹配阈值（None 表示只做精确匹配）"""
+    def __init__(self, ttl: float, similarity: Optional[float] = None):
+        self.ttl = ttl
+        self.similarity = similarity
+
+
+class ResponseCache(metaclass=Singleton):
+    """
+    one_chat / json_chat 的响应缓存，用于提示词经常重复、结果不依赖对话历史的调用点。
+    只有在 setting.ini 的 [LLMCache] 中配置了的调用点才会缓存，没有配置的调用点直接调用 LLM：
+
+        [LLMCache]
+        # 缓存秒数，0 表示不缓存
+        financial_query = 86400
+        # 可选，同时按 embedding_api 的向量做语义匹配
+        financial_query_similarity = 0.95
+
+        [Default]
+        # 可选，缓存条目上限（默认 20000），超出时淘汰最久未使用的
+        llm_cache_max_entries = 20000
+        # 可选，SQLite 文件位置
+        llm_cache_path = ./database/llm_cache.db
+
+    缓存分两层：先按 (调用点, 客户端和模型, 输出格式, 提示词) 的哈希精确匹配；
+    调用点配置了相似度阈值时，再在同一调用点、同一模型的缓存中找余弦相似度最高且超过阈值的提示词。
+    每个条目记录生成时消耗的 token 和耗时，命中时计入节省的 token 和时间。
+    SQLite 文件在第一个开启缓存的调用点被调用时才打开，没有配置 [LLMCache] 时不会创建。
+    """
+    def __init__(self, db_path: Optional[str] = None):
+        config = Config()
+        if db_path is None:
+            db_path = config.get("llm_cache_path") if config.has_key("llm_cache_path") else './database/llm_cache.db'
+        self.max_entries = int(config.get("llm_cache_max_entries")) if config.has_key("llm_cache_max_entries") else 20000
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._sites: Dict[str, Optional[SiteConfig]] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        # 语义匹配用的向量，按命名空间缓存在内存中：命名空间 -> (key 列表, 归一化后的矩阵)
+        self._vectors: Dict[str, Tuple[List[str], Any]] = {}
+        self._embedding = None
+        self._writes = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._open_failed = False
+
+    def _connection(self, create: bool = True) -> Optional[sqlite3.Connection]:
+        """
+        打开 SQLite 文件，只尝试一次。create 为 False 时（统计、清空）文件不存在就不创建。
+        打开文件用单独的锁，调用方不能持有 self._lock。
+        """
+        if self._conn is not None or self._open_failed:
+            return self._conn
+        if not create and not os.path.exists(self.db_path):
+            return None
+        with self._open_lock:
+            if self._conn is not None or self._open_failed:
+                return self._conn
+            try:
+                os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+                conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS llm_responses (
+                        key TEXT PRIMARY KEY,
+                        site TEXT NOT NULL,
+                        namespace TEXT NOT NULL,
+                        prompt TEXT,
+                        response TEXT NOT NULL,
+                        embedding BLOB,
+                        tokens INTEGER NOT NULL DEFAULT 0,
+                        latency REAL NOT NULL DEFAULT 0,
+                        created_at REAL NOT NULL,
+                        expires_at REAL NOT NULL,
+                        last_used REAL NOT NULL,
+                        hits INTEGER NOT NULL DEFAULT 0
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_namespace ON llm_responses (namespace)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_last_used ON llm_responses (last_used)")
+                self._conn = conn
+            except Exception as e:
+                logger.error(f"初始化 LLM 响应缓存失败，缓存不可用: {str(e)}")
+                self._open_failed = True
+        return self._conn
+
+    def site_config(self, site: str) -> Optional[SiteConfig]:
+        if site not in self._sites:
+            config = Config()
+            ttl = float(config.get(site, section=SECTION)) if config.has_key(site, section=SECTION) else 0
+            similarity_key = f"{site}_similarity"
+            similarity = float(config.get(similarity_key, section=SECTION)) if config.has_key(similarity_key, section=SECTION) else None
+            self._sites[site] = SiteConfig(ttl, similarity) if ttl > 0 else None
+        return self._sites[site]
+
+    def one_chat(self, client: Any, site: str, message: Union[str, List[Any]]) -> str:
+        """等同于 client.one_chat(message)，调用点 site 开启缓存时先查缓存"""
+        return self._cached_call(client, site, message, "text", lambda: client.one_chat(message))
+
+    def json_chat(self, client: Any, site: str, message: str, *, schema: Optional[Dict[str, Any]] = None,
+                  parse: bool = True) -> Union[Dict[str, Any], List[Any], str]:
+        """等同于 client.json_chat(message, schema=schema, parse=parse)，缓存的是模型返回的原始文本"""
+        mode = "json:" + hashlib.sha1(json.dumps(schema, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:12] if schema else "json"
+        # 解析失败的结果不写入缓存
+        raw = self._cached_call(client, site, message, mode, lambda: client.json_chat(message, schema=schema, parse=False),
+                                validate=_parse_json_lenient)
+        return _parse_json_lenient(raw) if parse else raw
+
+    def _cached_call(self, client: Any, site: str, message: Union[str, List[Any]], mode: str, call: Callable[[], str],
+                     validate: Optional[Callable[[str], Any]] = None) -> str:
+        site_config = self.site_config(site)
+        if site_config is None or self._connection() is None:
+            with tag_context(site=site):
+                return call()
+
+        text = message if isinstance(message, str) else json.dumps(message, ensure_ascii=False, sort_keys=True, default=str)
+        namespace = f"{site}|{type(client).__name__}:{getattr(client, 'model', '')}|{mode}"
+        key = hashlib.sha256(f"{namespace}\n{text}".encode("utf-8")).hexdigest()
+
+        started = time.perf_counter()
+        vector = None
+        hit = self._get(key)
+        tier = "hits"
+        if hit is None and site_config.similarity is not None:
+            vector = self._embed(text)
+            if vector is not None:
+                hit = self._nearest(namespace, vector, site_config.similarity)
+                tier = "semantic_hits"
+        if hit is not None:
+            response, tokens, latency = hit
+            self._count(site, tier, tokens=tokens, seconds=latency, lookup=time.perf_counter() - started)
+            return response
+
+        tokens_before = token_usage(client)[2]
+        call_started = time.perf_counter()
+        with tag_context(site=site):
+            response = call()
+        latency = time.perf_counter() - call_started
+        self._count(site, "misses", lookup=call_started - started)
+        if not isinstance(response, str) or not response.strip():
+            return response
+        if validate is not None:
+            try:
+                validate(response)
+            except Exception:
+                return response
+        tokens = token_usage(client)[2] - tokens_before
+        if tokens <= 0:
+            # 客户端没有 token 统计时按字符数粗略估算
+            tokens = (len(text) + len(response)) // 2
+        self._put(key, site, namespace, text, response, vector, tokens, latency, site_config.ttl)
+        return response
+
+    def _get(self, key: str) -> Optional[Tuple[str, int, float]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, tokens, latency FROM llm_responses WHERE key = ? AND expires_at > ?",
+                                     (key, now)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE llm_responses SET hits = hits + 1, last_used = ? WHERE key = ?", (now, key))
+        return row
+
+    def _embed(self, text: str):
+        try:
+            import numpy as np
+            if self._embedding is None:
+                from ..embeddings.embedding_factory import EmbeddingFactory
+                self._embedding = EmbeddingFactory().get_instance()
+            vector = np.asarray(self._embedding.convert_to_embedding([text])[0], dtype=np.float32)
+            norm = float(np.linalg.norm(vector))
+            return vector / norm if norm > 0 else None
+        except Exception as e:
+            logger.warning(f"LLM 响应缓存计算向量失败，跳过语义匹配: {str(e)}")
+            return None
+
+    def _nearest(self, namespace: str, vector, threshold: float) -> Optional[Tuple[str, int, float]]:
+        import numpy as np
+        with self._lock:
+            if namespace not in self._vectors:
+                rows = self._conn.execute("SELECT key, embedding FROM llm_responses WHERE namespace = ? AND embedding IS NOT NULL",
+                                          (namespace,)).fetchall()
+                matrix = np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows]) if rows else None
+                self._vectors[namespace] = ([key for key, _ in rows], matrix)
+            keys, matrix = self._vectors[namespace]
+        if matrix is None or matrix.shape[1] != vector.shape[0]:
+            return None
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < threshold:
+            return None
+        # 条目可能已经过期或被淘汰
+        return self._get(keys[best])
+
+    def _put(self, key: str, site: str, namespace: str, prompt: str, response: str, vector, tokens: int,
+             latency: float, ttl: float):
+        import numpy as np
+        now = time.time()
+        blob = vector.astype(np.float32).tobytes() if vector is not None else None
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, site, namespace, prompt, response, embedding, tokens, latency, "
+                    "created_at, expires_at, last_used, hits) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                    (key, site, namespace, prompt, response, blob, tokens, latency, now, now + ttl, now))
+            except Exception as e:
+                logger.warning(f"写入 LLM 响应缓存失败: {str(e)}")
+                return
+            cached = self._vectors.get(namespace)
+            if blob is not None and cached is not None:
+                keys, matrix = cached
+                row = vector.astype(np.float32)[None, :]
+                if matrix is None:
+                    self._vectors[namespace] = ([key], row)
+                elif matrix.shape[1] == row.shape[1]:
+                    self._vectors[namespace] = (keys + [key], np.vstack([matrix, row]))
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._prune(now)
+
+    def _prune(self, now: float):
+        """删除过期条目，条目数超过上限时删除最久未使用的（调用方持有锁）"""
+        removed = self._conn.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,)).rowcount
+        overflow = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            removed += self._conn.execute(
+                "DELETE FROM llm_responses WHERE key IN (SELECT key FROM llm_responses ORDER BY last_used LIMIT ?)",
+                (overflow,)).rowcount
+        if removed:
+            self._vectors.clear()
+
+    def _count(self, site: str, field: str, tokens: int = 0, seconds: float = 0.0, lookup: float = 0.0):
+        with self._lock:
+            stats = self._stats.setdefault(site, {"hits": 0, "semantic_hits": 0, "misses": 0, "saved_tokens": 0,
+                                                  "saved_seconds": 0.0, "lookup_seconds": 0.0})
+            stats[field] += 1
+            stats["saved_tokens"] += tokens
+            stats["saved_seconds"] += seconds
+            stats["lookup_seconds"] += lookup
+
+    def stats(self) -> Dict[str, Any]:
+        """本进程内各调用点的命中情况，以及缓存文件中累计的条目数、命中次数和节省的 token / 时间"""
+        conn = self._connection(create=False)
+        with self._lock:
+            session = {}
+            for site, stats in self._stats.items():
+                lookups = stats["hits"] + stats["semantic_hits"] + stats["misses"]
+                session[site] = dict(stats, hit_rate=round((stats["hits"] + stats["semantic_hits"]) / lookups, 4) if lookups else 0.0,
+                                     saved_seconds=round(stats["saved_seconds"], 3), lookup_seconds=round(stats["lookup_seconds"], 3))
+            stored = {}
+            if conn is not None:
+                for site, entries, hits, tokens, seconds in conn.execute(
+                        "SELECT site, COUNT(*), SUM(hits), SUM(hits * tokens), SUM(hits * latency) FROM llm_responses GROUP BY site"):
+                    stored[site] = {"entries": entries, "hits": hits or 0, "saved_tokens": tokens or 0,
+                                    "saved_seconds": round(seconds or 0.0, 3)}
+        return {"session": session, "stored": stored}
+
+    def clear(self, site: Optional[str] = None):
+        conn = self._connection(create=False)
+        with self._lock:
+            if conn is not None:
+                if site is None:
+                    conn.execute("DELETE FROM llm_responses")
+                else:
+                    conn.execute("DELETE FROM llm_responses WHERE site = ?", (site,))
+            self._vectors.clear()
+
+
+def cached_one_chat(client: Any, site: str, message: Union[str, List[Any]]) -> str:
+    return ResponseCache().one_chat(client, site, message)
+
+
+def cached_json_chat(client: Any, site: str, message: str, *, schema: Optional[Dict[str, Any]] = None,
+                     parse: bool = True) -> Union[Dict[str, Any], List[Any], str]:
+    return ResponseCache().json_chat(client, site, message, schema=schema, parse=parse)
@@ -6,6 +6,7 @@ from typing import Any, Dict, List, Optional, Union, Iterator
 from openai import AzureOpenAI
 import os
 from ._llm_api_client import LLMApiClient
+from .http_transport import shared_http_client
 from ..utils.config_setting import Config
 from ..utils.log import logger
 from ..utils.handle_max_tokens import handle_max_tokens
@@ -49,11 +50,8 @@ class SimpleAzureClient(LLMApiClient):
         if not self.api_key or not self.azure_endpoint:
             raise ValueError("Azure OpenAI API key and endpoint are required.")
             
-        import httpx
-        http_client = httpx.Client(
-            limits=httpx.Limits(max_keepalive_connections=100, max_connections=200),
-            timeout=httpx.Timeout(timeout=600.0, connect=60.0, read=600.0, write=120.0)
-        )
+        # 同一主机的客户端共用进程内的连接池
+        http_client = shared_http_client(self.azure_endpoint)
             
         return AzureOpenAI(
             api_key=self.api_key,
@@ -1,6 +1,6 @@
 from datetime import datetime
 import inspect
-from typing import List, Dict, Any, Optional, Union, Iterator
+from typing import AsyncIterator, List, Dict, Any, Optional, Union, Iterator
 from anthropic import AnthropicBedrock
 import boto3
 import json
@@ -9,12 +9,15 @@ import base64
 from PIL import Image
 import io
 from ._llm_api_client import LLMApiClient
+from .async_sdk import async_anthropic
 from ..utils.config_setting import Config
 from ..utils.handle_max_tokens import handle_max_tokens
 from tenacity import retry, wait_fixed,retry_if_exception,stop_after_attempt
 from core.utils.rate_limit import rate_limit
 
 class SimpleClaudeAwsClient(LLMApiClient):
+    supports_native_async = True
+
     def __init__(self, 
                 aws_access_key_id: Optional[str] = None,
                 aws_secret_access_key: Optional[str] = None,
@@ -117,6 +120,57 @@ class SimpleClaudeAwsClient(LLMApiClient):
             self.history.append({"role": "assistant", "content": assistant_message})
             return assistant_message
 
+    async def _acreate_message(self, messages: List[Dict[str, Any]], max_tokens: Optional[int] = None, stream: bool = False):
+        response = await async_anthropic(self).messages.create(
+            model=self.model,
+            max_tokens=max_tokens or self.max_tokens,
+            messages=messages,
+            stream=stream,
+            temperature=self.temperature,
+            top_p=self.top_p,
+            top_k=self.top_k,
+            stop_sequences=self.stop_sequences,
+            system=self.system_message
+        )
+        self._update_stats(response)
+        self.stat["call_count"]["text_chat"] += 1
+        return response
+
+    async def atext_chat(self, message: str, max_tokens: Optional[int] = None) -> str:
+        copy_history = self.history.copy()
+        copy_history.append({"role": "user", "content": message})
+        response = await self._acreate_message(copy_history, max_tokens)
+        assistant_message = response.content[0].text
+        self.history.append({"role": "user", "content": message})
+        self.history.append({"role": "assistant", "content": assistant_message})
+        return assistant_message
+
+    async def aone_chat(self, message: Union[str, List[Union[str, Any]]], max_tokens: Optional[int] = None) -> str:
+        messages = [{"role": "user", "content": message}] if isinstance(message, str) else message
+        response = await self._acreate_message(messages, max_tokens)
+        return response.content[0].text
+
+    async def astream(self, message: Union[str, List[Union[str, Any]]], use_history: bool = False) -> AsyncIterator[str]:
+        messages = self.history.copy() if use_history else []
+        if isinstance(message, str):
+            messages.append({"role": "user", "content": message})
+        else:
+            messages.extend(message)
+        response = await self._acreate_message(messages, stream=True)
+        full_response = ""
+        async for chunk in response:
+            text = None
+            if chunk.type == 'content_block_start' and chunk.content_block.type == 'text':
+                text = chunk.content_block.text
+            elif chunk.type == 'content_block_delta' and chunk.delta.type == 'text_delta':
+                text = chunk.delta.text
+            if text:
+                full_response += text
+                yield text
+        if use_history:
+            self.history.append({"role": "user", "content": message})
+            self.history.append({"role": "assistant", "content": full_response})
+
     def _handle_stream_response(self, response,message=None):
         full_response = ""
         for chunk in response:
@@ -1,18 +1,20 @@
 import copy
-from typing import Iterator, List, Dict, Any, Literal, Optional, Union
+from typing import AsyncIterator, Iterator, List, Dict, Any, Literal, Optional, Union
 from openai import OpenAI
 import json
 from ._llm_api_client import LLMApiClient
+from .async_sdk import async_openai
+from .http_transport import shared_http_client
 from ..utils.config_setting import Config
 from ..utils.handle_max_tokens import handle_max_tokens
 from tenacity import retry, stop_after_attempt, wait_exponential
 import logging
-import httpx
 
 logger = logging.getLogger(__name__)
 
 class SimpleDeepSeekClient(LLMApiClient):
     supports_structured_output = True
+    supports_native_async = True
 
     def __init__(self, api_key: str = "", base_url: str = "https://api.deepseek.com/",model:str = "deepseek-v4-flash",
                  max_tokens: int = 64000, temperature: float = 1.0, top_p: float = 1,
@@ -23,11 +25,8 @@ class SimpleDeepSeekClient(LLMApiClient):
         if api_key == "" :
             api_key = config.get("deep_seek_api_key")
             
-        # 自定义httpx客户端以处理DeepSeek API偶尔的连接中断问题
-        http_client = httpx.Client(
-            limits=httpx.Limits(max_keepalive_connections=100, max_connections=200),
-            timeout=httpx.Timeout(timeout=600.0, connect=60.0, read=600.0, write=120.0)
-        )
+        # 同一主机的客户端共用进程内的连接池（自定义超时以处理DeepSeek API偶尔的连接中断问题）
+        http_client = shared_http_client(base_url)
         
         self.client = OpenAI(
             api_key=api_key, 
@@ -255,6 +254,48 @@ class SimpleDeepSeekClient(LLMApiClient):
         msg = [{"role": "user", "content": message}] if isinstance(message, str) else message
         return self._create_chat_completion(msg, is_stream)
 
+    async def atext_chat(self, message: str) -> str:
+        if not self.history:
+            self.set_system_message()
+        self._check_and_compress_history()
+        self.history.append({"role": "user", "content": message})
+        try:
+            return await self._acreate_chat_completion(self.history)
+        except Exception as e:
+            error_msg = str(e)
+            if "maximum context length" in error_msg or "context_length_exceeded" in error_msg:
+                logger.warning(f"⚠️ atext_chat上下文长度超限，开始压缩历史消息")
+                self._compress_history()
+                return await self._acreate_chat_completion(self.history)
+            raise
+
+    @retry(stop=stop_after_attempt(10), wait=wait_exponential(multiplier=2, min=5, max=60))
+    async def aone_chat(self, message: Union[str, List[Any]]) -> str:
+        if not self.history:
+            self.set_system_message()
+        msg = [{"role": "user", "content": message}] if isinstance(message, str) else message
+        return await self._acreate_chat_completion(msg)
+
+    async def astream(self, message: Union[str, List[Any]], use_history: bool = False) -> AsyncIterator[str]:
+        if not self.history:
+            self.set_system_message()
+        if use_history:
+            self._check_and_compress_history()
+            self.history.append({"role": "user", "content": message})
+            messages = self.history
+        else:
+            messages = [{"role": "user", "content": message}] if isinstance(message, str) else message
+        kwargs = self._build_request_kwargs(messages, True)
+        stream = await async_openai(self).chat.completions.create(**kwargs)
+        full_response = ""
+        async for chunk in stream:
+            if hasattr(chunk, 'choices') and chunk.choices:
+                delta = chunk.choices[0].delta
+                if hasattr(delta, 'content') and delta.content:
+                    full_response += delta.content
+                    yield delta.content
+        self.history.append({"role": "assistant", "content": full_response})
+
     def tool_chat(self, user_message: str, tools: List[Dict[str, Any]], function_module: Any, is_stream: bool = False) -> Union[str, Iterator[str]]:
         if not self.history:
             self.set_system_message()
@@ -367,6 +408,14 @@ class SimpleDeepSeekClient(LLMApiClient):
             self._update_stats(completion.usage)
             return response
 
+    async def _acreate_chat_completion(self, messages: List[Dict[str, Any]]) -> str:
+        kwargs = self._build_request_kwargs(messages, False)
+        completion = await async_openai(self).chat.completions.create(**kwargs)
+        message = completion.choices[0].message
+        self._last_reasoning_content = getattr(message, "reasoning_content", None)
+        self._update_stats(completion.usage)
+        return message.content
+
     def tool_invoke(self, messages: List[Dict[str, str]], tools: List[Dict[str, Any]]) -> Dict[str, Any]:
         kwargs = self._build_request_kwargs(messages, False, tools)
         completion = self.client.chat.completions.create(**kwargs)
@@ -0,0 +1,382 @@
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+from ..utils.single_ton import Singleton
+
+# 调用 LLM 时附带的标签（session_id、step、site 等），由 llm_tags / tagged / tag_context 设置
+_tags: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("llm_tags", default={})
+# 正在记录的最外层调用；客户端内部互相调用（FallbackLLMClient、默认的 aone_chat 等）只记录最外层
+_active: contextvars.ContextVar[Optional["_Call"]] = contextvars.ContextVar("llm_active_call", default=None)
+
+INSTRUMENTED_METHODS = ("one_chat", "text_chat", "tool_chat", "image_chat", "tool_invoke",
+                        "aone_chat", "atext_chat", "astream")
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+_RETRYABLE_STATUS = frozenset({408, 409, 425, 429})
+
+
+def token_usage(client: Any) -> Tuple[int, int, int]:
+    """从 client.get_stats() 中累加 (prompt, completion, total) token，各客户端的字段名和嵌套方式不同"""
+    try:
+        stats = client.get_stats()
+    except Exception:
+        return 0, 0, 0
+    prompt = completion = total = 0
+
+    def walk(value: Any):
+        nonlocal prompt, completion, total
+        if not isinstance(value, dict):
+            return
+        for key, item in value.items():
+            if isinstance(item, dict):
+                walk(item)
+            elif isinstance(item, (int, float)) and not isinstance(item, bool):
+                if key in ("prompt_tokens", "input_tokens"):
+                    prompt += int(item)
+                elif key in ("completion_tokens", "output_tokens"):
+                    completion += int(item)
+                elif key in ("total_tokens", "token_count"):
+                    total += int(item)
+
+    walk(stats)
+    return prompt, completion, total or prompt + completion
+
+
+def current_tags() -> Dict[str, Any]:
+    return dict(_tags.get())
+
+
+@contextmanager
+def tag_context(**tags):
+    """with 块内的 LLM 调用带上这些标签（不要跨 yield 使用，生成器请用 tagged）"""
+    token = _tags.set({**_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+
+def tagged(generator: Iterator, **tags) -> Iterator:
+    """
+    迭代 generator，每次取下一项时都带上这些标签。
+    标签只在生成器实际运行时生效，生成器暂停时不会影响调用方；在其他线程中迭代也一样有效。
+    """
+    try:
+        while True:
+            token = _tags.set({**_tags.get(), **tags})
+            try:
+                item = next(generator)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                _tags.reset(token)
+            yield item
+    finally:
+        close = getattr(generator, "close", None)
+        if close is not None:
+            close()
+
+
+def llm_tags(**tags):
+    """
+    方法装饰器，执行期间的 LLM 调用带上这些标签；支持普通函数和生成器函数。
+    标签的值可以是函数，以被装饰函数的参数调用，例如 session_id=lambda self, *a, **k: self.session_id
+    """
+    def resolve(args, kwargs) -> Dict[str, Any]:
+        return {key: value(*args, **kwargs) if callable(value) else value for key, value in tags.items()}
+
+    def decorator(func):
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                return (yield from tagged(func(*args, **kwargs), **resolve(args, kwargs)))
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tag_context(**resolve(args, kwargs)):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def note_request(status_code: Optional[int]):
+    """共享连接池每发出一个请求调用一次；status_code 为 None 表示连接或传输失败"""
+    call = _active.get()
+    if call is not None:
+        call.requests += 1
+        if status_code is None or status_code in _RETRYABLE_STATUS or status_code >= 500:
+            call.failed_requests += 1
+
+
+class _Call:
+    def __init__(self, client: Any, method: str):
+        self.client = client
+        self.method = method
+        self.tags = current_tags()
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.first_chunk: Optional[float] = None
+        self.stream = False
+        self.requests = 0
+        self.failed_requests = 0
+        self.tokens_before = token_usage(client)
+
+    def chunk(self):
+        if self.first_chunk is None:
+            self.first_chunk = time.perf_counter() - self.started
+
+    def finish(self, error: Optional[BaseException] = None):
+        prompt, completion, total = (after - before for after, before in zip(token_usage(self.client), self.tokens_before))
+        failed = error is not None and not isinstance(error, GeneratorExit)
+        LLMTelemetry().record({
+            "time": self.started_at,
+            "client": type(self.client).__name__,
+            "model": str(getattr(self.client, "model", "") or ""),
+            "method": self.method,
+            "stream": self.stream,
+            "session_id": self.tags.get("session_id"),
+            "step": self.tags.get("step"),
+            "site": self.tags.get("site"),
+            "ttft": round(self.first_chunk, 4) if self.first_chunk is not None else None,
+            "latency": round(time.perf_counter() - self.started, 4),
+            "prompt_tokens": max(prompt, 0),
+            "completion_tokens": max(completion, 0),
+            "total_tokens": max(total, 0),
+            "requests": self.requests,
+            # 失败后又重新发出的请求次数（传输层失败和可重试的状态码）
+            "retries": max(self.failed_requests - (1 if failed else 0), 0),
+            "error": type(error).__name__ if failed else None,
+        })
+
+
+def _iterate(call: _Call, stream: Iterator) -> Iterator:
+    call.stream = True
+    error = None
+    try:
+        while True:
+            token = _active.set(call)
+            try:
+                chunk = next(stream)
+            except StopIteration:
+                return
+            finally:
+                _active.reset(token)
+            call.chunk()
+            yield chunk
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+        call.finish(error)
+
+
+def instrument(method: str, func: Callable) -> Callable:
+    """包装 LLMApiClient 的对话方法，每次调用记录耗时、首个片段时间、token 和重试次数"""
+    if getattr(func, "__llm_instrumented__", False):
+        return func
+
+    if inspect.isasyncgenfunction(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            if _active.get() is not None:
+                async for chunk in func(self, *args, **kwargs):
+                    yield chunk
+                return
+            call = _Call(self, method)
+            call.stream = True
+            stream = func(self, *args, **kwargs)
+            error = None
+            try:
+                while True:
+                    token = _active.set(call)
+                    try:
+                        chunk = await stream.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    finally:
+                        _active.reset(token)
+                    call.chunk()
+                    yield chunk
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                await stream.aclose()
+                call.finish(error)
+    elif inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(self, *args, **kwargs):
+            if _active.get() is not None:
+                return await func(self, *args, **kwargs)
+            call = _Call(self, method)
+            token = _active.set(call)
+            try:
+                result = await func(self, *args, **kwargs)
+            except BaseException as e:
+                call.finish(e)
+                raise
+            finally:
+                _active.reset(token)
+            call.finish()
+            return result
+    else:
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if _active.get() is not None:
+                return func(self, *args, **kwargs)
+            call = _Call(self, method)
+            token = _active.set(call)
+            try:
+                result = func(self, *args, **kwargs)
+            except BaseException as e:
+                call.finish(e)
+                raise
+            finally:
+                _active.reset(token)
+            if isinstance(result, Iterator):
+                # 流式调用在迭代结束时才算完成
+                return _iterate(call, result)
+            call.finish()
+            return result
+
+    wrapper.__llm_instrumented__ = True
+    return wrapper
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Series:
+    """Prometheus 导出用的累计值，按 (client, model, site, method) 分组"""
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency_sum = 0.0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.ttft_count = 0
+        self.ttft_sum = 0.0
+        self.ttft_buckets = [0] * len(LATENCY_BUCKETS)
+
+    @staticmethod
+    def _observe(buckets: List[int], value: float):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                buckets[i] += 1
+
+    def add(self, record: Dict[str, Any]):
+        self.calls += 1
+        self.errors += 1 if record["error"] else 0
+        self.retries += record["retries"]
+        self.prompt_tokens += record["prompt_tokens"]
+        self.completion_tokens += record["completion_tokens"]
+        self.latency_sum += record["latency"]
+        self._observe(self.latency_buckets, record["latency"])
+        if record["ttft"] is not None:
+            self.ttft_count += 1
+            self.ttft_sum += record["ttft"]
+            self._observe(self.ttft_buckets, record["ttft"])
+
+
+class LLMTelemetry(metaclass=Singleton):
+    """
+    LLM 调用记录。最近的 llm_metrics_max_records（默认 10000）条调用保留明细，用于按会话、步骤、调用点查看；
+    按客户端、模型、调用点累计的计数不会丢弃，用于 Prometheus 导出。
+    """
+    def __init__(self, max_records: Optional[int] = None):
+        if max_records is None:
+            from ..utils.config_setting import Config
+            config = Config()
+            max_records = int(config.get("llm_metrics_max_records")) if config.has_key("llm_metrics_max_records") else 10000
+        self.records: Deque[Dict[str, Any]] = deque(maxlen=max_records)
+        self.series: Dict[Tuple[str, str, str, str], _Series] = {}
+        self._lock = threading.Lock()
+
+    def record(self, record: Dict[str, Any]):
+        key = (record["client"], record["model"], record["site"] or "", record["method"])
+        with self._lock:
+            self.records.append(record)
+            self.series.setdefault(key, _Series()).add(record)
+
+    def recent(self, session_id: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        with self._lock:
+            records = [r for r in self.records if session_id is None or r["session_id"] == session_id]
+        return records[-limit:] if limit > 0 else []
+
+    def summary(self, group_by: str = "site", session_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """按 group_by（site / step / session_id / client / model / method）汇总最近的调用"""
+        groups: Dict[str, Dict[str, Any]] = {}
+        for r in self.recent(session_id, limit=len(self.records)):
+            group = groups.setdefault(str(r.get(group_by)), {
+                "calls": 0, "errors": 0, "retries": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "total_tokens": 0, "latency_total": 0.0, "latency_max": 0.0, "ttft_total": 0.0, "ttft_count": 0})
+            group["calls"] += 1
+            group["errors"] += 1 if r["error"] else 0
+            group["retries"] += r["retries"]
+            for field in ("prompt_tokens", "completion_tokens", "total_tokens"):
+                group[field] += r[field]
+            group["latency_total"] += r["latency"]
+            group["latency_max"] = max(group["latency_max"], r["latency"])
+            if r["ttft"] is not None:
+                group["ttft_total"] += r["ttft"]
+                group["ttft_count"] += 1
+        for group in groups.values():
+            ttft_total, ttft_count = group.pop("ttft_total"), group.pop("ttft_count")
+            group["ttft_avg"] = round(ttft_total / ttft_count, 4) if ttft_count else None
+            group["latency_avg"] = round(group["latency_total"] / group["calls"], 4)
+            group["latency_total"] = round(group["latency_total"], 4)
+        return groups
+
+    def prometheus(self) -> str:
+        """Prometheus 文本格式"""
+        lines: List[str] = []
+
+        def labels(key: Tuple[str, str, str, str], **extra) -> str:
+            values = dict(zip(("client", "model", "site", "method"), key), **extra)
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in values.items()) + "}"
+
+        def histogram(name: str, help_text: str, rows):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, buckets, total, count in rows:
+                for bound, value in zip(LATENCY_BUCKETS, buckets):
+                    lines.append(f"{name}_bucket{labels(key, le=bound)} {value}")
+                lines.append(f"{name}_bucket{labels(key, le='+Inf')} {count}")
+                lines.append(f"{name}_sum{labels(key)} {round(total, 6)}")
+                lines.append(f"{name}_count{labels(key)} {count}")
+
+        with self._lock:
+            series = sorted(self.series.items())
+            counters = (
+                ("llm_calls_total", "LLM 调用次数", lambda s: s.calls),
+                ("llm_errors_total", "失败的 LLM 调用次数", lambda s: s.errors),
+                ("llm_retries_total", "LLM 请求重试次数", lambda s: s.retries),
+                ("llm_prompt_tokens_total", "输入 token 数", lambda s: s.prompt_tokens),
+                ("llm_completion_tokens_total", "输出 token 数", lambda s: s.completion_tokens),
+            )
+            for name, help_text, value in counters:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for key, s in series:
+                    lines.append(f"{name}{labels(key)} {value(s)}")
+            histogram("llm_latency_seconds", "LLM 调用总耗时（流式调用到最后一个片段）",
+                      [(key, s.latency_buckets, s.latency_sum, s.calls) for key, s in series])
+            histogram("llm_ttft_seconds", "流式调用收到第一个片段的时间",
+                      [(key, s.ttft_buckets, s.ttft_sum, s.ttft_count) for key, s in series if s.ttft_count])
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+            self.series.clear()
@@ -153,6 +153,9 @@ class AkshareBPPlanner:
         yield from self.stream_progress()
 
     def stream_progress(self) -> Generator[Dict[str, Any], None, None]:
+        if not self.stop_every_step:
+            yield from self._stream_progress_all()
+            return
         total_steps = len(self.blueprint.blueprint)
         for step_number, step in enumerate(self.blueprint.blueprint, start=1):
             yield send_message(json.dumps({
@@ -171,6 +174,23 @@ class AkshareBPPlanner:
         yield send_message("所有步骤已完成。正在生成最终报告...")
         yield from self.get_final_report()
 
+    def _stream_progress_all(self) -> Generator[Dict[str, Any], None, None]:
+        # 互不依赖的步骤同时执行，消息会交替出现，每条消息带有 step 字段；无法并行时流水线式地顺序执行
+        total_steps = len(self.blueprint.blueprint)
+
+        def on_step_start(step) -> Dict[str, Any]:
+            return send_message(json.dumps({
+                "step": step.step_number,
+                "total_steps": total_steps,
+                "description": step.description,
+                "progress": step.step_number / total_steps
+            }, ensure_ascii=False), "progress")
+
+        yield from self.blueprint.generate_and_execute_all(on_step_start)
+
+        yield send_message("所有步骤已完成。正在生成最终报告...")
+        yield from self.get_final_report()
+
     def step(self) -> Generator[Dict[str, Any], None, None]:
         try:
             current_step = next(iter(self.blueprint.blueprint))  # 获取第一个步骤
@@ -2,6 +2,7 @@ import json
 import os
 from typing import Dict, Any, Generator, List, Callable
 from core.llms.llm_factory import LLMFactory
+from core.llms.response_cache import cached_one_chat
 
 class CodeEnhancementSystem:
     def __init__(self):
@@ -38,7 +39,7 @@ class CodeEnhancementSystem:
         请判断并给出结果。
         """
 
-        response = self.llm_client.one_chat(llm_prompt)
+        response = cached_one_chat(self.llm_client, "code_pre_enhancement", llm_prompt)
         if "无适用规则" not in response:
             return response
         return prompt
@@ -67,7 +68,7 @@ class CodeEnhancementSystem:
         输出的代码用```python 和 ```包裹。
         """
 
-        response = self.llm_client.one_chat(llm_prompt)
+        response = cached_one_chat(self.llm_client, "code_post_enhancement", llm_prompt)
         if "无适用规则" not in response:
             return response
         return code
@@ -8,8 +8,7 @@ from ..embeddings.ranker_factory import RankerFactory
 from ..embeddings._ranker import Ranker
 from ..llms_cheap.llms_cheap_factory import LLMCheapFactory
 from .qdrant_client_singleton import QdrantClientSingleton
-from .build_embedding_db import build_akshare_embedding_db
-import os
+from .build_embedding_db import AkshareIndexBuilder, active_collection
 
 class AkshareFunctions:
     def __init__(self):
@@ -28,9 +27,8 @@ class AkshareFunctions:
         # 连接到 QdrantDB
         db_path = './database/embedding/akshare.db'
         
-        #检查数据库是否存在，不存在创建数据库
-        if not os.path.exists(db_path):
-            build_akshare_embedding_db()
+        #检查数据库是否存在，不存在时创建数据库；akshare 升级后在后台增量更新
+        AkshareIndexBuilder().ensure()
 
         #初始化 Qdrant 客户端
         self.client = QdrantClientSingleton.get_instance(db_path)
@@ -39,8 +37,10 @@ class AkshareFunctions:
         llm_cheap_factory = LLMCheapFactory()
         self.llm_cheap = llm_cheap_factory.get_instance()
 
-        # 设置集合名称
-        self.collection_name = 'akshare_embeddings'
+    @property
+    def collection_name(self) -> str:
+        # 向量模型变化时索引重建到新的集合，每次检索都取当前使用的集合
+        return active_collection()
 
     def get_embeddings(self, texts: List[str]) -> List[List[float]]:
         """
@@ -2,14 +2,14 @@ import re
 from typing import Generator, List, Dict, Any, Union
 from core.llms.llm_factory import LLMFactory
 from core.llms._llm_api_client import LLMApiClient
+from core.llms.response_cache import cached_one_chat
 from core.embeddings.embedding_factory import EmbeddingFactory
 from core.embeddings._embedding import Embedding
 from core.embeddings.ranker_factory import RankerFactory
 from core.embeddings._ranker import Ranker
-from qdrant_client import QdrantClient
+from .qdrant_client_singleton import QdrantClientSingleton
 from core.llms_cheap.llms_cheap_factory import LLMCheapFactory
-from .build_embedding_db import build_akshare_embedding_db
-import os
+from .build_embedding_db import AkshareIndexBuilder, active_collection
 
 class AkshareRetieval:
     def __init__(self):
@@ -28,19 +28,20 @@ class AkshareRetieval:
         # 连接到 QdrantDB
         db_path = './database/embedding/akshare.db'
         
-        #检查数据库是否存在，不存在创建数据库
-        if not os.path.exists(db_path):
-            build_akshare_embedding_db()
+        #检查数据库是否存在，不存在时创建数据库；akshare 升级后在后台增量更新
+        AkshareIndexBuilder().ensure()
 
         #初始化 Qdrant 客户端
-        self.client = QdrantClient(path=db_path)
+        self.client = QdrantClientSingleton.get_instance(db_path)
 
         #初始化 Cheap LLM 客户端
         llm_cheap_factory = LLMCheapFactory()
         self.llm_cheap = llm_cheap_factory.get_instance()
 
-        # 设置集合名称
-        self.collection_name = 'akshare_embeddings'
+    @property
+    def collection_name(self) -> str:
+        # 向量模型变化时索引重建到新的集合，每次检索都取当前使用的集合
+        return active_collection()
 
     def get_embeddings(self, texts: List[str]) -> List[List[float]]:
         """
@@ -106,7 +107,7 @@ class AkshareRetieval:
         if is_stream:
             return self._process_stream_result(self.llm_cheap.one_chat(preprocess_prompt, is_stream=True))
         else:
-            focused_query = self.llm_cheap.one_chat(preprocess_prompt).strip()
+            focused_query = cached_one_chat(self.llm_cheap, "akshare_preprocess", preprocess_prompt).strip()
             return self._process_result(focused_query)
 
     def _process_result(self, result: str) -> str:
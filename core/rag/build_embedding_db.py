@@ -1,92 +1,269 @@
+import hashlib
+import json
 import os
 import re
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from tqdm import tqdm
 from core.akshare_doc.akshare_tool_info import AkshareToolInfo
 from core.embeddings._embedding import Embedding
+from core.embeddings._embedding_cache import model_name_of
 from core.embeddings.embedding_factory import EmbeddingFactory
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import PointStruct, VectorParams, Distance
-import time
+from core.rag.qdrant_client_singleton import QdrantClientSingleton
+from core.utils.config_setting import Config
+from core.utils.single_ton import Singleton
+from core.utils.log import logger
+from qdrant_client.http.models import PointIdsList, PointStruct, VectorParams, Distance
+
+DB_DIRECTORY = './database/embedding'
+DB_PATH = os.path.join(DB_DIRECTORY, 'akshare.db')
+COLLECTION_NAME = 'akshare_embeddings'
+# 上一次完整构建时的 akshare 版本和向量模型，版本没变时启动不再检查索引
+STATE_PATH = os.path.join(DB_DIRECTORY, 'akshare_index_state.json')
+# 点的 id 由函数名生成，函数内容变化时覆盖同一个点
+_ID_NAMESPACE = uuid.UUID('6f1c3a52-8d7e-4b7a-9a43-2f0c1d5e7b19')
 
-def build_akshare_embedding_db():
-    # 创建目录和文件路径
-    db_directory = './database/embedding'
-    db_path = os.path.join(db_directory, 'akshare.db')
-    if not os.path.exists(db_directory):
-        os.makedirs(db_directory)
+EMBED_BATCH = 64
+UPSERT_BATCH = 512
 
-    # 初始化 AkshareToolInfo 并提取函数
+
+def prepare_akshare_documents() -> List[Tuple[str, str]]:
+    """提取 akshare 函数，返回 (函数名, 用于向量化的内容) 列表"""
     info = AkshareToolInfo()
     funcs = info.extract_akshare_functions()
 
+    url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
+    # 过滤包含 'http' 的文档首行
+    filtered_funcs = [ {"name":f['name'],"docstring":re.sub(url_pattern, '', f['docstring'])}  for f in funcs]
+    filtered_funcs = [ {"name":f['name'],"docstring":re.sub(r'股本股东-|经济数据-|经济数据一览-|经济数据-|申万指数-|指数发布-|市场数据-|基金产品公示-|诚信信息公示-|信息公示-|概念板-|数据中心-|特色数据-|行情中心-|\n', '', f['docstring'])}  for f in filtered_funcs]
+
+    return [(f['name'], f"{f['name']}: {f['docstring'].split(':rtype')[0]}") for f in filtered_funcs]
+
+
+def point_id(name: str) -> str:
+    return str(uuid.uuid5(_ID_NAMESPACE, name))
+
+
+def content_hash(model: str, content: str) -> str:
+    # 换了向量模型时哈希也不同，所有文档都会重新向量化
+    return hashlib.sha256(f"{model}\n{content}".encode('utf-8')).hexdigest()
+
+
+def akshare_version() -> str:
+    try:
+        import akshare
+        return getattr(akshare, '__version__', '') or ''
+    except ImportError:
+        return ''
+
+
+def _read_state() -> Dict[str, Any]:
+    try:
+        with open(STATE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+_active_lock = threading.Lock()
+_active_cache: Tuple[Optional[float], str] = (None, COLLECTION_NAME)
+
+
+def active_collection() -> str:
+    """检索使用的集合名：记录在状态文件中，换了向量模型重建到新集合并完成后才会切换"""
+    global _active_cache
+    try:
+        mtime = os.path.getmtime(STATE_PATH)
+    except OSError:
+        return COLLECTION_NAME
+    with _active_lock:
+        if _active_cache[0] != mtime:
+            _active_cache = (mtime, _read_state().get("collection") or COLLECTION_NAME)
+        return _active_cache[1]
+
+
+def _collection_for(model: str, dimensions: int) -> str:
+    # 同一个模型和维度总是得到同一个集合名，重建中断后重新运行时继续写入同一个集合
+    return f"{COLLECTION_NAME}_{hashlib.sha256(f'{model}|{dimensions}'.encode('utf-8')).hexdigest()[:12]}"
+
+
+def _existing_hashes(client, collection_name: str) -> Dict[Any, Optional[str]]:
+    """集合中已有的点：id -> content_hash（旧版本构建的点没有哈希，为 None）"""
+    existing = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(collection_name=collection_name, limit=1024, offset=offset,
+                                       with_payload=['content_hash'], with_vectors=False)
+        for point in points:
+            existing[point.id] = (point.payload or {}).get('content_hash')
+        if offset is None:
+            return existing
+
+
+def _needs_rebuild(client, collection_name: str, state: Dict[str, Any], model: str, dimensions: int) -> Optional[str]:
+    """当前集合不能原地增量更新的原因：向量维度或模型变化，或者存在旧版本写入的点；可以增量更新时返回 None"""
+    if not client.collection_exists(collection_name):
+        return None
+    vectors = client.get_collection(collection_name).config.params.vectors
+    if getattr(vectors, 'size', dimensions) != dimensions:
+        return f"向量维度从 {vectors.size} 变为 {dimensions}"
+    existing = _existing_hashes(client, collection_name)
+    if any(digest is None for digest in existing.values()):
+        return "存在旧版本写入的点"
+    if existing and state.get("model") != model:
+        return f"向量模型从 {state.get('model')} 变为 {model}"
+    return None
+
+
+def build_akshare_embedding_db(progress: Optional[Callable[[str, int, int], None]] = None,
+                               embed_batch: int = EMBED_BATCH, upsert_batch: int = UPSERT_BATCH) -> Dict[str, int]:
+    """
+    增量构建 akshare 函数的向量索引：按内容哈希比较，只向量化新增或内容变化的函数，删除已经不存在的函数。
+    向量模型、维度变化或存在旧版本的点时，重建到新的集合，完成后才把检索切换过去并删除旧集合；
+    只有内容变化时在当前集合中原地更新。每批写入后即持久化，中途中断时重新运行会从已完成的部分继续。
+    progress(阶段, 已完成, 总数) 用于报告进度；返回各类文档的数量。
+    """
+    if not os.path.exists(DB_DIRECTORY):
+        os.makedirs(DB_DIRECTORY)
+
+    documents = prepare_akshare_documents()
+
     # 初始化 EmbeddingFactory 并获取 Embedding 实例
     embedding_factory = EmbeddingFactory()
     embedding: Embedding = embedding_factory.get_instance()
     if hasattr(embedding, 'emb_type'):
         embedding.emb_type = 'db'
+    model = model_name_of(embedding)
 
-    url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'  
-    # 过滤包含 'http' 的文档首行
-    filtered_funcs = [ {"name":f['name'],"docstring":re.sub(url_pattern, '', f['docstring'])}  for f in funcs]
-    filtered_funcs = [ {"name":f['name'],"docstring":re.sub(r'股本股东-|经济数据-|经济数据一览-|经济数据-|申万指数-|指数发布-|市场数据-|基金产品公示-|诚信信息公示-|信息公示-|概念板-|数据中心-|特色数据-|行情中心-|\n', '', f['docstring'])}  for f in filtered_funcs]
+    # 与检索共用同一个本地 Qdrant 客户端（本地模式同一个目录只能打开一次）
+    client = QdrantClientSingleton.get_instance(DB_PATH)
+    dimensions = embedding.vector_size
+    state = _read_state()
+    active = state.get("collection") or COLLECTION_NAME
+    collection = active
+    reason = _needs_rebuild(client, active, state, model, dimensions)
+    if reason is not None:
+        collection = _collection_for(model, dimensions)
+        logger.info(f"{reason}，重建到新的集合 {collection}，完成前检索继续使用 {active}")
+    if not client.collection_exists(collection):
+        client.create_collection(
+            collection_name=collection,
+            vectors_config=VectorParams(size=dimensions, distance=Distance.COSINE)
+        )
 
-    # 准备数据
-    names = [f['name'] for f in filtered_funcs]
-    contents = [f"{f['name']}: {f['docstring'].split(':rtype')[0]}" for f in filtered_funcs]
+    existing = _existing_hashes(client, collection)
+    wanted = {point_id(name): (name, content, content_hash(model, content)) for name, content in documents}
+    changed = [(pid, name, content, digest) for pid, (name, content, digest) in wanted.items() if existing.get(pid) != digest]
+    removed = [pid for pid in existing if pid not in wanted]
+    logger.info(f"akshare 向量索引 {collection}：共 {len(wanted)} 个函数，{len(changed)} 个需要向量化，{len(removed)} 个需要删除")
 
-    # 批处理大小
-    batch_size = 16
-    embeddings = []
+    points: List[PointStruct] = []
+    done = 0
+    with tqdm(total=len(changed), desc="处理嵌入") as pbar:
+        for start in range(0, len(changed), embed_batch):
+            batch = changed[start:start + embed_batch]
+            batch_embeddings = embedding.convert_to_embedding([content for _, _, content, _ in batch])
+            for (pid, name, content, digest), vector in zip(batch, batch_embeddings):
+                points.append(PointStruct(id=pid, vector=vector,
+                                          payload={"name": name, "content": content, "content_hash": digest}))
+            if len(points) >= upsert_batch or start + embed_batch >= len(changed):
+                client.upsert(collection_name=collection, points=points)
+                points = []
+            done += len(batch)
+            pbar.update(len(batch))
+            if progress is not None:
+                progress("embedding", done, len(changed))
 
-    # 计算总批次数
-    total_batches = (len(contents) + batch_size - 1) // batch_size
+    # 新的点写完之后再删除，更新期间检索仍然能用旧的点
+    for start in range(0, len(removed), upsert_batch):
+        client.delete(collection_name=collection, points_selector=PointIdsList(points=removed[start:start + upsert_batch]))
+        if progress is not None:
+            progress("deleting", min(start + upsert_batch, len(removed)), len(removed))
 
-    # 使用tqdm创建进度条
-    with tqdm(total=len(contents), desc="处理嵌入") as pbar:
-        # 分批转换为嵌入
-        for i in range(0, len(contents), batch_size):
-            batch = contents[i:i+batch_size]
-            batch_embeddings = embedding.convert_to_embedding(batch)
-            embeddings.extend(batch_embeddings)
+    # 状态文件写好后检索才切换到新集合
+    with open(STATE_PATH + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({"akshare_version": akshare_version(), "model": model, "collection": collection,
+                   "count": len(wanted), "finished_at": time.time()}, f)
+    os.replace(STATE_PATH + '.tmp', STATE_PATH)
+    if collection != active and client.collection_exists(active):
+        logger.info(f"检索已切换到 {collection}，删除旧集合 {active}")
+        client.delete_collection(active)
 
-            # 更新进度条
-            pbar.update(len(batch))
+    result = {"total": len(wanted), "embedded": len(changed), "deleted": len(removed), "unchanged": len(wanted) - len(changed)}
+    print(f"Successfully indexed {len(wanted)} functions in {DB_PATH}/{collection}: {result}")
+    return result
 
-    # 连接到 QdrantDB
-    client = QdrantClient(path=db_path)
 
-    # 确保集合存在
-    collection_name = 'akshare_embeddings'
-        # 创建或重新创建集合
-    if client.collection_exists(collection_name):
-        client.delete_collection(collection_name)
-    
-    dimensions = embedding.vector_size
+class AkshareIndexBuilder(metaclass=Singleton):
+    """
+    在后台线程中运行 build_akshare_embedding_db，并记录进度。
+    索引不存在时 ensure() 等待构建完成；已有索引时只在 akshare 版本或向量模型变化后在后台增量更新，期间继续使用旧索引。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._status: Dict[str, Any] = {"state": "idle"}
 
-    client.create_collection(
-    collection_name=collection_name,
-    vectors_config=VectorParams(size=dimensions, distance=Distance.COSINE)
-)
-
-    points = []
-    total = len(embeddings)  # 假设embeddings、names和contents长度相同
-
-    for i, (embedding, name, content) in enumerate(tqdm(zip(embeddings, names, contents), total=total, desc="存储数据")):
-        points.append(
-            PointStruct(
-                id=i,
-                vector=embedding,
-                payload={"name": name, "content": content}
-            )
-        )
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._status)
+
+    def _set(self, **fields):
+        with self._lock:
+            self._status.update(fields)
+
+    def _run(self):
+        started = time.time()
+        self._set(state="running", phase="preparing", done=0, total=None, started_at=started, finished_at=None, error=None)
+        try:
+            result = build_akshare_embedding_db(progress=lambda phase, done, total: self._set(phase=phase, done=done, total=total))
+            self._set(state="done", phase="finished", result=result, finished_at=time.time())
+        except Exception as e:
+            logger.error(f"构建 akshare 向量索引失败: {str(e)}")
+            self._set(state="failed", error=str(e), finished_at=time.time())
+
+    def start(self) -> threading.Thread:
+        """启动后台构建；已经在运行时返回正在运行的线程"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._status = {"state": "running", "phase": "preparing"}
+                self._thread = threading.Thread(target=self._run, name="akshare-index", daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def wait(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.status()
+
+    def is_stale(self) -> bool:
+        """akshare 版本或向量模型与上次完整构建时不同"""
+        state = _read_state()
+        if not state:
+            return True
+        if state.get("akshare_version") != akshare_version():
+            return True
+        config = Config()
+        # 只比较类名部分，避免为了比较而创建 Embedding 实例
+        embedding_api = config.get("embedding_api") if config.has_key("embedding_api") else ""
+        model_class = re.split(r'[:|]', str(state.get("model", "")))[0]
+        return bool(embedding_api) and model_class != embedding_api
 
-    client.upsert(
-        collection_name=collection_name,
-        points=points
-    )
+    def ensure(self):
+        """检索前调用：没有索引时同步构建，索引过期时在后台增量更新"""
+        if not os.path.exists(DB_PATH):
+            self.start()
+            status = self.wait()
+            if status["state"] == "failed":
+                raise RuntimeError(f"构建 akshare 向量索引失败: {status['error']}")
+        elif self.is_stale():
+            logger.info("akshare 版本或向量模型有变化，在后台增量更新向量索引")
+            self.start()
 
-    print(f"Successfully stored {len(points)} embeddings in {db_path}")
 
 # 示例使用
 if __name__ == "__main__":
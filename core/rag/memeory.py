@@ -1,6 +1,7 @@
 import json
+import os
 import numpy as np
-from typing import List, Dict, Any, Union, Generator
+from typing import List, Dict, Any, Union, Generator, Optional, Sequence, Tuple
 from ..embeddings.embedding_factory import EmbeddingFactory
 from ..embeddings._embedding import Embedding
 from ..llms_cheap.llms_cheap_factory import LLMCheapFactory
@@ -13,29 +14,128 @@ llm_cheap = llm_cheap_factory.get_instance()
 def embedding_similarity(a: List[float], b: List[float]) -> float:
     return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
+def _normalize(matrix: Any) -> np.ndarray:
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+def _quantize(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """按行对称量化为 int8，返回 (codes, 每行的缩放系数)"""
+    scales = np.abs(matrix).max(axis=1) / 127 if len(matrix) else np.zeros(0, dtype=np.float32)
+    scales = np.where(scales == 0, 1, scales).astype(np.float32)
+    return np.round(matrix / scales[:, None]).astype(np.int8), scales
+
 class Memory:
-    def __init__(self, embedding_client: Embedding = embedding_client, sim_func=embedding_similarity):
-        self.data: List[Dict[str, Any]] = []
+    """
+    文本向量检索。向量归一化后存成一个连续的 float32 矩阵（行与 texts 对应），
+    检索是一次矩阵乘法加 argpartition 取 top-k；quantize=True 时改存 int8 矩阵，内存约为 1/4。
+    save_to_file 把矩阵写到同名的 .npy 文件，load_from_file 默认以内存映射的方式打开。
+    """
+    # int8 矩阵分块转换为 float32 计算得分，限制临时内存
+    INT8_CHUNK = 8192
+
+    def __init__(self, embedding_client: Embedding = embedding_client, sim_func=embedding_similarity, quantize: bool = False):
+        self.texts: List[str] = []
         self.embedding_client = embedding_client
         self.sim_func = sim_func
         self.llm_cheap = llm_cheap
+        self.quantize = quantize
+        self._matrix: Optional[np.ndarray] = None
+        self._int8: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._pending: List[np.ndarray] = []
+
+    @property
+    def data(self) -> List[Dict[str, Any]]:
+        """兼容原来的 [{"text": ..., "emb": ...}] 结构，emb 为归一化后的向量"""
+        return [{"text": text, "emb": emb} for text, emb in zip(self.texts, self.embeddings)]
+
+    @data.setter
+    def data(self, items: List[Dict[str, Any]]):
+        self.texts = []
+        self._matrix = None
+        self._int8 = None
+        self._pending = []
+        self._append([item["text"] for item in items], [item["emb"] for item in items])
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """所有向量组成的 (N, D) float32 矩阵（已归一化）"""
+        self._consolidate()
+        if self._int8 is not None:
+            codes, scales = self._int8
+            return codes.astype(np.float32) * scales[:, None]
+        if self._matrix is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._matrix
+
+    def _append(self, texts: List[str], embeddings: Sequence[Any]):
+        if not texts:
+            return
+        self.texts.extend(texts)
+        self._pending.append(_normalize(embeddings))
+
+    def _consolidate(self):
+        # 新增的向量先放在 _pending，检索前合并，避免逐条追加时反复复制整个矩阵
+        if not self._pending and not (self.quantize and self._matrix is not None):
+            return
+        parts = ([self._matrix] if self._matrix is not None else []) + self._pending
+        matrix = np.vstack(parts) if parts else None
+        self._pending = []
+        if not self.quantize:
+            self._matrix = matrix
+            return
+        self._matrix = None
+        if matrix is not None:
+            codes, scales = _quantize(matrix)
+            if self._int8 is not None:
+                codes, scales = np.vstack([self._int8[0], codes]), np.concatenate([self._int8[1], scales])
+            self._int8 = (codes, scales)
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        """queries 为归一化后的 (B, D) 矩阵，返回 (B, N) 的余弦相似度"""
+        if self._int8 is None:
+            return queries @ self._matrix.T
+        codes, scales = self._int8
+        scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), self.INT8_CHUNK):
+            chunk = codes[start:start + self.INT8_CHUNK]
+            scores[:, start:start + len(chunk)] = queries @ chunk.astype(np.float32).T
+        return scores * scales
+
+    def search_embeddings(self, query_embs: Any, topk: int) -> List[List[Tuple[int, float]]]:
+        """
+        批量检索：query_embs 为一个或多个查询向量，
+        每个查询返回相似度最高的 topk 个 (行号, 余弦相似度)，按相似度从高到低排列
+        """
+        queries = _normalize(query_embs)
+        self._consolidate()
+        k = min(topk, len(self.texts))
+        if k <= 0:
+            return [[] for _ in queries]
+        scores = self._scores(queries)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        return [list(zip(rows.tolist(), values.tolist())) for rows, values in zip(top, top_scores)]
+
+    def _top_texts(self, query_emb: Any, topk: int) -> List[str]:
+        if self.sim_func is not embedding_similarity:
+            # 自定义的相似度函数只能逐条计算
+            ranked = sorted(self.data, key=lambda x: self.sim_func(x['emb'], query_emb), reverse=True)[:topk]
+            return [item['text'] for item in ranked]
+        return [self.texts[row] for row, _ in self.search_embeddings(query_emb, topk)[0]]
 
     def save_memory(self, text: str):
         embedding = self.embedding_client.convert_to_embedding([text])[0]
-        self.data.append({
-            "text": text,
-            "emb": embedding
-        })
+        self._append([text], [embedding])
 
     def batch_save(self, texts: List[str], batch_size: int = 16):
         for i in range(0, len(texts), batch_size):
             batch = texts[i:i+batch_size]
             embeddings = self.embedding_client.convert_to_embedding(batch)
-            for text, embedding in zip(batch, embeddings):
-                self.data.append({
-                    "text": text,
-                    "emb": embedding
-                })
+            self._append(batch, embeddings)
 
     def preprocess_query(self, query: str, is_stream: bool = False) -> Union[str, Generator[str, None, None]]:
         preprocess_prompt = f"""原始查询：{query}
@@ -195,8 +295,7 @@ class Memory:
         query_emb = self.embedding_client.convert_to_embedding([focused_query])[0]
         
         # Initial retrieval
-        memory = sorted(self.data, key=lambda x: self.sim_func(x['emb'], query_emb), reverse=True)[:initial_topk]
-        texts = [m['text'] for m in memory]
+        texts = self._top_texts(query_emb, initial_topk)
         
         # Use LLM for ranking
         ranked_texts = self.llm_rank(f"{query}", texts, final_topk)
@@ -278,12 +377,28 @@ Your ranking:"""
         # 为预处理后的查询生成嵌入
         query_emb = self.embedding_client.convert_to_embedding([focused_query])[0]
         
-        # 使用嵌入相似度排序并选择前topk个结果
-        sorted_data = sorted(self.data, key=lambda x: self.sim_func(x['emb'], query_emb), reverse=True)
-        top_results = sorted_data[:topk]
-        
-        # 返回文档内容
-        return [item['text'] for item in top_results]
+        # 使用嵌入相似度选择前topk个结果
+        return self._top_texts(query_emb, topk)
+
+    def batch_search_documents(self, queries: List[str], topk: int = 50) -> List[List[str]]:
+        """
+        批量版本的 search_documents，所有查询的向量一次生成、一次矩阵乘法完成检索。
+
+        Args:
+            queries (List[str]): 查询字符串列表。
+            topk (int): 每个查询返回的文档数量。默认为50。
+
+        Returns:
+            List[List[str]]: 与 queries 一一对应的最相关文档列表。
+        """
+        if not queries:
+            return []
+        focused_queries = [self.preprocess_query(query) for query in queries]
+        query_embs = self.embedding_client.convert_to_embedding(focused_queries)
+        if self.sim_func is not embedding_similarity:
+            return [self._top_texts(query_emb, topk) for query_emb in query_embs]
+        return [[self.texts[row] for row, _ in hits] for hits in self.search_embeddings(query_embs, topk)]
+
     def to_json(self) -> str:
         return json.dumps({"data": self.data}, default=lambda obj: obj.tolist() if isinstance(obj, np.ndarray) else obj)
 
@@ -295,13 +410,29 @@ Your ranking:"""
         return memory
 
     def save_to_file(self, filename: str):
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump({"data": self.data}, f, default=lambda obj: obj.tolist() if isinstance(obj, np.ndarray) else obj)
+        """文本写入 filename（JSON），向量写入同名的 .npy 文件"""
+        sidecar = os.path.splitext(filename)[0] + ".npy"
+        with open(sidecar + ".tmp", 'wb') as f:
+            np.save(f, self.embeddings)
+        os.replace(sidecar + ".tmp", sidecar)
+        with open(filename + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({"data": [{"text": text} for text in self.texts], "embeddings": os.path.basename(sidecar)}, f, ensure_ascii=False)
+        os.replace(filename + ".tmp", filename)
 
     @classmethod
-    def load_from_file(cls, filename: str, embedding_client: Embedding = embedding_client, sim_func=embedding_similarity) -> 'Memory':
+    def load_from_file(cls, filename: str, embedding_client: Embedding = embedding_client, sim_func=embedding_similarity,
+                       quantize: bool = False, mmap: bool = True) -> 'Memory':
+        """读取 save_to_file 保存的文件，向量默认以内存映射的方式打开；也兼容向量内嵌在 JSON 里的旧格式"""
         with open(filename, 'r', encoding='utf-8') as f:
             data = json.load(f)
-        memory = cls(embedding_client, sim_func)
-        memory.data = data["data"]
-        return memory
\ No newline at end of file
+        memory = cls(embedding_client, sim_func, quantize)
+        if "embeddings" not in data:
+            memory.data = data["data"]
+            return memory
+        sidecar = os.path.join(os.path.dirname(filename), data["embeddings"])
+        matrix = np.load(sidecar, mmap_mode="r" if mmap else None)
+        if len(matrix) != len(data["data"]):
+            raise ValueError(f"{sidecar} 有 {len(matrix)} 个向量，与 {filename} 的 {len(data['data'])} 条文本不一致")
+        memory.texts = [item["text"] for item in data["data"]]
+        memory._matrix = matrix
+        return memory
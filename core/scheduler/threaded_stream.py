@@ -0,0 +1,100 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncGenerator, Iterable, Optional
+from ..utils.single_ton import Singleton
+
+_END = object()
+
+
+class _ProducerError:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class ThreadedStreamBridge(metaclass=Singleton):
+    """
+    把同步生成器放到有界线程池里驱动，通过 asyncio.Queue 把结果送回事件循环。
+    talker / planner 里阻塞的 LLM 调用、akshare 请求、exec 都在工作线程里执行，
+    事件循环只负责转发，不同 session 的流可以并发输出。
+    队列有上限，消费端（网络）慢的时候生产线程会阻塞等待，形成背压。
+    """
+    def __init__(self, max_workers: Optional[int] = None, queue_size: Optional[int] = None):
+        from ..utils.config_setting import Config
+        config = Config()
+        if max_workers is None:
+            max_workers = int(config.get("stream_max_workers")) if config.has_key("stream_max_workers") else 32
+        if queue_size is None:
+            queue_size = int(config.get("stream_queue_size")) if config.has_key("stream_queue_size") else 64
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stream")
+        self._active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def active_streams(self) -> int:
+        with self._lock:
+            return self._active
+
+    async def iterate(self, generator: Iterable[Any]) -> AsyncGenerator[Any, None]:
+        """
+        异步迭代一个同步生成器，生成器的每一步都在工作线程里执行
+        :param generator: 同步生成器或可迭代对象
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        # 队列里最多有 queue_size 条未被消费的数据，用信号量做额度控制
+        credits = threading.Semaphore(self.queue_size)
+        stop_event = threading.Event()
+
+        def put(item, block: bool = True) -> bool:
+            # 在工作线程中执行，额度用完时阻塞等待消费端（背压）
+            while block and not stop_event.is_set():
+                if credits.acquire(timeout=0.5):
+                    break
+            if stop_event.is_set() and block:
+                return False
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+                return True
+            except RuntimeError:
+                # 事件循环已经关闭
+                return False
+
+        def produce():
+            with self._lock:
+                self._active += 1
+            try:
+                iterator = iter(generator)
+                try:
+                    for item in iterator:
+                        if not put(item):
+                            break
+                finally:
+                    close = getattr(iterator, "close", None)
+                    if close is not None:
+                        close()
+            except BaseException as e:
+                put(_ProducerError(e), block=False)
+            finally:
+                put(_END, block=False)
+                with self._lock:
+                    self._active -= 1
+
+        loop.run_in_executor(self.executor, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _END:
+                    break
+                if isinstance(item, _ProducerError):
+                    raise item.error
+                credits.release()
+                yield item
+        finally:
+            # 客户端断开或者出错时通知工作线程尽快停止
+            stop_event.set()
+
+    def shutdown(self, wait: bool = False) -> None:
+        self.executor.shutdown(wait=wait, cancel_futures=True)
@@ -1,6 +1,7 @@
 from typing import Generator, Union, Dict, Any
 from ..llms.llm_factory import LLMFactory
 from ..llms._llm_api_client import LLMApiClient
+from ..llms.response_cache import cached_one_chat
 from ..planner.akshare_fun_planner import AkshareFunPlanner
 from ._talker import Talker
 
@@ -47,7 +48,7 @@ class CliTalker(Talker):
 
         是否与金融数据相关？"""
 
-        response = self.llm_client.one_chat(prompt)
+        response = cached_one_chat(self.llm_client, "financial_query", prompt)
         return "是" in response.lower()
     
     def set_session_id(self, session_id: str) -> None:
@@ -7,6 +7,8 @@ from core.model.user_session_model import UserSession
 
 from ..llms.llm_factory import LLMFactory
 from ..llms._llm_api_client import LLMApiClient
+from ..llms.response_cache import cached_one_chat
+from ..llms.telemetry import llm_tags
 from ..planner.akshare_bp_planner import AkshareBPPlanner
 from ._talker import Talker
 from  ..sse.sse_message_queue import SSEMessageQueue
@@ -25,6 +27,7 @@ class WebBPTalker(Talker):
         self.sessions = UserSessionManager()
         self.loop = self._get_or_create_event_loop()
 
+    @llm_tags(session_id=lambda self, *args, **kwargs: self.session_id)
     def chat(self, message: str) -> Generator[Union[str, Dict[str, Any]], None, None]:
         self.chat_history.append({"role":"user","content":message})
         self.sessions.update_chat_history(self.session_id, self.chat_history)
@@ -104,7 +107,7 @@ class WebBPTalker(Talker):
 
         是否与金融数据相关？"""
 
-        response = self.llm_client.one_chat(prompt)
+        response = cached_one_chat(self.llm_client, "financial_query", prompt)
         return "是" in response.lower()
 
     def set_session_id(self, session_id: str) -> None:
@@ -6,6 +6,7 @@ import jieba
 from collections import defaultdict
 from fuzzywuzzy import fuzz
 from rapidfuzz import fuzz as rfuzz
+from core.utils.fuzzy_index import FuzzyIndex
 
 class StringMatcher:
     def __init__(self, df, index_cache, index_column='content', result_column='ts_code'):
@@ -13,6 +14,7 @@ class StringMatcher:
         self.index_column = index_column
         self.result_column = result_column
         self.inverted_index = self._build_inverted_index(index_cache)
+        self.fuzzy_index = FuzzyIndex(df[index_column].astype(str).tolist(), df[result_column].tolist())
 
     def _build_inverted_index(self, index_cache):
         if os.path.exists(index_cache):
@@ -34,11 +36,13 @@ class StringMatcher:
         return inverted_index
 
     def exact_match(self, query):
-        match = self.df[self.df[self.index_column].str.contains(query, case=False, na=False)]
-        return match[self.result_column].iloc[0] if not match.empty else None
+        return self.fuzzy_index.contains(query)
 
     def regex_match(self, query):
-        pattern = re.compile(query, re.IGNORECASE)
+        try:
+            pattern = re.compile(query, re.IGNORECASE)
+        except re.error:
+            return None
         match = self.df[self.df[self.index_column].apply(lambda x: bool(pattern.search(str(x))))]
         return match[self.result_column].iloc[0] if not match.empty else None
 
@@ -47,8 +51,7 @@ class StringMatcher:
         return getattr(best_match, self.result_column) if fuzz.partial_ratio(query, getattr(best_match, self.index_column)) >= threshold else None
 
     def rapidfuzz_match(self, query, threshold=80):
-        best_match = max(self.df.itertuples(), key=lambda x: rfuzz.partial_ratio(query, getattr(x, self.index_column)))
-        return getattr(best_match, self.result_column) if rfuzz.partial_ratio(query, getattr(best_match, self.index_column)) >= threshold else None
+        return self.fuzzy_index.extract(query, threshold)
 
     def inverted_index_match(self, query):
         query_words = jieba.cut(query)
@@ -1,20 +1,32 @@
 # code_tools.py
 
-from threading import Lock
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import RLock
+from typing import Any, Generator, Optional
 from ..interpreter.data_summarizer import DataSummarizer
 
 class CodeTools:
-    _instance = None
-    _lock = Lock()
-
-    def __new__(cls):
-        with cls._lock:
-            if cls._instance is None:
-                cls._instance = super(CodeTools, cls).__new__(cls)
-                cls._instance.data = {}
-                cls._instance.recovers = {}
-                cls._instance.summarizer = DataSummarizer()
-        return cls._instance
+    """
+    生成代码读写数据的变量空间。
+    全局只有一个根空间，每个 StepData 持有自己的子空间；
+    子空间读取不到的变量会回退到根空间中通过 add_with_recover 注册的共享对象。
+    """
+    def __init__(self, parent: Optional["CodeTools"] = None):
+        self._lock = RLock()
+        self.parent = parent
+        self.data = {}
+        self.recovers = {}
+        self.summarizer = parent.summarizer if parent is not None else DataSummarizer()
+
+    def _shared(self, name):
+        node = self.parent
+        while node is not None:
+            with node._lock:
+                if name in node.recovers:
+                    return True, node.recovers[name]
+            node = node.parent
+        return False, None
 
     def add_with_recover(self, name, value):
         with self._lock:
@@ -34,7 +46,9 @@ class CodeTools:
 
     def get_var(self, name):
         with self._lock:
-            return self.data.get(name)
+            if name in self.data:
+                return self.data[name]
+        return self._shared(name)[1]
 
     def del_var(self, name):
         with self._lock:
@@ -59,7 +73,7 @@ class CodeTools:
             else:
                 self.data[name] = value
                 print(f"Variable '{name}' already existed. Its value has been updated.")
-            
+
             # Check if value is NOT one of the excluded types
             if not isinstance(value, (str, int, float, bool, complex)):
                 summary = self.summarizer.get_data_summary(value)
@@ -67,21 +81,54 @@ class CodeTools:
 
     def is_exists(self, name):
         with self._lock:
-            return name in self.data
+            if name in self.data:
+                return True
+        return self._shared(name)[0]
+
+    def new_namespace(self) -> "CodeTools":
+        """创建一个以当前空间为父空间的独立变量空间"""
+        return CodeTools(parent=self)
+
+    @contextmanager
+    def activate(self):
+        """在当前线程/协程上下文中，让 code_tools 指向这个变量空间"""
+        token = _current_code_tools.set(self)
+        try:
+            yield self
+        finally:
+            _current_code_tools.reset(token)
+
+    def bind(self, generator) -> Generator[Any, None, Any]:
+        """
+        每次推进生成器时激活这个变量空间，yield 出去之后立即恢复，
+        这样在同一个线程里交替推进不同 session 的生成器也不会串数据
+        """
+        iterator = iter(generator)
+        while True:
+            token = _current_code_tools.set(self)
+            try:
+                item = next(iterator)
+            except StopIteration as e:
+                return e.value
+            finally:
+                _current_code_tools.reset(token)
+            yield item
 
     def __contains__(self, name):
         return self.is_exists(name)
 
     def __iter__(self):
         with self._lock:
-            return iter(self.data)
+            return iter(list(self.data))
 
     def __getitem__(self, name):
         with self._lock:
             if name in self.data:
                 return self.data[name]
-            else:
-                raise KeyError(f"Variable '{name}' does not exist.")
+        found, value = self._shared(name)
+        if found:
+            return value
+        raise KeyError(f"Variable '{name}' does not exist.")
 
     def __setitem__(self, name, value):
         if name in self.data:
@@ -100,5 +147,59 @@ class CodeTools:
 
     def __setstate__(self, state):
         self.__dict__.update(state)
-        self._lock = Lock()  # 反序列化时重新创建 _lock
-code_tools = CodeTools()
\ No newline at end of file
+        self._lock = RLock()  # 反序列化时重新创建 _lock
+
+
+class CodeToolsProxy:
+    """
+    模块级的 code_tools 对象。生成的代码通过
+    from core.utils.code_tools import code_tools
+    拿到的是这个代理，它会转发到当前上下文中激活的变量空间，没有激活时使用根空间。
+    """
+    def __init__(self, root: CodeTools):
+        object.__setattr__(self, "_root", root)
+
+    @property
+    def current(self) -> CodeTools:
+        namespace = _current_code_tools.get()
+        return namespace if namespace is not None else self._root
+
+    @property
+    def root(self) -> CodeTools:
+        return self._root
+
+    def add_with_recover(self, name, value):
+        # 需要在 clear 后恢复的对象是各个 session 共享的，总是注册到根空间
+        self._root.add_with_recover(name, value)
+
+    def __getattr__(self, name):
+        return getattr(self.current, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.current, name, value)
+
+    def __contains__(self, name):
+        return name in self.current
+
+    def __iter__(self):
+        return iter(self.current)
+
+    def __getitem__(self, name):
+        return self.current[name]
+
+    def __setitem__(self, name, value):
+        self.current[name] = value
+
+    def __len__(self):
+        return len(self.current)
+
+    def __reduce__(self):
+        return (_get_code_tools, ())
+
+
+def _get_code_tools():
+    return code_tools
+
+
+_current_code_tools: ContextVar[Optional[CodeTools]] = ContextVar("code_tools", default=None)
+code_tools = CodeToolsProxy(CodeTools())
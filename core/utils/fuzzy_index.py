@@ -0,0 +1,93 @@
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from rapidfuzz import fuzz, process
+
+
+class FuzzyIndex:
+    """
+    名称模糊查找的预建索引，构建一次，之后每次查询只扫描少量候选。
+    - 规范化名称（NFKC、小写、去空白）的单字和二元组倒排表，用于包含匹配和模糊匹配的候选筛选
+    - 模糊匹配只在候选集上调用 rapidfuzz.process.extractOne
+    结果与逐行扫描一致：多个结果同样好时返回原始顺序中靠前的一个。
+    """
+    def __init__(self, choices: Sequence[str], keys: Sequence[Any], max_candidates: int = 500, cache_size: int = 1024):
+        self.choices: List[str] = [str(c) for c in choices]
+        self.keys: List[Any] = list(keys)
+        self.max_candidates = max_candidates
+        self.normalized: List[str] = [self.normalize(c) for c in self.choices]
+        postings = defaultdict(list)
+        for position, name in enumerate(self.normalized):
+            for gram in self._grams(name):
+                postings[gram].append(position)
+        self.postings: Dict[str, np.ndarray] = {gram: np.array(p, dtype=np.int64) for gram, p in postings.items()}
+        self.contains = lru_cache(maxsize=cache_size)(self._contains)
+        self.extract = lru_cache(maxsize=cache_size)(self._extract)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return "".join(unicodedata.normalize("NFKC", str(text)).lower().split())
+
+    @staticmethod
+    def _grams(text: str) -> set:
+        grams = set(text)
+        grams.update(text[i:i + 2] for i in range(len(text) - 1))
+        return grams
+
+    def _contains(self, query: str) -> Optional[Any]:
+        """返回第一个包含 query 的名称对应的 key（不区分大小写），没有时返回 None"""
+        query = self.normalize(query)
+        if not query:
+            return None
+        # 完全相同的名称也包含 query，按原始顺序扫描候选，结果与逐行查找一致
+        position = self._first_containing(query, self.normalized)
+        return None if position is None else self.keys[position]
+
+    def _first_containing(self, query: str, names: List[str]) -> Optional[int]:
+        # 包含 query 的名称必然包含 query 的每个单字和二元组，取倒排表的交集后再逐个确认
+        candidates = None
+        for gram in sorted(self._grams(self.normalize(query)), key=lambda g: len(self.postings.get(g, ()))):
+            posting = self.postings.get(gram)
+            if posting is None:
+                return None
+            candidates = posting if candidates is None else np.intersect1d(candidates, posting, assume_unique=True)
+            if len(candidates) == 0:
+                return None
+        if candidates is None:
+            return None
+        for position in np.sort(candidates):
+            if query in names[position]:
+                return int(position)
+        return None
+
+    def _extract(self, query: str, threshold: int = 80) -> Optional[Any]:
+        """partial_ratio 最高且不低于 threshold 的名称对应的 key"""
+        # 原样包含 query 的名称 partial_ratio 为 100，第一个这样的名称就是逐行扫描的结果
+        position = self._first_containing(query, self.choices) if query else None
+        if position is not None:
+            return self.keys[position]
+        candidates = self._candidates(query)
+        if len(candidates) == 0:
+            return None
+        result = process.extractOne(query, [self.choices[i] for i in candidates], scorer=fuzz.partial_ratio,
+                                    score_cutoff=threshold)
+        if result is None:
+            return None
+        return self.keys[candidates[result[2]]]
+
+    def _candidates(self, query: str) -> np.ndarray:
+        # 按共有的单字/二元组数量排序取前 max_candidates 个，再按原始顺序排列
+        postings = [self.postings[g] for g in self._grams(self.normalize(query)) if g in self.postings]
+        if not postings:
+            return np.array([], dtype=np.int64)
+        counts = np.bincount(np.concatenate(postings), minlength=len(self.choices))
+        candidates = np.flatnonzero(counts)
+        if len(candidates) > self.max_candidates:
+            top = np.argpartition(-counts[candidates], self.max_candidates - 1)[:self.max_candidates]
+            candidates = np.sort(candidates[top])
+        return candidates
+
+    def __len__(self) -> int:
+        return len(self.choices)
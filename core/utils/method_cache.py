@@ -0,0 +1,253 @@
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Union
+from .single_ton import Singleton
+from .log import logger
+
+# 有效期：秒数，或者在写入缓存时以调用参数（不含 self）调用、返回秒数的函数（例如按照交易时段计算）；
+# None 表示不过期
+TTL = Union[float, Callable[..., Optional[float]], None]
+
+
+def estimate_size(value: Any) -> int:
+    """估算缓存对象占用的字节数，只用于统计和按字节淘汰，不追求精确"""
+    pd = sys.modules.get("pandas")  # 没有导入 pandas 时不可能是 DataFrame
+    if pd is not None:
+        if isinstance(value, pd.DataFrame):
+            return int(value.memory_usage(deep=True).sum())
+        if isinstance(value, pd.Series):
+            return int(value.memory_usage(deep=True))
+    frame = getattr(value, "frame", None)
+    if frame is not None and frame is not value:
+        return estimate_size(frame)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(sys.getsizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class _Flight:
+    """同一个 key 正在进行的请求，后到的调用等待它的结果"""
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class MethodCache:
+    """
+    单个函数的缓存：内存中按 LRU 保存，条目数或字节数超出上限时淘汰最久未使用的条目；
+    disk=True 时同时写入磁盘，内存中没有时从磁盘读取。
+    同一个 key 同时只会有一个调用真正执行，其他调用等待并共享结果。
+    """
+    def __init__(self, name: str, ttl: TTL = None, maxsize: int = 128, max_bytes: Optional[int] = None,
+                 disk: bool = False, disk_path: Optional[str] = None):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.disk_path = os.path.join(disk_path, name) if disk and disk_path else None
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, expires_at, size)
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_or_call(self, key: str, func: Callable[[], Any], arguments: tuple = ()) -> Any:
+        with self._lock:
+            found, value = self._get(key)
+            if found:
+                self.hits += 1
+                return value
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                # 等待正在进行的相同请求，也算作命中
+                self.hits += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = self._load_disk(key)
+            if value is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self.hits += 1
+                    self._put(key, *value)
+                flight.value = value[0]
+                return flight.value
+            with self._lock:
+                self.misses += 1
+            flight.value = func()
+            expires_at = self._expires_at(arguments)
+            with self._lock:
+                self._put(key, flight.value, expires_at)
+            self._save_disk(key, flight.value, expires_at)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+        if self.disk_path and os.path.exists(self.disk_path):
+            for name in os.listdir(self.disk_path):
+                os.remove(os.path.join(self.disk_path, name))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "hit_rate": round(self.hits / requests, 4) if requests else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "maxsize": self.maxsize,
+                "max_bytes": self.max_bytes,
+                "disk": self.disk_path is not None,
+            }
+
+    def _get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at, size = entry
+        if expires_at is not None and time.time() >= expires_at:
+            del self._entries[key]
+            self.bytes -= size
+            self.expirations += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _put(self, key: str, value: Any, expires_at: Optional[float]):
+        if expires_at is not None and time.time() >= expires_at:
+            # 有效期为 0，不缓存（例如交易时段内的实时数据）
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[2]
+        size = estimate_size(value)
+        self._entries[key] = (value, expires_at, size)
+        self.bytes += size
+        while self._entries and (len(self._entries) > self.maxsize or
+                                 (self.max_bytes is not None and self.bytes > self.max_bytes and len(self._entries) > 1)):
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def _expires_at(self, arguments: tuple = ()) -> Optional[float]:
+        ttl = self.ttl(*arguments) if callable(self.ttl) else self.ttl
+        return None if ttl is None else time.time() + ttl
+
+    def _disk_file(self, key: str) -> str:
+        return os.path.join(self.disk_path, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".pickle")
+
+    def _load_disk(self, key: str):
+        if not self.disk_path:
+            return None
+        path = self._disk_file(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                stored_key, value, expires_at = pickle.load(f)
+            if stored_key != key or (expires_at is not None and time.time() >= expires_at):
+                return None
+            return value, expires_at
+        except Exception as e:
+            logger.warning(f"读取缓存 {self.name} 失败: {str(e)}")
+            return None
+
+    def _save_disk(self, key: str, value: Any, expires_at: Optional[float]):
+        if not self.disk_path or (expires_at is not None and time.time() >= expires_at):
+            return
+        try:
+            os.makedirs(self.disk_path, exist_ok=True)
+            path = self._disk_file(key)
+            with open(path + ".tmp", "wb") as f:
+                pickle.dump((key, value, expires_at), f)
+            os.replace(path + ".tmp", path)
+        except Exception as e:
+            logger.warning(f"写入缓存 {self.name} 失败: {str(e)}")
+
+
+class CacheRegistry(metaclass=Singleton):
+    """所有 @cached 函数的缓存，按名称登记，进程内共享"""
+    def __init__(self):
+        from .config_setting import Config
+        config = Config()
+        self.disk_path = config.get("method_cache_path") if config.has_key("method_cache_path") else "./database/cache"
+        self.caches: Dict[str, MethodCache] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, **options) -> MethodCache:
+        with self._lock:
+            cache = self.caches.get(name)
+            if cache is None:
+                cache = self.caches[name] = MethodCache(name, disk_path=self.disk_path, **options)
+            return cache
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: cache.stats() for name, cache in sorted(self.caches.items())}
+
+    def clear(self, name: Optional[str] = None):
+        for cache_name, cache in list(self.caches.items()):
+            if name is None or cache_name == name:
+                cache.clear()
+
+
+def cached(name: Optional[str] = None, ttl: TTL = None, maxsize: int = 128, max_bytes: Optional[int] = None,
+           disk: bool = False):
+    """
+    函数结果缓存装饰器。缓存 key 由绑定默认值后的参数决定；方法的 self 不参与 key，
+    因此同一个类的所有实例共用缓存。
+    ttl 为 None 时永不过期，也可以传入返回秒数的函数，每次写入时以调用参数计算。
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        skip_self = next(iter(signature.parameters), None) == "self"
+        cache_name = name or func.__qualname__
+        cache = CacheRegistry().get(cache_name, ttl=ttl, maxsize=maxsize, max_bytes=max_bytes, disk=disk)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = list(bound.arguments.items())
+            if skip_self:
+                arguments = arguments[1:]
+            key = repr(arguments)
+            return cache.get_or_call(key, lambda: func(*args, **kwargs), tuple(value for _, value in arguments))
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
@@ -4,12 +4,14 @@ import re
 import jieba
 from collections import defaultdict
 from rapidfuzz import fuzz as rfuzz
+from .fuzzy_index import FuzzyIndex
 
 class StringMatcher:
     def __init__(self, data_dict, index_cache=None):
         self.data_dict = data_dict
         self.index_cache = index_cache
         self.inverted_index = self._build_inverted_index()
+        self.fuzzy_index = FuzzyIndex(list(data_dict.values()), list(data_dict.keys()))
 
     def _build_inverted_index(self):
         if self.index_cache and os.path.exists(self.index_cache):
@@ -34,21 +36,20 @@ class StringMatcher:
         return inverted_index
 
     def exact_match(self, query):
-        for key, value in self.data_dict.items():
-            if query.lower() in value.lower():
-                return key
-        return None
+        return self.fuzzy_index.contains(query)
 
     def regex_match(self, query):
-        pattern = re.compile(query, re.IGNORECASE)
+        try:
+            pattern = re.compile(query, re.IGNORECASE)
+        except re.error:
+            return None
         for key, value in self.data_dict.items():
             if pattern.search(value):
                 return key
         return None
 
     def rapidfuzz_match(self, query, threshold=80):
-        best_match = max(self.data_dict.items(), key=lambda x: rfuzz.partial_ratio(query, x[1]))
-        return best_match[0] if rfuzz.partial_ratio(query, best_match[1]) >= threshold else None
+        return self.fuzzy_index.extract(query, threshold)
 
     def inverted_index_match(self, query):
         query_words = jieba.cut(query)
@@ -68,9 +69,11 @@ class StringMatcher:
         if result:
             return result
         
-        result = self.regex_match(query)
-        if result:
-            return result
+        # 不含正则元字符时正则匹配等同于上面的包含匹配，不必再扫描一遍
+        if re.escape(query) != query:
+            result = self.regex_match(query)
+            if result:
+                return result
         
         result = self.rapidfuzz_match(query)
         if result:
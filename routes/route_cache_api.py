@@ -0,0 +1,51 @@
+from typing import Optional
+from fastapi import APIRouter
+from core.embeddings._embedding_cache import EmbeddingCache
+from core.llms.response_cache import ResponseCache
+from core.rag.build_embedding_db import AkshareIndexBuilder
+from core.utils.method_cache import CacheRegistry
+
+router = APIRouter()
+
+router.prefix = "/api"
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """每个 @cached 函数的条目数、字节数、命中率和淘汰次数"""
+    return CacheRegistry().stats()
+
+@router.post("/cache/clear")
+async def cache_clear(name: Optional[str] = None):
+    CacheRegistry().clear(name)
+    return {"message": "cache cleared", "name": name}
+
+@router.get("/cache/llm")
+async def llm_cache_stats():
+    """LLM 响应缓存各调用点的命中率、节省的 token 和时间"""
+    return ResponseCache().stats()
+
+@router.post("/cache/llm/clear")
+async def llm_cache_clear(site: Optional[str] = None):
+    ResponseCache().clear(site)
+    return {"message": "llm cache cleared", "site": site}
+
+@router.get("/cache/embedding")
+async def embedding_cache_stats():
+    """向量缓存各模型的内存 / 磁盘命中次数、批内去重次数和磁盘上的条目数"""
+    return EmbeddingCache().stats()
+
+@router.post("/cache/embedding/clear")
+async def embedding_cache_clear(model: Optional[str] = None):
+    EmbeddingCache().clear(model)
+    return {"message": "embedding cache cleared", "model": model}
+
+@router.get("/akshare-index/status")
+async def akshare_index_status():
+    """akshare 向量索引后台构建的状态和进度（阶段、已完成数、总数）"""
+    return AkshareIndexBuilder().status()
+
+@router.post("/akshare-index/rebuild")
+async def akshare_index_rebuild():
+    """在后台增量更新 akshare 向量索引，只向量化新增或内容变化的函数"""
+    AkshareIndexBuilder().start()
+    return AkshareIndexBuilder().status()
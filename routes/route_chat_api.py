@@ -10,6 +10,8 @@ import asyncio
 from core.session.chat_session_manager import ChatSessionManager
 from core.model.chat_request import ChatRequest, SessionChatRequest
 from core.utils.log import logger
+from core.utils.config_setting import Config
+from core.scheduler.threaded_stream import ThreadedStreamBridge
 import traceback
 
 router = APIRouter()
@@ -21,6 +23,19 @@ from core.session.chat_manager import ChatManager
 
 chat_manager = ChatManager()
 
+config = Config()
+# bridged: 在线程池中驱动同步生成器，不阻塞事件循环；inline: 在事件循环中直接迭代（旧行为）
+stream_mode = config.get("chat_stream_mode") if config.has_key("chat_stream_mode") else "bridged"
+
+async def iterate_chat_generator(chat_generator):
+    if stream_mode == "inline":
+        for item in chat_generator:
+            yield item
+            await asyncio.sleep(0)  # 让出控制权给事件循环
+    else:
+        async for item in ThreadedStreamBridge().iterate(chat_generator):
+            yield item
+
 @router.post("/api/chat")
 async def chat_endpoint(request: ChatRequest):
     try:
@@ -75,7 +90,7 @@ async def chat_stream(request: Request):
         try:
             logger.info(f"Starting to generate response for session: {session_id}")
             chat_generator = manager.get_generator(session_id)
-            for item in chat_generator:
+            async for item in iterate_chat_generator(chat_generator):
                 logger.debug(f"Generated item: {item}")
                 if isinstance(item, str):
                     yield f"data: {json.dumps({'type': 'text', 'content': item})}\n\n"
@@ -94,7 +109,6 @@ async def chat_stream(request: Request):
                     except TypeError:
                         logger.warning(f"Skipping non-serializable item: {item}")
                         continue
-                await asyncio.sleep(0)  # 让出控制权给事件循环
             logger.info(f"Finished generating response for session: {session_id}")
             yield "data: [DONE]\n\n"
         except Exception as e:
@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from core.llms.http_transport import TransportRegistry
+
+router = APIRouter()
+
+router.prefix = "/api"
+
+@router.get("/llm/transport")
+async def llm_transport_stats():
+    """每个 LLM 主机共享连接池的请求数、并发数、状态码、延迟和连接数"""
+    return TransportRegistry().stats()
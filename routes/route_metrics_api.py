@@ -0,0 +1,21 @@
+from typing import Optional
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from core.llms.telemetry import LLMTelemetry
+
+router = APIRouter()
+
+router.prefix = "/api"
+
+@router.get("/metrics")
+async def llm_metrics(session_id: Optional[str] = None, group_by: str = "site", limit: int = 50):
+    """最近的 LLM 调用按 group_by（site / step / session_id / client / model / method）汇总，以及最近 limit 条明细"""
+    telemetry = LLMTelemetry()
+    return {
+        "summary": telemetry.summary(group_by=group_by, session_id=session_id),
+        "recent": telemetry.recent(session_id=session_id, limit=limit),
+    }
+
+@router.get("/metrics/prometheus", response_class=PlainTextResponse)
+async def llm_metrics_prometheus():
+    return PlainTextResponse(LLMTelemetry().prometheus(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,56 @@
+# -*- coding:utf-8 -*-
+"""
+对比 /api/chat-stream 两种流式模式下 N 个并发 session 的总耗时
+inline: 在事件循环里直接迭代同步生成器（所有 session 串行）
+bridged: 通过 ThreadedStreamBridge 在线程池里驱动生成器（session 之间并发）
+
+python -m test.bench_chat_stream
+"""
+import asyncio
+import time
+from core.scheduler.threaded_stream import ThreadedStreamBridge
+
+SESSIONS = 8
+CHUNKS = 10
+CHUNK_DELAY = 0.05  # 模拟每个 chunk 之间阻塞的 LLM / akshare 调用
+
+
+def fake_chat(session: int):
+    for i in range(CHUNKS):
+        time.sleep(CHUNK_DELAY)
+        yield {"type": "text", "content": f"session {session} chunk {i}"}
+
+
+async def consume_inline(session: int) -> int:
+    count = 0
+    for _ in fake_chat(session):
+        count += 1
+        await asyncio.sleep(0)
+    return count
+
+
+async def consume_bridged(session: int) -> int:
+    count = 0
+    async for _ in ThreadedStreamBridge().iterate(fake_chat(session)):
+        count += 1
+    return count
+
+
+async def run(consumer) -> float:
+    start = time.perf_counter()
+    counts = await asyncio.gather(*(consumer(i) for i in range(SESSIONS)))
+    assert all(c == CHUNKS for c in counts)
+    return time.perf_counter() - start
+
+
+def main():
+    serial = SESSIONS * CHUNKS * CHUNK_DELAY
+    inline = asyncio.run(run(consume_inline))
+    bridged = asyncio.run(run(consume_bridged))
+    print(f"sessions={SESSIONS} chunks={CHUNKS} delay={CHUNK_DELAY}s (serial lower bound {serial:.2f}s)")
+    print(f"inline : {inline:.2f}s")
+    print(f"bridged: {bridged:.2f}s  speedup x{inline / bridged:.1f}")
+
+
+if __name__ == "__main__":
+    main()
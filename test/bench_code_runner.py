@@ -0,0 +1,59 @@
+# -*- coding:utf-8 -*-
+"""
+对比执行一段 pandas 代码的延迟
+cold: 每次启动新的 python 进程，导入 pandas/numpy 后 exec
+warm: ProcessCodeRunner，工作进程已经预先导入好模块
+inproc: ASTCodeRunner，在当前进程中 exec（没有隔离）
+
+python -m test.bench_code_runner
+"""
+import statistics
+import subprocess
+import sys
+import time
+from core.interpreter.ast_code_runner import ASTCodeRunner
+from core.interpreter.process_code_runner import ProcessCodeRunner, SandboxPool
+
+RUNS = 5
+CODE = """
+import numpy as np
+import pandas as pd
+df = pd.DataFrame({"close": np.random.rand(2000)})
+df["ma20"] = df["close"].rolling(20).mean()
+result = float(df["ma20"].iloc[-1])
+print(result)
+"""
+
+
+def bench(func) -> list:
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def cold():
+    subprocess.run([sys.executable, "-c", "import numpy, pandas\nexec(compile(%r, '<string>', 'exec'))" % CODE],
+                   check=True, capture_output=True)
+
+
+def main():
+    SandboxPool.instance()
+    warm_runner = ProcessCodeRunner()
+    # 第一次调用会等待工作进程完成预热
+    warm_runner.run(CODE, {})
+    inproc_runner = ASTCodeRunner()
+    results = {
+        "cold": bench(cold),
+        "warm": bench(lambda: warm_runner.run(CODE, {})),
+        "inproc": bench(lambda: inproc_runner.run(CODE, {})),
+    }
+    for name, times in results.items():
+        print(f"{name:7s} median {statistics.median(times) * 1000:8.1f} ms  max {max(times) * 1000:8.1f} ms")
+    SandboxPool.instance().shutdown()
+
+
+if __name__ == "__main__":
+    main()
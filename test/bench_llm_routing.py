@@ -0,0 +1,122 @@
+# -*- coding:utf-8 -*-
+"""
+用模拟的 LLM 后端对比 FallbackLLMClient 两种路由方式的延迟分布
+weighted: 按固定权重随机选择主 LLM，失败后转到备用 LLM（原有行为）
+adaptive: AdaptiveLoadBalancer，按延迟 / 错误率 EWMA 选择，熔断故障后端，超过 p95 时对冲到第二个后端
+
+模拟后端：fast 偶尔出现长尾，slow 整体偏慢，flaky 在压测中段持续报错（模拟限流 / 故障）
+
+python -m test.bench_llm_routing
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from core.llms.fallback_client import AdaptiveLoadBalancer, LoadBalancer
+
+REQUESTS = 600
+CONCURRENCY = 16
+
+
+class SimulatedBackend:
+    def __init__(self, name: str, median: float, tail: float, tail_ratio: float, outage=None):
+        self.name = name
+        self.median = median
+        self.tail = tail
+        self.tail_ratio = tail_ratio
+        self.outage = outage  # (开始, 结束) 占压测进度的比例
+        self.progress = lambda: 0.0
+
+    def one_chat(self, message, is_stream=False):
+        if self.outage and self.outage[0] <= self.progress() < self.outage[1]:
+            time.sleep(0.01)
+            raise Exception(f"{self.name}: 429 Too Many Requests")
+        latency = self.tail if random.random() < self.tail_ratio else random.lognormvariate(0, 0.25) * self.median
+        time.sleep(latency)
+        return f"{self.name}: {message}"
+
+
+def make_backends():
+    return [
+        SimulatedBackend("fast", median=0.02, tail=0.5, tail_ratio=0.03),
+        SimulatedBackend("slow", median=0.05, tail=0.5, tail_ratio=0.02),
+        SimulatedBackend("flaky", median=0.02, tail=0.5, tail_ratio=0.03, outage=(0.3, 0.7)),
+    ]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run(call, backends):
+    done = [0]
+    lock = threading.Lock()
+    for backend in backends:
+        backend.progress = lambda: done[0] / REQUESTS
+
+    def one(i):
+        started = time.perf_counter()
+        try:
+            call(f"q{i}")
+            ok = True
+        except Exception:
+            ok = False
+        with lock:
+            done[0] += 1
+        return time.perf_counter() - started, ok
+
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        results = list(pool.map(one, range(REQUESTS)))
+    latencies = [latency for latency, _ in results]
+    errors = sum(1 for _, ok in results if not ok)
+    return latencies, errors
+
+
+def weighted_call(balancer, auxiliary):
+    def call(message):
+        try:
+            return balancer.get_next_llm().one_chat(message)
+        except Exception:
+            return auxiliary.one_chat(message)
+    return call
+
+
+def adaptive_call(balancer, auxiliary):
+    def call(message):
+        try:
+            return balancer.call("one_chat", (message,), {}, hedge=True, force=False)
+        except Exception:
+            return auxiliary.one_chat(message)
+    return call
+
+
+def report(name, latencies, errors):
+    print(f"{name:9s} p50={percentile(latencies, 50) * 1000:6.1f}ms p95={percentile(latencies, 95) * 1000:6.1f}ms "
+          f"p99={percentile(latencies, 99) * 1000:6.1f}ms max={max(latencies) * 1000:6.1f}ms errors={errors}")
+
+
+def main():
+    random.seed(7)
+    print(f"requests={REQUESTS} concurrency={CONCURRENCY}")
+    backends = make_backends()
+    auxiliary = SimulatedBackend("auxiliary", median=0.08, tail=0.5, tail_ratio=0.02)
+    weighted = weighted_call(LoadBalancer(backends), auxiliary)
+    weighted_latencies, weighted_errors = run(weighted, backends + [auxiliary])
+    report("weighted", weighted_latencies, weighted_errors)
+
+    backends = make_backends()
+    balancer = AdaptiveLoadBalancer(backends, hedge_percentile=95, cooldown=0.5)
+    adaptive = adaptive_call(balancer, auxiliary)
+    adaptive_latencies, adaptive_errors = run(adaptive, backends + [auxiliary])
+    report("adaptive", adaptive_latencies, adaptive_errors)
+
+    stats = balancer.get_routing_stats()
+    print(f"hedges={stats['hedges']} hedge_wins={stats['hedge_wins']}")
+    for name, backend in zip(("fast", "slow", "flaky"), stats["backends"].values()):
+        print(f"  {name}: {backend}")
+    print(f"p99 speedup x{percentile(weighted_latencies, 99) / percentile(adaptive_latencies, 99):.1f}")
+
+
+if __name__ == "__main__":
+    main()
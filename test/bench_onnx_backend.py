@@ -0,0 +1,121 @@
+# -*- coding:utf-8 -*-
+"""
+在 akshare 函数文档（json/akshare_docs.json）上对比本地 bge 模型三种推理后端的精度和延迟
+torch: SentenceTransformer / CrossEncoder（原有实现）
+onnx: 导出的 ONNX 模型，ONNX Runtime 推理
+onnx-int8: 动态 int8 量化后的 ONNX 模型
+
+精度：
+- 向量与 torch 向量的余弦相似度（平均 / 最小）
+- 以每个函数的“描述”行作为查询、该函数为正确答案的 recall@1 / recall@10，以及与 torch 检索结果 top-10 的重合度
+- 重排分数与 torch 的最大绝对误差，以及重排后 top-1 与 torch 一致的比例
+延迟：单条查询的 p50 / p95，批量编码文档的吞吐
+
+需要 sentence_transformers、onnxruntime、optimum[exporters]（第一次运行时导出模型）：
+
+python -m test.bench_onnx_backend
+python -m test.bench_onnx_backend --embedding BAAI/bge-m3 --reranker BAAI/bge-reranker-v2-m3 --docs 300
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+import numpy as np
+from core.embeddings._onnx_backend import BACKENDS, load_cross_encoder, load_sentence_model
+
+
+def load_corpus(limit: int):
+    with open("./json/akshare_docs.json", "r", encoding="utf-8") as f:
+        docs = json.load(f)
+    names = sorted(docs)[:limit]
+    contents, queries = [], []
+    for name in names:
+        body = docs[name].split("输入参数")[0].strip()
+        contents.append(f"{name}: {body}")
+        # “描述: 99 期货-数据-期现-现货走势”这一行作为查询
+        description = body.split("\n")[0].replace("描述:", "").strip()
+        queries.append(description or name)
+    return names, contents, queries
+
+
+def latency(func, inputs):
+    timings = []
+    for item in inputs:
+        started = time.perf_counter()
+        func(item)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95)]
+
+
+def normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def bench_embedding(model_id, contents, queries, sample):
+    results = {}
+    for backend in BACKENDS:
+        started = time.perf_counter()
+        model = load_sentence_model(model_id, device="cpu", backend=backend)
+        load = time.perf_counter() - started
+        model.encode(["预热"])
+        started = time.perf_counter()
+        documents = normalize(model.encode(contents, batch_size=32))
+        throughput = len(contents) / (time.perf_counter() - started)
+        query_vectors = normalize(model.encode([queries[i] for i in sample], batch_size=32))
+        p50, p95 = latency(lambda text: model.encode([text]), [queries[i] for i in sample[:50]])
+        results[backend] = {"documents": documents, "queries": query_vectors, "load": load, "throughput": throughput,
+                            "p50": p50, "p95": p95}
+
+    reference = results["torch"]
+    reference_top = np.argsort(-(reference["queries"] @ reference["documents"].T), axis=1)[:, :10]
+    print(f"\nembedding {model_id}: {len(contents)} docs, {len(sample)} queries")
+    print(f"{'backend':10s} {'load':>7s} {'p50':>8s} {'p95':>8s} {'docs/s':>8s} {'cos avg':>8s} {'cos min':>8s} "
+          f"{'R@1':>6s} {'R@10':>6s} {'top10=':>7s}")
+    for backend, result in results.items():
+        cosine = np.sum(result["documents"] * reference["documents"], axis=1)
+        top = np.argsort(-(result["queries"] @ result["documents"].T), axis=1)[:, :10]
+        recall1 = np.mean([expected == row[0] for expected, row in zip(sample, top)])
+        recall10 = np.mean([expected in row for expected, row in zip(sample, top)])
+        overlap = np.mean([len(set(row) & set(ref)) / 10 for row, ref in zip(top, reference_top)])
+        print(f"{backend:10s} {result['load']:6.1f}s {result['p50'] * 1000:6.1f}ms {result['p95'] * 1000:6.1f}ms "
+              f"{result['throughput']:8.1f} {cosine.mean():8.5f} {cosine.min():8.5f} {recall1:6.3f} {recall10:6.3f} {overlap:7.3f}")
+    return reference_top
+
+
+def bench_reranker(model_id, contents, queries, sample, candidates):
+    pairs = [[[queries[i], contents[j]] for j in row[:10]] for i, row in zip(sample, candidates)]
+    scores = {}
+    print(f"\nreranker {model_id}: {len(pairs)} queries x 10 candidates")
+    print(f"{'backend':10s} {'load':>7s} {'p50':>8s} {'p95':>8s} {'max err':>8s} {'top1=':>6s}")
+    for backend in BACKENDS:
+        started = time.perf_counter()
+        model = load_cross_encoder(model_id, device="cpu", max_length=1024, backend=backend)
+        load = time.perf_counter() - started
+        model.predict([["预热", "预热"]])
+        p50, p95 = latency(lambda group: model.predict(group), pairs)
+        scores[backend] = np.array([np.asarray(model.predict(group), dtype=np.float32) for group in pairs])
+        error = np.abs(scores[backend] - scores["torch"]).max()
+        top1 = np.mean(np.argmax(scores[backend], axis=1) == np.argmax(scores["torch"], axis=1))
+        print(f"{backend:10s} {load:6.1f}s {p50 * 1000:6.1f}ms {p95 * 1000:6.1f}ms {error:8.5f} {top1:6.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embedding", default="BAAI/bge-m3")
+    parser.add_argument("--reranker", default="BAAI/bge-reranker-v2-m3")
+    parser.add_argument("--docs", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    names, contents, queries = load_corpus(args.docs)
+    sample = sorted(random.Random(0).sample(range(len(names)), min(args.queries, len(names))))
+    candidates = bench_embedding(args.embedding, contents, queries, sample)
+    if args.reranker:
+        bench_reranker(args.reranker, contents, queries, sample, candidates)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# -*- coding:utf-8 -*-
+"""
+对比名称模糊查找：逐行 partial_ratio 扫描 vs FuzzyIndex
+数据：约 5000 个 A 股名称（json/stock_stock_zh_a_spot.pickle）和 tushare 代码表（json/tushare_code_20240804.pickle）
+
+python -m test.bench_string_matcher
+"""
+import pickle
+import random
+import statistics
+import time
+from rapidfuzz import fuzz
+from core.utils.fuzzy_index import FuzzyIndex
+
+QUERIES = 200
+
+
+def load_stock_names():
+    with open("./json/stock_stock_zh_a_spot.pickle", "rb") as f:
+        inverted_index = pickle.load(f)
+    names = {}
+    for rows in inverted_index.values():
+        for row in rows:
+            names[row["代码"]] = row["名称"]
+    return list(names.values()), list(names.keys())
+
+
+def load_tushare_codes():
+    with open("./json/tushare_code_20240804.pickle", "rb") as f:
+        df = pickle.load(f)
+    content = (df["ts_code"] + "," + df["name"] + "," + df["type"]).tolist()
+    return content, df["ts_code"].tolist()
+
+
+def make_queries(names):
+    rng = random.Random(0)
+    queries = []
+    for name in rng.sample(names, QUERIES):
+        # 截取一段名称，模拟用户输入的简称
+        start = rng.randint(0, max(0, len(name) - 2))
+        queries.append(name[start:start + rng.randint(2, 4)])
+    return queries
+
+
+def linear(choices, keys, query, threshold=80):
+    best = max(range(len(choices)), key=lambda i: fuzz.partial_ratio(query, choices[i]))
+    return keys[best] if fuzz.partial_ratio(query, choices[best]) >= threshold else None
+
+
+def bench(name, choices, keys):
+    queries = make_queries(choices)
+    start = time.perf_counter()
+    index = FuzzyIndex(choices, keys)
+    build = time.perf_counter() - start
+
+    linear_times, index_times, same = [], [], 0
+    for query in queries:
+        start = time.perf_counter()
+        expected = linear(choices, keys, query)
+        linear_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        actual = index.extract(query)
+        index_times.append(time.perf_counter() - start)
+        same += expected == actual
+
+    start = time.perf_counter()
+    for query in queries:
+        index.extract(query)
+    cached = (time.perf_counter() - start) / len(queries)
+
+    print(f"{name}: {len(choices)} 条, 建索引 {build * 1000:.0f} ms")
+    print(f"  linear  median {statistics.median(linear_times) * 1000:8.2f} ms")
+    print(f"  index   median {statistics.median(index_times) * 1000:8.2f} ms")
+    print(f"  cached  mean   {cached * 1000:8.4f} ms")
+    print(f"  与逐行扫描结果一致 {same}/{len(queries)}")
+
+
+def main():
+    bench("A股名称", *load_stock_names())
+    bench("tushare代码表", *load_tushare_codes())
+
+
+if __name__ == "__main__":
+    main()